@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 
 from . import models
-from . import inherit
\ No newline at end of file
+from . import inherit
+from . import currency_rate_table
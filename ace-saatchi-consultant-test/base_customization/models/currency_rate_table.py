@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import SQL, float_round
+from collections import defaultdict
+import datetime
+
+
+class RateTable:
+    """
+    Currency rates preloaded for a set of (currency, date) pairs.
+
+    Gives the same results as res.currency._convert() for the loaded pairs,
+    without a rate lookup per amount.
+    """
+
+    def __init__(self, rates, roundings):
+        self._rates = rates            # {(currency_id, date): rate}
+        self._roundings = roundings    # {currency_id: rounding}
+
+    def rate(self, currency, date):
+        return self._rates[(currency.id, _to_date(date))]
+
+    def convert(self, amount, from_currency, to_currency, date, round=True):
+        """Same as from_currency._convert(amount, to_currency, company, date)."""
+        if not amount or from_currency == to_currency:
+            converted = amount
+        else:
+            converted = amount * self.rate(to_currency, date) / self.rate(from_currency, date)
+        if round:
+            return float_round(converted, precision_rounding=self._roundings[to_currency.id])
+        return converted
+
+    def convert_many(self, items, round=True):
+        """
+        Convert a batch of amounts in one pass.
+
+        Args:
+            items: iterable of (amount, from_currency, to_currency, date)
+
+        Returns:
+            list: converted amounts, in the order of ``items``
+        """
+        return [
+            self.convert(amount, from_currency, to_currency, date, round=round)
+            for amount, from_currency, to_currency, date in items
+        ]
+
+
+def _to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value or fields.Date.today()
+
+
+class CurrencyRateTable(models.AbstractModel):
+    _name = 'base_customization.currency_rate_table'
+    _description = 'Preloaded Currency Rate Table'
+
+    # Key of the conversion rate memo in the cursor's per-transaction cache
+    _RATE_MEMO_KEY = 'base_customization.conversion_rates'
+
+    @api.model
+    def load(self, currencies, dates, company=None):
+        """
+        Load the rates of every currency at every date with one query.
+
+        Rates are resolved like res.currency._get_rates(): the latest rate on
+        or before the date, company-specific rates first, falling back to the
+        oldest rate and finally to 1.0.
+
+        Args:
+            currencies: res.currency recordset
+            dates: iterable of dates (datetimes are truncated)
+            company: res.company whose rates apply (default: current company)
+
+        Returns:
+            RateTable
+        """
+        company = company or self.env.company
+        dates = sorted({_to_date(date) for date in dates})
+        currencies = currencies.exists()
+        rates = {}
+        if currencies and dates:
+            self.env['res.currency.rate'].flush_model(['rate', 'name', 'currency_id', 'company_id'])
+            self.env.cr.execute(SQL(
+                """
+                SELECT cur.id, d.day,
+                       COALESCE(
+                           (SELECT r.rate FROM res_currency_rate r
+                             WHERE r.currency_id = cur.id
+                               AND r.name <= d.day
+                               AND (r.company_id IS NULL OR r.company_id = %(company_id)s)
+                          ORDER BY r.company_id, r.name DESC
+                             LIMIT 1),
+                           (SELECT r.rate FROM res_currency_rate r
+                             WHERE r.currency_id = cur.id
+                               AND (r.company_id IS NULL OR r.company_id = %(company_id)s)
+                          ORDER BY r.company_id, r.name ASC
+                             LIMIT 1),
+                           1.0)
+                  FROM unnest(%(currency_ids)s) AS cur(id)
+            CROSS JOIN unnest(%(dates)s::date[]) AS d(day)
+                """,
+                company_id=company.root_id.id,
+                currency_ids=currencies.ids,
+                dates=dates,
+            ))
+            rates = {(currency_id, day): rate for currency_id, day, rate in self.env.cr.fetchall()}
+        roundings = {currency.id: currency.rounding for currency in currencies}
+        return RateTable(rates, roundings)
+
+    def _get_rate_memo(self):
+        """
+        Conversion rates memoized for the current transaction.
+
+        Returns:
+            dict: {(from_currency_id, to_currency_id, company_id, date): rate}
+        """
+        cr = self.env.cr
+        memo = cr.cache.get(self._RATE_MEMO_KEY)
+        if memo is None:
+            memo = cr.cache[self._RATE_MEMO_KEY] = {}
+            cr.postcommit.add(self._clear_rate_memo)
+            cr.postrollback.add(self._clear_rate_memo)
+        return memo
+
+    def _clear_rate_memo(self):
+        self.env.cr.cache.pop(self._RATE_MEMO_KEY, None)
+
+    @api.model
+    def convert_memoized(self, items):
+        """
+        Convert amounts with the conversion rates memoized for the transaction.
+
+        Rates missing from the memo are loaded with one query per company, so
+        recomputing the same documents does not look any rate up again.
+
+        Args:
+            items: iterable of (amount, from_currency, to_currency, company, date)
+
+        Returns:
+            list: converted amounts rounded to the target currency, like
+                  from_currency._convert(), in the order of ``items``
+        """
+        items = [
+            (amount, from_currency, to_currency, company or self.env.company, _to_date(date))
+            for amount, from_currency, to_currency, company, date in items
+        ]
+        memo = self._get_rate_memo()
+        missing = defaultdict(set)
+        for __, from_currency, to_currency, company, date in items:
+            if from_currency != to_currency and (from_currency.id, to_currency.id, company.id, date) not in memo:
+                missing[company].add((from_currency, to_currency, date))
+        for company, pairs in missing.items():
+            rate_table = self.load(
+                self.env['res.currency'].union(*(
+                    from_currency | to_currency for from_currency, to_currency, __ in pairs
+                )),
+                [date for __, __, date in pairs],
+                company,
+            )
+            for from_currency, to_currency, date in pairs:
+                memo[(from_currency.id, to_currency.id, company.id, date)] = (
+                    rate_table.rate(to_currency, date) / rate_table.rate(from_currency, date)
+                )
+
+        converted = []
+        for amount, from_currency, to_currency, company, date in items:
+            if from_currency != to_currency:
+                amount *= memo[(from_currency.id, to_currency.id, company.id, date)]
+            converted.append(to_currency.round(amount))
+        return converted
+
+    @api.model
+    def sum_converted(self, documents):
+        """
+        Total of each document's amounts, converted to its target currency.
+
+        Amounts are summed per currency first, so each document converts once
+        per currency rather than once per line.
+
+        Args:
+            documents: iterable of (record, amounts, to_currency, company, date)
+                where amounts is an iterable of (amount, currency)
+
+        Returns:
+            dict: {record: total}
+        """
+        subtotals = []
+        for record, amounts, to_currency, company, date in documents:
+            per_currency = defaultdict(float)
+            for amount, currency in amounts:
+                if currency:
+                    per_currency[currency] += amount
+            subtotals.extend(
+                (record, amount, currency, to_currency, company, date)
+                for currency, amount in per_currency.items()
+            )
+        converted = self.convert_memoized(subtotal[1:] for subtotal in subtotals)
+        totals = defaultdict(float)
+        for (record, *__), amount in zip(subtotals, converted):
+            totals[record] += amount
+        return totals
+
+    @api.model
+    def write_line_conversions(self, conversions):
+        """
+        Set fx_currency_id and fx_price_unit of order/invoice lines in batch.
+
+        Conversions are grouped by (source currency, target currency, company,
+        date): the rates of each company are loaded once, and lines ending up
+        with the same values are written together instead of line by line.
+
+        Args:
+            conversions: iterable of (line, from_currency, to_currency,
+                company, date); fx_price_unit is line.price_unit converted
+                like from_currency._convert(price_unit, to_currency, company, date)
+        """
+        groups = defaultdict(list)
+        for line, from_currency, to_currency, company, date in conversions:
+            groups[(from_currency, to_currency, company or self.env.company, _to_date(date))].append(line)
+
+        to_write = defaultdict(list)
+        for company in {company for __, __, company, __ in groups}:
+            company_groups = {key: lines for key, lines in groups.items() if key[2] == company}
+            rate_table = self.load(
+                self.env['res.currency'].union(*(
+                    from_currency | to_currency for from_currency, to_currency, __, __ in company_groups
+                )),
+                [date for __, __, __, date in company_groups],
+                company,
+            )
+            for (from_currency, to_currency, __, date), lines in company_groups.items():
+                for line in lines:
+                    fx_price_unit = rate_table.convert(line.price_unit, from_currency, to_currency, date)
+                    to_write[(line._name, to_currency.id, fx_price_unit)].append(line.id)
+
+        for (model, currency_id, fx_price_unit), line_ids in to_write.items():
+            self.env[model].browse(line_ids).write({
+                'fx_currency_id': currency_id,
+                'fx_price_unit': fx_price_unit,
+            })
+
+    @api.model
+    def get_invoice_conversion_dates(self, moves):
+        """
+        Conversion date of each invoice: the date of its first linked sale
+        order, else the invoice date, else the accounting date.
+
+        Resolved with one join through sale_order_line_invoice_rel instead of
+        walking invoice_line_ids.sale_line_ids.order_id move by move.
+
+        Returns:
+            dict: {move_id: date}
+        """
+        if not moves:
+            return {}
+        self.env['account.move.line'].flush_model(['move_id'])
+        self.env['sale.order'].flush_model(['date_order'])
+        self.env.cr.execute(SQL(
+            """
+            SELECT DISTINCT ON (aml.move_id) aml.move_id, so.date_order
+              FROM account_move_line aml
+              JOIN sale_order_line_invoice_rel rel ON rel.invoice_line_id = aml.id
+              JOIN sale_order_line sol ON sol.id = rel.order_line_id
+              JOIN sale_order so ON so.id = sol.order_id
+             WHERE aml.move_id IN %s
+          ORDER BY aml.move_id, aml.sequence, aml.id, so.id
+            """,
+            tuple(moves.ids),
+        ))
+        so_dates = {move_id: date_order for move_id, date_order in self.env.cr.fetchall()}
+        return {
+            move.id: _to_date(so_dates.get(move.id) or move.invoice_date or move.date)
+            for move in moves
+        }
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = 'res.currency.rate'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['base_customization.currency_rate_table']._clear_rate_memo()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self.env['base_customization.currency_rate_table']._clear_rate_memo()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['base_customization.currency_rate_table']._clear_rate_memo()
+        return super().unlink()
@@ -6,7 +6,29 @@ from odoo import models, _
 from datetime import timedelta
 from odoo import models, api
 from lxml import html
+from odoo.tools import SQL, ormcache
+from odoo.tools.lru import LRU
+from odoo.tools.safe_eval import safe_eval
+from collections import defaultdict
+import hashlib
+import logging
 import re
+import threading
+
+_logger = logging.getLogger(__name__)
+
+# Parsed x_studio_table_note tables, by database
+TABLE_NOTE_CACHE_SIZE = 1024
+_table_note_caches = {}
+_table_note_caches_lock = threading.Lock()
+
+
+def _get_table_note_cache(db_name):
+    """Return the (LRU, hit/miss counters) of parsed table notes of a database."""
+    with _table_note_caches_lock:
+        if db_name not in _table_note_caches:
+            _table_note_caches[db_name] = (LRU(TABLE_NOTE_CACHE_SIZE), {'hits': 0, 'misses': 0})
+        return _table_note_caches[db_name]
 
 
 class InheritUsers(models.Model):
@@ -35,10 +57,42 @@ class InheritUsers(models.Model):
     def _compute_assigned_clients_products(self):
         """Compute flattened lists for easier domain usage"""
         for user in self:
-            user.x_client_ids = user.x_client_assignment_ids.mapped(
-                'x_partner_id')
-            user.x_product_ids = user.x_client_assignment_ids.mapped(
-                'x_product_ids')
+            if user.id:
+                client_ids, product_ids = self._get_assigned_clients_products(user.id)
+                user.x_client_ids = [(6, 0, client_ids)]
+                user.x_product_ids = [(6, 0, product_ids)]
+            else:
+                # Unsaved changes in the user form are not indexed yet
+                user.x_client_ids = user.x_client_assignment_ids.mapped(
+                    'x_partner_id')
+                user.x_product_ids = user.x_client_assignment_ids.mapped(
+                    'x_product_ids')
+
+    @api.model
+    @ormcache('user_id')
+    def _get_assigned_clients_products(self, user_id):
+        """Clients and products assigned to a user, for fast ``in`` domains and rules.
+
+        Read from the base_customization.user_client_product index, cached
+        until an assignment changes.
+
+        Returns:
+            tuple: (client partner ids, product template ids), as tuples
+        """
+        Index = self.env['base_customization.user_client_product']
+        Index.flush_model()
+        self.env.cr.execute(SQL(
+            """
+            SELECT COALESCE(array_agg(DISTINCT partner_id), '{}'),
+                   COALESCE(array_agg(DISTINCT product_tmpl_id) FILTER (WHERE product_tmpl_id IS NOT NULL), '{}')
+              FROM %s
+             WHERE user_id = %s
+            """,
+            SQL.identifier(Index._table),
+            user_id,
+        ))
+        client_ids, product_ids = self.env.cr.fetchone()
+        return tuple(client_ids), tuple(product_ids)
 
 
 class InheritSaleOrder(models.Model):
@@ -46,7 +100,7 @@ class InheritSaleOrder(models.Model):
 
     partner_id = fields.Many2one(
         'res.partner',
-        domain=lambda self: [('id', 'in', self.env.user.x_client_ids.ids)]
+        domain=lambda self: [('id', 'in', self.env['res.users']._get_assigned_clients_products(self.env.uid)[0])]
         if self.env.user.employee_id and
         self.env.user.employee_id.department_id and
         self.env.user.employee_id.department_id.name == 'ACCOUNTS'
@@ -70,7 +124,7 @@ class InheritSaleOrder(models.Model):
             if self.env.user.id != 2:
                 domain = [
                     ('x_client_product_ce_co_id.x_partner_id', '=', record.partner_id.id),
-                    ('x_product_id', 'in', self.env.user.x_product_ids.ids)
+                    ('x_product_id', 'in', self.env['res.users']._get_assigned_clients_products(self.env.uid)[1])
                 ]
             else:
                 domain = [
@@ -107,19 +161,12 @@ class InheritSaleOrder(models.Model):
 
     def _apply_alt_currency_conversion(self):
         """Update all order lines with fx_currency and converted price."""
-        for record in self:
-            alt_currency = record.x_alt_currency_id
-            if not alt_currency:
-                continue
-
-            for line in record.order_line:
-                line.fx_currency_id = alt_currency
-                line.fx_price_unit = line.currency_id._convert(
-                    line.price_unit,
-                    alt_currency,
-                    record.company_id or record.env.company,
-                    record.date_order
-                )
+        self.env['base_customization.currency_rate_table'].write_line_conversions(
+            (line, line.currency_id, record.x_alt_currency_id,
+             record.company_id or record.env.company, record.date_order)
+            for record in self.filtered('x_alt_currency_id')
+            for line in record.order_line
+        )
 
     # ========== Financial Tracking Fields ==========
     x_ce_approved_estimate_billing = fields.Monetary(
@@ -200,22 +247,26 @@ class InheritSaleOrder(models.Model):
 
     @api.depends('order_line.fx_price_unit', 'x_alt_currency_id', 'date_order')
     def _compute_alt_currency_amount(self):
-        """Compute the total alt amount by converting fx_price_unit to alt_currency."""
-        for order in self:
-            total = 0.0
-            alt_currency = order.x_alt_currency_id or order.company_id.currency_id
-
-            for line in order.order_line:
-                fx_currency = line.fx_currency_id or order.currency_id
-                fx_price = line.fx_price_unit or 0.0
+        """Compute the total alt amount by converting fx_price_unit to alt_currency.
 
-                total += fx_currency._convert(
-                    fx_price * line.product_uom_qty,
-                    alt_currency,
-                    order.company_id,
-                    order.date_order or fields.Date.today()
-                )
-            order.x_alt_currency_amount = total
+        Lines are summed per currency and each subtotal is converted once,
+        with the rates memoized for the transaction.
+        """
+        totals = self.env['base_customization.currency_rate_table'].sum_converted(
+            (
+                order,
+                [
+                    ((line.fx_price_unit or 0.0) * line.product_uom_qty, line.fx_currency_id or order.currency_id)
+                    for line in order.order_line
+                ],
+                order.x_alt_currency_id or order.company_id.currency_id,
+                order.company_id,
+                order.date_order or fields.Date.today(),
+            )
+            for order in self
+        )
+        for order in self:
+            order.x_alt_currency_amount = totals[order]
 
     @api.depends('x_client_product_ce_code')
     def _compute_x_ce_code(self):
@@ -396,19 +447,12 @@ class PurchaseOrder(models.Model):
 
     def _apply_alt_currency_conversion(self):
         """Update all order lines with fx_currency and converted price."""
-        for record in self:
-            alt_currency = record.x_alt_currency_id
-            if not alt_currency:
-                continue
-
-            for line in record.order_line:
-                line.fx_currency_id = alt_currency
-                line.fx_price_unit = line.currency_id._convert(
-                    line.price_unit,
-                    alt_currency,
-                    record.company_id or record.env.company,
-                    record.date_order
-                )
+        self.env['base_customization.currency_rate_table'].write_line_conversions(
+            (line, line.currency_id, record.x_alt_currency_id,
+             record.company_id or record.env.company, record.date_order)
+            for record in self.filtered('x_alt_currency_id')
+            for line in record.order_line
+        )
 
     def _default_alt_currency_id(self):
         """Logic:
@@ -440,22 +484,26 @@ class PurchaseOrder(models.Model):
 
     @api.depends('order_line.fx_price_unit', 'x_alt_currency_id', 'date_order')
     def _compute_alt_currency_amount(self):
-        """Compute the total alt amount by converting fx_price_unit to alt_currency."""
-        for order in self:
-            total = 0.0
-            alt_currency = order.x_alt_currency_id or order.company_id.currency_id
+        """Compute the total alt amount by converting fx_price_unit to alt_currency.
 
-            for line in order.order_line:
-                fx_currency = line.fx_currency_id or order.currency_id
-                fx_price = line.fx_price_unit or 0.0
-
-                total += fx_currency._convert(
-                    fx_price * line.product_uom_qty,
-                    alt_currency,
-                    order.company_id,
-                    order.date_order or fields.Date.today()
-                )
-            order.x_alt_currency_amount = total
+        Lines are summed per currency and each subtotal is converted once,
+        with the rates memoized for the transaction.
+        """
+        totals = self.env['base_customization.currency_rate_table'].sum_converted(
+            (
+                order,
+                [
+                    ((line.fx_price_unit or 0.0) * line.product_uom_qty, line.fx_currency_id or order.currency_id)
+                    for line in order.order_line
+                ],
+                order.x_alt_currency_id or order.company_id.currency_id,
+                order.company_id,
+                order.date_order or fields.Date.today(),
+            )
+            for order in self
+        )
+        for order in self:
+            order.x_alt_currency_amount = totals[order]
 
 
 class InheritPurchaseOrderLine(models.Model):
@@ -541,6 +589,48 @@ class InheritPurchaseOrderLine(models.Model):
                 self.price_unit = self.fx_price_unit
 
 
+class AccountAccount(models.Model):
+    _inherit = 'account.account'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env.registry.clear_cache()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if {'code', 'code_store', 'company_ids'} & vals.keys():
+            self.env.registry.clear_cache()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env.registry.clear_cache()
+        return super().unlink()
+
+    @api.model
+    def _get_account_by_code_suffix(self, code_suffix, company):
+        """First account of the company whose code ends with code_suffix (case-insensitive)."""
+        account_id = self._get_code_suffix_map(company.id).get(code_suffix.lower())
+        return self.browse(account_id)
+
+    @ormcache('company_id')
+    def _get_code_suffix_map(self, company_id):
+        """Map every suffix of the company's account codes to the first account having it.
+
+        Replaces ilike '%suffix' searches, which can't use an index; accounts
+        are taken in the order such a search returns them.
+
+        Returns:
+            dict: {code suffix (lowercase): account id}
+        """
+        suffix_map = {}
+        accounts = self.with_context(allowed_company_ids=[company_id]).search([])
+        for account in accounts:
+            code = (account.code or '').lower()
+            for i in range(len(code)):
+                suffix_map.setdefault(code[i:], account.id)
+        return suffix_map
+
+
 class AccountMove(models.Model):
     _inherit = 'account.move'
 
@@ -568,6 +658,11 @@ class AccountMove(models.Model):
         compute="_compute_x_alt_currency_id",
         string="Alt Currency"
     )
+
+    x_billing_summary = fields.Json(
+        compute="_compute_billing_summary",
+        help="Debit and credit billing summaries of the printed invoice"
+    )
     
     def get_parsed_table_notes(self):
         """Parse x_studio_table_note HTML to extract tables by line number
@@ -575,17 +670,52 @@ class AccountMove(models.Model):
         Detects variants: Line-1, Line 1, line-1, LINE 1, etc.
         Converts to 0-based indexing (Line 1 → sequence 0)
         Tables without line markers are stored as 'default' and render at end
+
+        Parsed notes are cached per database, keyed by a hash of the note
+        HTML, so batch printing parses each distinct note once.
         
         Returns:
             dict: {'0': '<table>...</table>', '1': '<table>...</table>', 'default': '<table>...</table>'}
         """
         if not self.x_studio_table_note:
             return {}
-        
+
+        note = self.x_studio_table_note
+        key = hashlib.sha256(note.encode()).hexdigest()
+        cache, stats = _get_table_note_cache(self.env.registry.db_name)
+        try:
+            result = cache[key]
+            counter = 'hits'
+        except KeyError:
+            result = cache[key] = self._parse_table_note(note)
+            counter = 'misses'
+        with _table_note_caches_lock:
+            stats[counter] += 1
+        return dict(result)
+
+    @api.model
+    def get_table_note_cache_stats(self):
+        """Usage of the parsed table note cache of this database, e.g. for a print batch.
+
+        Returns:
+            dict: with entries, size, hits, misses and hit_rate
+        """
+        cache, stats = _get_table_note_cache(self.env.registry.db_name)
+        hits, misses = stats['hits'], stats['misses']
+        return {
+            'entries': len(cache),
+            'size': TABLE_NOTE_CACHE_SIZE,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+    @api.model
+    def _parse_table_note(self, content):
+        """Tables of a table note HTML, by 0-based line number (see get_parsed_table_notes)."""
         result = {}
         
         try:
-            content = self.x_studio_table_note
             pattern = r'(?i)line\s*[-\s]*(\d+)'
             matches = list(re.finditer(pattern, content))
             
@@ -662,11 +792,11 @@ class AccountMove(models.Model):
             _logger.error(f"Error parsing table notes: {str(e)}")
             return {}
             
-    @api.model
-    def create(self, vals):
-        record = super().create(vals)
-        record._apply_alt_currency_conversion()
-        return record
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._apply_alt_currency_conversion()
+        return records
 
     @api.depends('invoice_line_ids', 'state')
     def _compute_related_so(self):
@@ -680,6 +810,7 @@ class AccountMove(models.Model):
 
     def _apply_alt_currency_conversion(self):
         """Update all invoice lines with fx_currency and converted price."""
+        conversions = []
         for record in self:
             # Determine which alt currency to use
             alt_currency = record.x_related_so.x_alt_currency_id if record.x_related_so else None
@@ -690,13 +821,14 @@ class AccountMove(models.Model):
                 continue
 
             for line in record.invoice_line_ids:
-                line.fx_currency_id = alt_currency
-                line.fx_price_unit = line.currency_id._convert(
-                    line.price_unit,
+                conversions.append((
+                    line,
+                    line.currency_id,
                     alt_currency,
                     record.company_id or record.env.company,
                     record.x_related_so.date_order if record.x_related_so else (line.purchase_order_id.date_order if line.purchase_order_id else record.date)
-                )
+                ))
+        self.env['base_customization.currency_rate_table'].write_line_conversions(conversions)
 
     @api.depends('name')
     def _compute_x_alt_currency_id(self):
@@ -706,126 +838,147 @@ class AccountMove(models.Model):
 
     @api.depends('invoice_line_ids.fx_price_unit', 'invoice_line_ids.fx_currency_id', 'state')
     def _compute_alt_currency_amount(self):
-        """Compute the total alt amount by converting fx_price_unit to alt_currency."""
-        for record in self:
-            total = 0.0
-            alt_currency = record.x_alt_currency_id or record.company_id.currency_id
-
-            if not record.x_alt_currency_id:
-                record.x_alt_currency_amount = 0
-                continue
-
-            for line in record.invoice_line_ids:
-                fx_currency = line.fx_currency_id or record.currency_id
-                fx_price = line.fx_price_unit or 0.0
+        """Compute the total alt amount by converting fx_price_unit to alt_currency.
 
-                total += fx_currency._convert(
-                    fx_price * line.quantity,
-                    alt_currency,
-                    record.company_id,
-                    record.x_related_so.date_order or fields.Date.today()
-                )
-            record.x_alt_currency_amount = total
+        Lines are summed per currency and each subtotal is converted once,
+        with the rates memoized for the transaction.
+        """
+        totals = self.env['base_customization.currency_rate_table'].sum_converted(
+            (
+                record,
+                [
+                    ((line.fx_price_unit or 0.0) * line.quantity, line.fx_currency_id or record.currency_id)
+                    for line in record.invoice_line_ids
+                ],
+                record.x_alt_currency_id,
+                record.company_id,
+                record.x_related_so.date_order or fields.Date.today(),
+            )
+            for record in self.filtered('x_alt_currency_id')
+        )
+        for record in self:
+            record.x_alt_currency_amount = totals[record]
 
 
 
 # BIR Report Customizations
     def _search_account_by_code(self, code_suffix):
         """Search account by last 4 digits of code"""
-        # Filter accounts by company using the move's company
-        domain = [('code', 'ilike', '%' + code_suffix)]
-        
-        # Try to filter by company if available
-        accounts = self.env['account.account'].with_context(
-            allowed_company_ids=[self.company_id.id]
-        ).search(domain, limit=1)
-        
-        return accounts[0] if accounts else False
+        account = self.env['account.account']._get_account_by_code_suffix(
+            code_suffix, self.company_id or self.env.company)
+        return account or False
 
-    def _get_billing_summary_debit(self):
-        """Calculate debit side of billing summary"""
-        self.ensure_one()
-        
+    @api.depends('line_ids.debit', 'line_ids.credit', 'line_ids.account_id', 'company_id')
+    def _compute_billing_summary(self):
+        """Debit and credit billing summaries of all the moves at once.
+
+        Non-stored, so printing a batch of invoices computes the summaries of
+        the whole batch with one grouped query over their lines.
+        """
         # Define account codes (last 4 digits)
         AR_ADVERTISER_CODE = '1202'  # 111202
         INTER_CO_RECV_CODE = '1206'  # 111206
-        
-        result = {
-            'ar_advertiser': 0.0,
-            'inter_co_recv': 0.0,
-            'sundries_code': '',
-            'sundries_amount': 0.0,
-            'total': 0.0
-        }
-        
-        # Get accounts
-        ar_account = self._search_account_by_code(AR_ADVERTISER_CODE)
-        inter_co_account = self._search_account_by_code(INTER_CO_RECV_CODE)
-        
-        # Process invoice lines (debit entries)
-        for line in self.line_ids.filtered(lambda l: l.debit > 0):
-            if ar_account and line.account_id == ar_account:
-                result['ar_advertiser'] += line.debit
-            elif inter_co_account and line.account_id == inter_co_account:
-                result['inter_co_recv'] += line.debit
-            else:
-                # Sundries - other debit accounts
-                result['sundries_amount'] += line.debit
-                if not result['sundries_code']:
-                    # Use only last 4 digits of account code
-                    code = line.account_id.code
-                    result['sundries_code'] = code[-4:] if len(code) >= 4 else code
-        
-        result['total'] = result['ar_advertiser'] + result['inter_co_recv'] + result['sundries_amount']
-        
-        return result
+        AP_TRADE_CODE = '2101'  # 112101
+        OUTPUT_VAT_CODE = '2507'  # 112507
+
+        moves = self.filtered('id')
+        amounts = {}
+        if moves.ids:
+            self.env['account.move.line'].flush_model(['move_id', 'account_id', 'debit', 'credit'])
+            self.env.cr.execute(SQL(
+                """
+                SELECT aml.move_id, aml.account_id,
+                       SUM(aml.debit) FILTER (WHERE aml.debit > 0)::float,
+                       MIN(aml.id) FILTER (WHERE aml.debit > 0),
+                       SUM(aml.credit) FILTER (WHERE aml.credit > 0)::float,
+                       MIN(aml.id) FILTER (WHERE aml.credit > 0)
+                  FROM account_move_line aml
+                 WHERE aml.move_id = ANY(%s)
+              GROUP BY aml.move_id, aml.account_id
+                """,
+                moves.ids,
+            ))
+            for move_id, account_id, debit, debit_seq, credit, credit_seq in self.env.cr.fetchall():
+                move_amounts = amounts.setdefault(move_id, {'debit': [], 'credit': []})
+                if debit:
+                    move_amounts['debit'].append((debit_seq, account_id, debit))
+                if credit:
+                    move_amounts['credit'].append((credit_seq, account_id, credit))
+
+        Account = self.env['account.account']
+
+        def short_code(account):
+            # Use only last 4 digits of account code
+            code = account.code or ''
+            return code[-4:] if len(code) >= 4 else code
+
+        for record in self:
+            company = record.company_id or self.env.company
+            ar_account = Account._get_account_by_code_suffix(AR_ADVERTISER_CODE, company)
+            inter_co_account = Account._get_account_by_code_suffix(INTER_CO_RECV_CODE, company)
+            ap_trade_account = Account._get_account_by_code_suffix(AP_TRADE_CODE, company)
+            output_vat_account = Account._get_account_by_code_suffix(OUTPUT_VAT_CODE, company)
+            move_amounts = amounts.get(record.id, {'debit': [], 'credit': []})
+
+            debit = {
+                'ar_advertiser': 0.0,
+                'inter_co_recv': 0.0,
+                'sundries_code': '',
+                'sundries_amount': 0.0,
+                'total': 0.0
+            }
+            # Accounts in the order of their first line, like line_ids
+            for __, account_id, amount in sorted(move_amounts['debit']):
+                account = Account.browse(account_id)
+                if ar_account and account == ar_account:
+                    debit['ar_advertiser'] += amount
+                elif inter_co_account and account == inter_co_account:
+                    debit['inter_co_recv'] += amount
+                else:
+                    # Sundries - other debit accounts
+                    debit['sundries_amount'] += amount
+                    if not debit['sundries_code']:
+                        debit['sundries_code'] = short_code(account)
+            debit['total'] = debit['ar_advertiser'] + debit['inter_co_recv'] + debit['sundries_amount']
+
+            credit = {
+                'ap_trade': 0.0,
+                'income_code': '',
+                'income_amount': 0.0,
+                'output_vat': 0.0,
+                'sundries_code': '',
+                'sundries_amount': 0.0,
+                'total': 0.0
+            }
+            for __, account_id, amount in sorted(move_amounts['credit']):
+                account = Account.browse(account_id)
+                if ap_trade_account and account == ap_trade_account:
+                    credit['ap_trade'] += amount
+                elif output_vat_account and account == output_vat_account:
+                    credit['output_vat'] += amount
+                elif account.account_type in ['income', 'income_other']:
+                    # Income accounts
+                    credit['income_amount'] += amount
+                    if not credit['income_code']:
+                        credit['income_code'] = short_code(account)
+                else:
+                    # Sundries - other credit accounts
+                    credit['sundries_amount'] += amount
+                    if not credit['sundries_code']:
+                        credit['sundries_code'] = short_code(account)
+            credit['total'] = credit['ap_trade'] + credit['income_amount'] + credit['output_vat'] + credit['sundries_amount']
+
+            record.x_billing_summary = {'debit': debit, 'credit': credit}
+
+    def _get_billing_summary_debit(self):
+        """Calculate debit side of billing summary"""
+        self.ensure_one()
+        return dict(self.x_billing_summary['debit'])
 
     def _get_billing_summary_credit(self):
         """Calculate credit side of billing summary"""
         self.ensure_one()
-        
-        # Define account codes (last 4 digits)
-        AP_TRADE_CODE = '2101'  # 112101
-        OUTPUT_VAT_CODE = '2507'  # 112507
-        
-        result = {
-            'ap_trade': 0.0,
-            'income_code': '',
-            'income_amount': 0.0,
-            'output_vat': 0.0,
-            'sundries_code': '',
-            'sundries_amount': 0.0,
-            'total': 0.0
-        }
-        
-        # Get accounts
-        ap_trade_account = self._search_account_by_code(AP_TRADE_CODE)
-        output_vat_account = self._search_account_by_code(OUTPUT_VAT_CODE)
-        
-        # Process invoice lines (credit entries)
-        for line in self.line_ids.filtered(lambda l: l.credit > 0):
-            if ap_trade_account and line.account_id == ap_trade_account:
-                result['ap_trade'] += line.credit
-            elif output_vat_account and line.account_id == output_vat_account:
-                result['output_vat'] += line.credit
-            elif line.account_id.account_type in ['income', 'income_other']:
-                # Income accounts
-                result['income_amount'] += line.credit
-                if not result['income_code']:
-                    # Use only last 4 digits of account code
-                    code = line.account_id.code
-                    result['income_code'] = code[-4:] if len(code) >= 4 else code
-            else:
-                # Sundries - other credit accounts
-                result['sundries_amount'] += line.credit
-                if not result['sundries_code']:
-                    # Use only last 4 digits of account code
-                    code = line.account_id.code
-                    result['sundries_code'] = code[-4:] if len(code) >= 4 else code
-        
-        result['total'] = result['ap_trade'] + result['income_amount'] + result['output_vat'] + result['sundries_amount']
-        
-        return result
+        return dict(self.x_billing_summary['credit'])
     
 class AccountMoveLine(models.Model):
     _inherit = 'account.move.line'
@@ -920,76 +1073,135 @@ class AccountMoveLine(models.Model):
 class PurchaseOrder(models.Model):
     _inherit = 'purchase.order'
 
+    x_button_approver_ids = fields.Many2many(
+        'res.users',
+        string='Approvers',
+        compute='_compute_x_button_approver_ids',
+        help="Approvers of the Studio approval button",
+    )
+
+    def _compute_x_button_approver_ids(self):
+        # Computed for the whole prefetch set: lists and reports printing
+        # many orders resolve their approvers in one batch
+        approvers = self._origin.get_button_approvers_batch()
+        for order in self:
+            order.x_button_approver_ids = approvers.get(order._origin.id, self.env['res.users'])
+
     def get_button_approvers(self):
         """
         Returns the approvers configured in Studio approval button
         :return: recordset of res.users
         """
         self.ensure_one()
+        return self.x_button_approver_ids
+
+    def get_button_approvers_batch(self):
+        """
+        Studio approval button approvers of every order, resolved in batch.
 
-        approvers = self.env['res.users']
+        Orders whose approval process has started get the users of their
+        approval entries; the others get the approvers of the active rules
+        whose domain they match. Each rule domain is searched once for all
+        the orders and the approver groups' users are read together.
+
+        Returns:
+            dict: {purchase order id: res.users}
+        """
+        Users = self.env['res.users']
+        approvers = {order.id: Users for order in self}
+        studio_models = ('studio.approval.entry', 'studio.approval.rule', 'studio.approval.rule.approver')
+        if any(model_name not in self.env for model_name in studio_models):
+            return approvers
 
         # Method 1: Get from approval entries (if approval process has started)
+        remaining = self
         try:
             entries = self.env['studio.approval.entry'].search([
-                ('res_id', '=', self.id),
+                ('res_id', 'in', self.ids),
                 ('model', '=', 'purchase.order')
             ])
-            if entries:
-                approvers = entries.mapped('user_id')
-                if approvers:
-                    return approvers
-        except:
-            pass
+            for entry in entries:
+                approvers[entry.res_id] |= entry.user_id
+            remaining = self.filtered(lambda order: not approvers[order.id])
+        except Exception as e:
+            _logger.warning("Could not fetch approval entries: %s", e)
+
+        if not remaining:
+            return approvers
 
         # Method 2: Get from approval rules configuration
         try:
-            # Get the model record for purchase.order
-            model_rec = self.env['ir.model'].search([
-                ('model', '=', 'purchase.order')
-            ], limit=1)
-
-            if model_rec:
-                # Find applicable approval rules
-                rules = self.env['studio.approval.rule'].search([
-                    ('model_id', '=', model_rec.id),
-                    ('active', '=', True)
-                ])
-
-                for rule in rules:
-                    # Check if rule applies to this record based on domain
-                    if rule.domain:
-                        try:
-                            from odoo.tools.safe_eval import safe_eval
-                            domain = safe_eval(rule.domain)
-                            # Check if this record matches the domain
-                            matching = self.search(
-                                domain + [('id', '=', self.id)])
-                            if not matching:
-                                continue
-                        except Exception as e:
-                            _logger.warning(
-                                f"Error evaluating domain for rule {rule.id}: {e}")
-                            continue
-
-                    # Get approvers from the rule via studio.approval.rule.approver
-                    rule_approvers = self.env['studio.approval.rule.approver'].search([
-                        ('rule_id', '=', rule.id)
-                    ])
-
-                    for rule_approver in rule_approvers:
-                        if rule_approver.user_id:
-                            approvers |= rule_approver.user_id
-                        if hasattr(rule_approver, 'group_id') and rule_approver.group_id:
-                            approvers |= rule_approver.group_id.users
-
+            # Rules are only cached when base_customization_studio clears
+            # the cache on their changes
+            if getattr(self.env['studio.approval.rule'], '_clears_purchase_approval_rules_cache', False):
+                rules = self._get_studio_approval_rules()
+            else:
+                rules = self._read_studio_approval_rules()
         except Exception as e:
-            import logging
-            _logger = logging.getLogger(__name__)
-            _logger.warning(f"Could not fetch approval rules: {e}")
+            _logger.warning("Could not fetch approval rules: %s", e)
+            return approvers
+
+        groups = self.env['res.groups'].browse({
+            group_id for __, __, __, group_ids in rules for group_id in group_ids
+        })
+        # Reads the users of all the groups at once
+        groups.mapped('users')
+
+        for rule_id, rule_domain, user_ids, group_ids in rules:
+            matching = remaining
+            # Check which records the rule applies to based on domain
+            if rule_domain:
+                try:
+                    domain = safe_eval(rule_domain)
+                    matching = self.search(domain + [('id', 'in', remaining.ids)])
+                except Exception as e:
+                    _logger.warning("Error evaluating domain for rule %s: %s", rule_id, e)
+                    continue
+            if not matching:
+                continue
+
+            rule_approvers = Users.browse(user_ids) | groups.browse(group_ids).users
+            for order in matching:
+                approvers[order.id] |= rule_approvers
 
         return approvers
 
+    @ormcache()
+    def _get_studio_approval_rules(self):
+        """
+        Cached _read_studio_approval_rules(), until a rule or rule approver
+        changes: the base_customization_studio module clears the cache from
+        their create, write and unlink.
+        """
+        return self._read_studio_approval_rules()
+
+    def _read_studio_approval_rules(self):
+        """
+        Active Studio approval rules of purchase orders.
+
+        Returns:
+            tuple: (rule id, domain, approver user ids, approver group ids)
+                   per rule
+        """
+        rules = self.env['studio.approval.rule'].sudo().search([
+            ('model_id.model', '=', 'purchase.order'),
+            ('active', '=', True)
+        ])
+        RuleApprover = self.env['studio.approval.rule.approver'].sudo()
+        rule_approvers = RuleApprover.search([('rule_id', 'in', rules.ids)])
+        has_group = 'group_id' in RuleApprover._fields
+        return tuple(
+            (
+                rule.id,
+                rule.domain,
+                tuple(approver.user_id.id for approver in rule_approvers
+                      if approver.rule_id == rule and approver.user_id),
+                tuple(approver.group_id.id for approver in rule_approvers
+                      if has_group and approver.rule_id == rule and approver.group_id),
+            )
+            for rule in rules
+        )
+
 
 class HrLeaveType(models.Model):
     _inherit = 'hr.leave.type'
@@ -1005,31 +1217,57 @@ class HrLeave(models.Model):
 
     def _get_responsible_for_approval(self):
         self.ensure_one()
-        responsible = self.env['res.users']
-        leave_type = self.holiday_status_id
-        threshold = leave_type.employer_approver_only_on_days
-        is_short_leave = threshold and self.number_of_days <= threshold
-        is_dual_validation = self.validation_type == 'both'
-        
-        # Determine the effective validation type
-        effective_validation_type = self.validation_type
-        # Short leaves: Manager approves (bypass HR)
-        if is_dual_validation and is_short_leave and threshold:
-            effective_validation_type = 'manager'
-        
-        # SWAPPED FLOW: HR Officer first, Manager second
-        if effective_validation_type == 'hr' or (effective_validation_type == 'both' and self.state == 'confirm'):
-            # HR Officer approves first for long leaves
-            if self.holiday_status_id.responsible_ids:
-                responsible = self.holiday_status_id.responsible_ids
-        elif effective_validation_type == 'manager' or (effective_validation_type == 'both' and self.state == 'validate1'):
-            # Manager approves: either short leaves directly OR second approval for long leaves
-            if self.employee_id.leave_manager_id:
-                responsible = self.employee_id.leave_manager_id
-            elif self.employee_id.parent_id.user_id:
-                responsible = self.employee_id.parent_id.user_id
-        
-        return responsible
+        return self._get_responsibles_for_approval()[self.id]
+
+    def _get_responsibles_for_approval(self):
+        """Users responsible for the next approval of every leave.
+
+        Leaves at the HR step get the responsibles of their leave type, those
+        at the manager step their employee's time off manager (or the user of
+        their employee's manager). Both are read for all the leaves at once
+        and resolved once per leave type and employee manager.
+
+        Returns:
+            dict: {leave id: res.users}
+        """
+        Users = self.env['res.users']
+        # Prefetch the leave types' responsibles and the employees' managers in batch
+        self.holiday_status_id.responsible_ids
+        self.employee_id.leave_manager_id
+        self.employee_id.parent_id.user_id
+
+        hr_step, manager_step = defaultdict(list), defaultdict(list)
+        responsibles = {}
+        for leave in self:
+            responsibles[leave.id] = Users
+            leave_type = leave.holiday_status_id
+            threshold = leave_type.employer_approver_only_on_days
+            is_short_leave = threshold and leave.number_of_days <= threshold
+            is_dual_validation = leave.validation_type == 'both'
+
+            # Determine the effective validation type
+            effective_validation_type = leave.validation_type
+            # Short leaves: Manager approves (bypass HR)
+            if is_dual_validation and is_short_leave and threshold:
+                effective_validation_type = 'manager'
+
+            # SWAPPED FLOW: HR Officer first, Manager second
+            if effective_validation_type == 'hr' or (effective_validation_type == 'both' and leave.state == 'confirm'):
+                # HR Officer approves first for long leaves
+                hr_step[leave_type].append(leave.id)
+            elif effective_validation_type == 'manager' or (effective_validation_type == 'both' and leave.state == 'validate1'):
+                # Manager approves: either short leaves directly OR second approval for long leaves
+                employee = leave.employee_id
+                manager_step[(employee.leave_manager_id, employee.parent_id.user_id)].append(leave.id)
+
+        for leave_type, leave_ids in hr_step.items():
+            for leave_id in leave_ids:
+                responsibles[leave_id] = leave_type.responsible_ids
+        for (leave_manager, parent_user), leave_ids in manager_step.items():
+            manager = leave_manager or parent_user
+            for leave_id in leave_ids:
+                responsibles[leave_id] = manager
+        return responsibles
 
     def action_approve(self, check_state=True):
         # SWAPPED FLOW:
@@ -1042,9 +1280,8 @@ class HrLeave(models.Model):
         current_employee = self.env.user.employee_id
         
         # Separate leaves based on approval flow
-        needs_hr_approval = self.env['hr.leave']      # Long leaves needing HR approval first
-        needs_manager_approval = self.env['hr.leave']  # Short leaves needing Manager approval
-        needs_standard_approval = self.env['hr.leave'] # Other validation types
+        needs_hr_approval = []       # Long leaves needing HR approval first
+        needs_direct_approval = []   # Short leaves needing Manager approval and other validation types
         
         for holiday in self:
             if holiday.validation_type == 'both':
@@ -1052,18 +1289,18 @@ class HrLeave(models.Model):
                 is_short_leave = threshold and holiday.number_of_days <= threshold
                 if is_short_leave:
                     # Short leave: Manager approves directly (bypass HR)
-                    needs_manager_approval |= holiday
+                    needs_direct_approval.append(holiday.id)
                 else:
                     # Long leave: HR Officer approves first
-                    needs_hr_approval |= holiday
+                    needs_hr_approval.append(holiday.id)
             else:
-                needs_standard_approval |= holiday
+                needs_direct_approval.append(holiday.id)
         
         # SWAPPED: Long leaves go to validate1 (HR Officer first approval)
-        needs_hr_approval.write({'state': 'validate1', 'first_approver_id': current_employee.id})
+        self.browse(needs_hr_approval).write({'state': 'validate1', 'first_approver_id': current_employee.id})
         
         # Short leaves and other types go directly to validate
-        (needs_manager_approval | needs_standard_approval).action_validate(check_state)
+        self.browse(needs_direct_approval).action_validate(check_state)
         
         if not self.env.context.get('leave_fast_create'):
             self.activity_update()
@@ -1144,8 +1381,7 @@ class HrLeave(models.Model):
         if check_state and any(holiday.state not in ['confirm', 'validate1'] and holiday.validation_type != 'no_validation' for holiday in self):
             raise UserError(_('Time off request must be confirmed in order to approve it.'))
     
-        self.write({'state': 'validate'})
-    
+        first_approved, second_approved = [], []
         for leave in self:
             threshold = leave.holiday_status_id.employer_approver_only_on_days
             is_short_leave = threshold and leave.number_of_days <= threshold
@@ -1153,17 +1389,21 @@ class HrLeave(models.Model):
             if leave.validation_type == 'both':
                 if is_short_leave:
                     # Short leave: Manager is the sole approver
-                    leave.first_approver_id = current_employee.id
+                    first_approved.append(leave.id)
                 elif leave.state == 'validate1':
                     # SWAPPED: Long leave coming from validate1 - Manager is second approver
-                    leave.second_approver_id = current_employee.id
+                    second_approved.append(leave.id)
                 else:
                     # Coming directly from confirm (shouldn't happen in swapped flow for long leaves)
-                    leave.first_approver_id = current_employee.id
+                    first_approved.append(leave.id)
             elif leave.validation_type == 'manager':
-                leave.first_approver_id = current_employee.id
+                first_approved.append(leave.id)
             else:  # 'hr' or 'no_validation'
-                leave.first_approver_id = current_employee.id
+                first_approved.append(leave.id)
+    
+        self.write({'state': 'validate'})
+        self.browse(first_approved).write({'first_approver_id': current_employee.id})
+        self.browse(second_approved).write({'second_approver_id': current_employee.id})
     
         self._validate_leave_request()
         if not self.env.context.get('leave_fast_create'):
@@ -1209,12 +1449,15 @@ class HrLeave(models.Model):
         if self.env.context.get('mail_activity_automation_skip'):
             return False
     
-        to_clean, to_do, to_do_confirm_activity = self.env['hr.leave'], self.env['hr.leave'], self.env['hr.leave']
+        to_clean, to_do, to_do_confirm_activity = [], [], []
         activity_vals = []
         today = fields.Date.today()
         model_id = self.env['ir.model']._get_id('hr.leave')
         confirm_activity = self.env.ref('hr_holidays.mail_act_leave_approval')
         approval_activity = self.env.ref('hr_holidays.mail_act_leave_second_approval')
+        responsibles = self.filtered(
+            lambda holiday: holiday.state in ['confirm', 'validate1']
+        ).sudo()._get_responsibles_for_approval()
         
         for holiday in self:
             if holiday.state in ['confirm', 'validate1']:
@@ -1254,9 +1497,9 @@ class HrLeave(models.Model):
                             'Manager (Second Approval) Required for %(leave_type)s',
                             leave_type=holiday.holiday_status_id.name,
                         )
-                        to_do_confirm_activity += holiday
+                        to_do_confirm_activity.append(holiday.id)
                         
-                    user_ids = holiday.sudo()._get_responsible_for_approval().ids
+                    user_ids = responsibles[holiday.id].ids
                     for user_id in user_ids:
                         date_deadline = (
                             (holiday.date_from -
@@ -1274,17 +1517,17 @@ class HrLeave(models.Model):
                             'res_model_id': model_id,
                         })
             elif holiday.state == 'validate':
-                to_do |= holiday
+                to_do.append(holiday.id)
             elif holiday.state in ['refuse', 'cancel']:
-                to_clean |= holiday
+                to_clean.append(holiday.id)
                 
-        if to_clean:
-            to_clean.activity_unlink(['hr_holidays.mail_act_leave_approval', 'hr_holidays.mail_act_leave_second_approval'])
+        # Approval activities of the processed steps are removed in batch: the
+        # approval itself is already tracked on the leave
+        if to_clean or to_do:
+            self.browse(to_clean + to_do).activity_unlink(['hr_holidays.mail_act_leave_approval', 'hr_holidays.mail_act_leave_second_approval'])
         if to_do_confirm_activity:
-            to_do_confirm_activity.activity_feedback(['hr_holidays.mail_act_leave_approval'])
-        if to_do:
-            to_do.activity_feedback(['hr_holidays.mail_act_leave_approval', 'hr_holidays.mail_act_leave_second_approval'])
-        self.env['mail.activity'].with_context(short_name=False).create(activity_vals)
+            self.browse(to_do_confirm_activity).activity_unlink(['hr_holidays.mail_act_leave_approval'])
+        self.env['mail.activity'].with_context(short_name=False, mail_activity_quick_update=True).create(activity_vals)
 
 
 class HrExpenseSheet(models.Model):
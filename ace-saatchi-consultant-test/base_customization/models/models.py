@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
 
 
 class ClientProductCeCode(models.Model):
@@ -132,22 +134,45 @@ class UserClientAssignment(models.Model):
     @api.depends('x_partner_id')
     def _compute_available_product_ids(self):
         """Get products that are assigned to this partner in CE Code lines"""
+        # Find the CE Code records of all the partners at once
+        ce_codes = self.env['base_customization.client_product_ce_code'].search([
+            ('x_partner_id', 'in', self.x_partner_id.ids)
+        ], order='id')
+        products_by_partner = {}
+        for ce_code in ce_codes:
+            # Get all products from the CE Code lines of the first CE Code record
+            products_by_partner.setdefault(
+                ce_code.x_partner_id.id,
+                ce_code.x_client_product_ce_co_line_ids.x_product_id.ids)
         for record in self:
-            if record.x_partner_id:
-                # Find the CE Code record for this partner
-                ce_code = self.env['base_customization.client_product_ce_code'].search([
-                    ('x_partner_id', '=', record.x_partner_id.id)
-                ], limit=1)
-
-                if ce_code:
-                    # Get all products from the CE Code lines
-                    product_ids = ce_code.x_client_product_ce_co_line_ids.mapped(
-                        'x_product_id').ids
-                    record.available_product_ids = [(6, 0, product_ids)]
-                else:
-                    record.available_product_ids = [(5, 0, 0)]  # Clear
+            product_ids = products_by_partner.get(record.x_partner_id.id)
+            if product_ids:
+                record.available_product_ids = [(6, 0, product_ids)]
             else:
-                record.available_product_ids = [(5, 0, 0)]
+                record.available_product_ids = [(5, 0, 0)]  # Clear
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._sync_client_product_index()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'user_id', 'x_partner_id', 'x_product_ids'} & vals.keys():
+            self._sync_client_product_index()
+        return res
+
+    def unlink(self):
+        # Index rows are removed by their foreign key
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    def _sync_client_product_index(self):
+        """Rebuild the user/client/product index rows of these assignments."""
+        self.flush_recordset(['user_id', 'x_partner_id', 'x_product_ids'])
+        self.env['base_customization.user_client_product']._rebuild(self.ids)
 
     _sql_constraints = [
         ('unique_user_partner', 'UNIQUE(user_id, x_partner_id)',
@@ -155,4 +180,78 @@ class UserClientAssignment(models.Model):
     ]
 
 
+class UserClientProduct(models.Model):
+    """
+    Materialized (user, client, product) assignments.
+
+    One row per product assigned to a user for a client, or a single row
+    without product when no product is assigned. Maintained from the user
+    client assignments, so the clients and products a user can see are
+    read with an indexed lookup instead of walking the assignments.
+    """
+    _name = 'base_customization.user_client_product'
+    _description = 'User Client and Product Assignment Index'
+    _log_access = False
+
+    assignment_id = fields.Many2one(
+        'base_customization.user_client_assignment',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    user_id = fields.Many2one('res.users', required=True, ondelete='cascade')
+    partner_id = fields.Many2one('res.partner', required=True, ondelete='cascade')
+    product_tmpl_id = fields.Many2one('product.template', ondelete='cascade')
+
+    def init(self):
+        create_index(
+            self.env.cr,
+            'base_customization_user_client_product_user_partner_product_index',
+            self._table,
+            ['user_id', 'partner_id', 'product_tmpl_id'],
+        )
+        # Catch up with the assignments made before the index existed
+        self._rebuild()
+
+    @api.model
+    def _rebuild(self, assignment_ids=None):
+        """
+        Rebuild the index rows of the given assignments (all when None).
+
+        Args:
+            assignment_ids (list): base_customization.user_client_assignment ids
+        """
+        Assignment = self.env['base_customization.user_client_assignment']
+        products_field = Assignment._fields['x_product_ids']
+        if assignment_ids is None:
+            condition = SQL('TRUE')
+            self.env.cr.execute(SQL('DELETE FROM %s', SQL.identifier(self._table)))
+        else:
+            if not assignment_ids:
+                return
+            condition = SQL('a.id = ANY(%s)', list(assignment_ids))
+            self.env.cr.execute(SQL(
+                'DELETE FROM %s WHERE assignment_id = ANY(%s)',
+                SQL.identifier(self._table),
+                list(assignment_ids),
+            ))
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %(table)s (assignment_id, user_id, partner_id, product_tmpl_id)
+            SELECT a.id, a.user_id, a.x_partner_id, rel.%(product_column)s
+              FROM %(assignment_table)s a
+         LEFT JOIN %(relation)s rel ON rel.%(assignment_column)s = a.id
+             WHERE %(condition)s
+            """,
+            table=SQL.identifier(self._table),
+            assignment_table=SQL.identifier(Assignment._table),
+            relation=SQL.identifier(products_field.relation),
+            assignment_column=SQL.identifier(products_field.column1),
+            product_column=SQL.identifier(products_field.column2),
+            condition=condition,
+        ))
+        self.invalidate_model()
+        self.env.registry.clear_cache()
+
+
 # Attention, Pasok, dulo total in php
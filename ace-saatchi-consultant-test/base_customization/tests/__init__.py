@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import test_alt_currency_amount
+from . import test_leave_approval
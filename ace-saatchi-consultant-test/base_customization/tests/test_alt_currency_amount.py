@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo import Command, fields
+from odoo.tests import common, tagged
+
+from odoo.addons.base_customization.models.currency_rate_table import CurrencyRateTable
+
+
+@tagged('post_install', '-at_install')
+class TestAltCurrencyAmount(common.TransactionCase):
+    """Alt currency totals look rates up once per document, whatever its size."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.company_currency = cls.company.currency_id
+        cls.foreign_currencies = cls.env['res.currency'].with_context(active_test=False).search([
+            ('id', '!=', cls.company_currency.id),
+        ], limit=2)
+        cls.foreign_currencies.active = True
+        cls.env['res.currency.rate'].create([
+            {
+                'currency_id': currency.id,
+                'company_id': cls.company.id,
+                'name': '2000-01-01',
+                'rate': rate,
+            }
+            for currency, rate in zip(cls.foreign_currencies, (2.0, 4.0))
+        ])
+        cls.partner = cls.env['res.partner'].create({'name': 'Alt Currency Client'})
+        cls.product = cls.env['product.product'].create({'name': 'Alt Currency Service'})
+        cls.income_account = cls.env['account.account'].create({
+            'name': 'Alt Currency Revenue',
+            'code': 'ALTREV',
+            'account_type': 'income',
+        })
+
+    def _line_amounts(self, count):
+        """(fx_currency, fx_price_unit) of ``count`` lines, alternating currencies."""
+        return [
+            (self.foreign_currencies[i % 2], 100.0 + i)
+            for i in range(count)
+        ]
+
+    def _expected_total(self, line_amounts, date):
+        totals = {}
+        for currency, amount in line_amounts:
+            totals[currency] = totals.get(currency, 0.0) + amount
+        return sum(
+            currency._convert(amount, self.company_currency, self.company, date)
+            for currency, amount in totals.items()
+        )
+
+    def _assert_rate_lookups(self, record, lines, quantity_field, date):
+        """Editing lines recomputes the total with one rate query, then none."""
+        self.env['base_customization.currency_rate_table']._clear_rate_memo()
+        with patch.object(CurrencyRateTable, 'load', autospec=True, side_effect=CurrencyRateTable.load) as load:
+            lines[0].fx_price_unit += 1.0
+            record.x_alt_currency_amount
+            self.assertEqual(load.call_count, 1)
+
+            lines[-1].fx_price_unit += 1.0
+            record.x_alt_currency_amount
+            self.assertEqual(load.call_count, 1, 'Rates are memoized for the transaction')
+
+        line_amounts = [(line.fx_currency_id, line.fx_price_unit * line[quantity_field]) for line in lines]
+        self.assertAlmostEqual(
+            record.x_alt_currency_amount,
+            self._expected_total(line_amounts, date),
+        )
+
+    def test_sale_order_rate_lookups(self):
+        for count in (10, 200):
+            order = self.env['sale.order'].create({
+                'partner_id': self.partner.id,
+                'x_alt_currency_id': self.company_currency.id,
+                'order_line': [
+                    Command.create({
+                        'product_id': self.product.id,
+                        'product_uom_qty': 2,
+                        'price_unit': amount,
+                        'fx_currency_id': currency.id,
+                        'fx_price_unit': amount,
+                    })
+                    for currency, amount in self._line_amounts(count)
+                ],
+            })
+            self._assert_rate_lookups(order, order.order_line, 'product_uom_qty', order.date_order)
+
+    def test_invoice_rate_lookups(self):
+        for count in (10, 200):
+            invoice = self.env['account.move'].create({
+                'move_type': 'out_invoice',
+                'partner_id': self.partner.id,
+                'invoice_line_ids': [
+                    Command.create({
+                        'name': f'Alt currency line {i}',
+                        'account_id': self.income_account.id,
+                        'quantity': 3,
+                        'price_unit': amount,
+                        'fx_currency_id': currency.id,
+                        'fx_price_unit': amount,
+                    })
+                    for i, (currency, amount) in enumerate(self._line_amounts(count))
+                ],
+            })
+            # The alt currency of an invoice is the one of its first line
+            invoice.x_alt_currency_id = self.company_currency
+            self._assert_rate_lookups(invoice, invoice.invoice_line_ids, 'quantity', fields.Date.today())
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+
+from odoo import Command
+from odoo.tests import common, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestLeaveApproval(common.TransactionCase):
+    """Approving leaves in bulk costs the same number of queries for 50 or 500 leaves."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if 'hr.leave' not in cls.env:
+            raise unittest.SkipTest('hr_holidays is not installed')
+        cls.env = cls.env(context=dict(cls.env.context, mail_notrack=True, mail_create_nolog=True))
+
+        cls.officer = cls.env['res.users'].create({
+            'name': 'Leave Officer',
+            'login': 'leave_officer',
+            'groups_id': [Command.link(cls.env.ref('hr_holidays.group_hr_holidays_user').id)],
+        })
+        cls.manager = cls.env['res.users'].create({
+            'name': 'Leave Manager',
+            'login': 'leave_manager',
+        })
+        cls.leave_type = cls.env['hr.leave.type'].create({
+            'name': 'Bulk Approval Leave',
+            'requires_allocation': 'no',
+            'leave_validation_type': 'both',
+            'responsible_ids': [Command.link(cls.officer.id)],
+        })
+        cls.employees = cls.env['hr.employee'].create([
+            {'name': f'Bulk Leave Employee {i}', 'leave_manager_id': cls.manager.id}
+            for i in range(55)
+        ])
+        # Ten working days from a Monday, one leave per employee and day
+        first_day = datetime.date(2030, 1, 7)
+        days = [first_day + datetime.timedelta(days=offset) for offset in (0, 1, 2, 3, 4, 7, 8, 9, 10, 11)]
+        cls.leaves = cls.env['hr.leave'].create([
+            {
+                'name': 'Bulk approval',
+                'employee_id': employee.id,
+                'holiday_status_id': cls.leave_type.id,
+                'request_date_from': day,
+                'request_date_to': day,
+            }
+            for employee in cls.employees
+            for day in days
+        ])
+
+    def _approve_query_count(self, leaves):
+        self.env.flush_all()
+        self.env.invalidate_all()
+        count = self.env.cr.sql_log_count
+        leaves.action_approve()
+        self.env.flush_all()
+        return self.env.cr.sql_log_count - count
+
+    def test_bulk_first_approval(self):
+        self.assertEqual(set(self.leaves.mapped('state')), {'confirm'})
+        baseline = self._approve_query_count(self.leaves[:50])
+        count = self._approve_query_count(self.leaves[50:])
+        self.assertEqual(len(self.leaves[50:]), 500)
+        self.assertLessEqual(count, baseline + 10, 'Approving leaves must not cost queries per leave')
+
+        self.assertEqual(set(self.leaves.mapped('state')), {'validate1'})
+        activities = self.env['mail.activity'].search([
+            ('res_model', '=', 'hr.leave'),
+            ('res_id', 'in', self.leaves.ids),
+        ])
+        self.assertEqual(len(activities), 550, 'One second approval activity per leave')
+        self.assertEqual(
+            activities.activity_type_id,
+            self.env.ref('hr_holidays.mail_act_leave_second_approval'),
+        )
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+{
+    'name': "Base Customization - Studio Approvals",
+
+    'summary': "Keep the cached Studio approval rules of Base Customization up to date",
+
+    'description': """
+Clears the cached Studio approval rules of purchase orders whenever an
+approval rule or rule approver is created, modified or deleted.
+    """,
+
+    'author': "Mark Angelo S. Templanza / Elyon IT Consultant",
+    'website': "https://www.elyon-solutions.com/",
+
+    'category': 'Uncategorized',
+    'version': '18.0.0.1',
+    'license': 'LGPL-3',
+
+    'depends': ['base_customization', 'web_studio'],
+    'auto_install': True,
+
+    'data': [],
+}
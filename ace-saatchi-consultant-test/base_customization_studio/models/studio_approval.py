@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class StudioApprovalRule(models.Model):
+    _inherit = 'studio.approval.rule'
+
+    # Read by purchase.order.get_button_approvers_batch()
+    _clears_purchase_approval_rules_cache = True
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+
+class StudioApprovalRuleApprover(models.Model):
+    _inherit = 'studio.approval.rule.approver'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
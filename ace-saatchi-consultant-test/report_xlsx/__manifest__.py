@@ -6,16 +6,22 @@
     "author": "ACSONE SA/NV," "Creu Blanca," "Odoo Community Association (OCA)",
     "website": "https://github.com/OCA/reporting-engine",
     "category": "Reporting",
-    "version": "18.0.1.0.1",
+    "version": "18.0.1.1.0",
     "development_status": "Mature",
     "license": "AGPL-3",
     "external_dependencies": {"python": ["xlsxwriter", "xlrd"]},
-    "depends": ["base", "web"],
+    "depends": ["base", "web", "bus"],
+    "data": [
+        "security/ir.model.access.csv",
+        "security/report_xlsx_job_security.xml",
+        "data/ir_cron.xml",
+    ],
     "demo": ["demo/report.xml"],
     "installable": True,
     "assets": {
         "web.assets_backend": [
             "report_xlsx/static/src/js/report/action_manager_report.esm.js",
+            "report_xlsx/static/src/js/report/report_xlsx_job_service.esm.js",
         ],
     },
 }
@@ -4,8 +4,10 @@
 
 import json
 import logging
+import os
 
 from werkzeug.urls import url_decode
+from werkzeug.wsgi import wrap_file
 
 from odoo.http import (
     content_disposition,
@@ -36,6 +38,11 @@ class ReportController(ReportController):
             if data.get("context"):
                 data["context"] = json.loads(data["context"])
                 context.update(data["context"])
+            if report._is_xlsx_constant_memory(reportname):
+                path = report.with_context(**context)._render_xlsx_file(
+                    reportname, docids, data=data
+                )
+                return self._make_xlsx_file_response(path)
             xlsx = report.with_context(**context)._render_xlsx(
                 reportname, docids, data=data
             )[0]
@@ -50,6 +57,43 @@ class ReportController(ReportController):
             return request.make_response(xlsx, headers=xlsxhttpheaders)
         return super().report_routes(reportname, docids, converter, **data)
 
+    @route("/report/xlsx/async", type="json", auth="user")
+    def report_xlsx_async(self, reportname, docids=None, data=None, context=None):
+        """Queue an XLSX report and return its job, rendered by a cron."""
+        data = dict(data or {})
+        report_model = request.env["ir.actions.report"]
+        if context:
+            # Same shape as report_routes: reports read active_ids from there
+            data["context"] = context
+            report_model = report_model.with_context(**context)
+        report = report_model._get_report_from_name(reportname)
+        job = report._enqueue_xlsx(reportname, docids, data)
+        return {"job_id": job.id, "state": job.state}
+
+    def _make_xlsx_file_response(self, path):
+        """Stream a rendered workbook from disk instead of loading it in memory.
+
+        The file is unlinked right after being opened: the open handle keeps
+        it readable until the response is fully sent and closed.
+        """
+        size = os.path.getsize(path)
+        report_file = open(path, "rb")  # noqa: SIM115 - closed by the response
+        os.unlink(path)
+        xlsxhttpheaders = [
+            (
+                "Content-Type",
+                "application/vnd.openxmlformats-"
+                "officedocument.spreadsheetml.sheet",
+            ),
+            ("Content-Length", str(size)),
+        ]
+        response = request.make_response(
+            wrap_file(request.httprequest.environ, report_file),
+            headers=xlsxhttpheaders,
+        )
+        response.direct_passthrough = True
+        return response
+
     @route()
     def report_download(self, data, context=None, token=None, readonly=True):
         requestcontent = json.loads(data)
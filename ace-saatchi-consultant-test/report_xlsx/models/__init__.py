@@ -1 +1,3 @@
 from . import ir_report
+from . import report_xlsx_job
+from . import report_xlsx_cache
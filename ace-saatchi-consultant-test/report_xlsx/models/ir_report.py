@@ -15,6 +15,21 @@ class ReportAction(models.Model):
     report_type = fields.Selection(
         selection_add=[("xlsx", "XLSX")], ondelete={"xlsx": "set default"}
     )
+    xlsx_async = fields.Boolean(
+        string="Render in Background",
+        help="Render the XLSX report in a background job and notify the user "
+        "with a download link when it is ready, instead of rendering it "
+        "during the HTTP request.",
+    )
+
+    def _get_readable_fields(self):
+        return super()._get_readable_fields() | {"xlsx_async"}
+
+    def report_action(self, docids, data=None, config=True):
+        action = super().report_action(docids, data=data, config=config)
+        if self.report_type == "xlsx" and isinstance(action, dict):
+            action["xlsx_async"] = self.xlsx_async
+        return action
 
     @api.model
     def _render_xlsx(self, report_ref, docids, data):
@@ -30,6 +45,49 @@ class ReportAction(models.Model):
             report_sudo.save_xlsx_report_attachment(docids, ret[0])
         return ret
 
+    @api.model
+    def _enqueue_xlsx(self, report_ref, docids, data):
+        """Queue a background render of an XLSX report.
+
+        :return: report.xlsx.job record, possibly an identical in-flight one
+        """
+        report_sudo = self._get_report(report_ref)
+        return self.env["report.xlsx.job"]._enqueue(report_sudo, docids, data)
+
+    @api.model
+    def _is_xlsx_constant_memory(self, report_ref):
+        """Whether the report is streamed from a temporary file (constant_memory).
+
+        Render-cached reports still render in constant_memory mode, but go
+        through _render_xlsx so that the cache is read and filled.
+        """
+        report_sudo = self._get_report(report_ref)
+        report_model = self.env.get(f"report.{report_sudo.report_name}")
+        return bool(
+            report_model is not None
+            and report_model._xlsx_constant_memory
+            and not report_model._xlsx_render_cache
+        )
+
+    @api.model
+    def _render_xlsx_file(self, report_ref, docids, data):
+        """Render a constant_memory report to a temporary file.
+
+        :return: path of the .xlsx file, to be removed by the caller
+        """
+        report_sudo = self._get_report(report_ref)
+        report_model_name = f"report.{report_sudo.report_name}"
+        report_model = self.env[report_model_name]
+        path = (
+            report_model.with_context(active_model=report_sudo.model)
+            .sudo(False)
+            .create_xlsx_report_file(docids, data)  # noqa
+        )
+        if report_sudo.attachment and docids and len(docids) == 1:
+            with open(path, "rb") as report_file:
+                report_sudo.save_xlsx_report_attachment(docids, report_file.read())
+        return path
+
     @api.model
     def _get_report_from_name(self, report_name):
         res = super()._get_report_from_name(report_name)
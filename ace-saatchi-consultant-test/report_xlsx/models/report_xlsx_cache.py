@@ -0,0 +1,136 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+import logging
+
+import psycopg2
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+
+class ReportXlsxCache(models.Model):
+    """Rendered workbooks of the reports using ``_xlsx_render_cache``.
+
+    Entries are addressed by a hash of the report parameters and data
+    watermark (see ``_get_xlsx_cache_key``), so they never need to be
+    invalidated: changed data produces a new key. The least recently used
+    entries are evicted when the total size exceeds the
+    ``report_xlsx.render_cache_max_size`` system parameter (bytes).
+    """
+
+    _name = "report.xlsx.cache"
+    _description = "Rendered XLSX Report Cache"
+    _order = "last_used desc"
+
+    key = fields.Char(required=True, readonly=True)
+    report_name = fields.Char(required=True, readonly=True, index=True)
+    attachment_id = fields.Many2one("ir.attachment", readonly=True)
+    file_size = fields.Integer(readonly=True)
+    hit_count = fields.Integer(readonly=True)
+    last_used = fields.Datetime(
+        readonly=True, index=True, default=lambda self: fields.Datetime.now()
+    )
+
+    _sql_constraints = [
+        ("key_uniq", "unique(key)", "The cache key must be unique."),
+    ]
+
+    @api.model
+    def _lookup(self, key):
+        """Return the cached workbook for ``key`` and count the hit, or None."""
+        entry = self.sudo().search([("key", "=", key)], limit=1)
+        if not entry:
+            _logger.debug("XLSX render cache miss %s", key)
+            return None
+        self.env.cr.execute(
+            """
+            UPDATE report_xlsx_cache
+               SET hit_count = hit_count + 1, last_used = now() at time zone 'UTC'
+             WHERE id = %s
+            """,
+            [entry.id],
+        )
+        entry.invalidate_recordset(["hit_count", "last_used"])
+        _logger.debug("XLSX render cache hit %s", key)
+        return entry.attachment_id.raw
+
+    @api.model
+    def _store(self, key, report_name, content):
+        Cache = self.sudo()
+        try:
+            with self.env.cr.savepoint():
+                entry = Cache.create(
+                    {
+                        "key": key,
+                        "report_name": report_name,
+                        "file_size": len(content),
+                        "hit_count": 0,
+                    }
+                )
+        except psycopg2.IntegrityError:
+            # Rendered concurrently by another worker, keep theirs
+            return
+        entry.attachment_id = (
+            self.env["ir.attachment"]
+            .sudo()
+            .create(
+                {
+                    "name": f"{report_name}.xlsx",
+                    "raw": content,
+                    "res_model": self._name,
+                    "res_id": entry.id,
+                }
+            )
+        )
+        self._evict()
+
+    @api.model
+    def _evict(self):
+        """Drop the least recently used entries beyond the configured size."""
+        max_size = int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("report_xlsx.render_cache_max_size", DEFAULT_CACHE_MAX_SIZE)
+        )
+        self.env.flush_all()
+        self.env.cr.execute(
+            """
+            SELECT id
+              FROM (
+                SELECT id,
+                       SUM(file_size) OVER (ORDER BY last_used DESC, id DESC)
+                           AS cumulated_size
+                  FROM report_xlsx_cache
+              ) entries
+             WHERE cumulated_size > %s
+            """,
+            [max_size],
+        )
+        evicted = self.sudo().browse([row[0] for row in self.env.cr.fetchall()])
+        if evicted:
+            _logger.info("XLSX render cache: evicting %d entries", len(evicted))
+            # Attachments linked by res_model/res_id are removed with them
+            evicted.unlink()
+
+    @api.model
+    def _get_stats(self, report_name=None):
+        """Hit counters of the entries currently cached.
+
+        Every entry is one render (miss); each reuse counts as a hit.
+
+        :return: dict with entries, size, hits, misses and hit_rate
+        """
+        domain = [("report_name", "=", report_name)] if report_name else []
+        entries = self.sudo().search(domain)
+        hits = sum(entries.mapped("hit_count"))
+        misses = len(entries)
+        return {
+            "entries": len(entries),
+            "size": sum(entries.mapped("file_size")),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if entries else 0.0,
+        }
@@ -0,0 +1,242 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+
+from ..report.report_abstract_xlsx import REPORT_CONTEXT_KEYS
+
+_logger = logging.getLogger(__name__)
+
+# A job still running after this long is considered dead (e.g. its worker was
+# killed for exceeding the memory or time limits)
+JOB_TIMEOUT = timedelta(hours=1)
+# Renders attempted before a job that keeps dying is marked as failed
+JOB_MAX_ATTEMPTS = 3
+
+
+class ReportXlsxJob(models.Model):
+    """XLSX report rendered in the background by a cron.
+
+    Jobs are deduplicated on their parameters: queuing a report that is already
+    pending or running for the same user returns the in-flight job, and only
+    one workbook is produced.
+    """
+
+    _name = "report.xlsx.job"
+    _description = "Background XLSX Report Job"
+    _order = "id desc"
+
+    report_id = fields.Many2one(
+        "ir.actions.report", required=True, ondelete="cascade", readonly=True
+    )
+    user_id = fields.Many2one(
+        "res.users",
+        required=True,
+        ondelete="cascade",
+        readonly=True,
+        default=lambda self: self.env.user,
+    )
+    company_id = fields.Many2one(
+        "res.company",
+        required=True,
+        ondelete="cascade",
+        readonly=True,
+        default=lambda self: self.env.company,
+    )
+    docids = fields.Json(readonly=True)
+    data = fields.Json(readonly=True)
+    job_context = fields.Json(readonly=True)
+    params_hash = fields.Char(index=True, readonly=True)
+    state = fields.Selection(
+        [
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        default="pending",
+        required=True,
+        index=True,
+        readonly=True,
+    )
+    attachment_id = fields.Many2one("ir.attachment", readonly=True)
+    error = fields.Text(readonly=True)
+    attempts = fields.Integer(default=0, readonly=True)
+    date_started = fields.Datetime(readonly=True)
+
+    @api.model
+    def _params_hash(self, report, docids, data, context):
+        params = {
+            "report": report.report_name,
+            "user": self.env.user.id,
+            "company": self.env.company.id,
+            "docids": sorted(docids or []),
+            "data": data or {},
+            "context": context,
+        }
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    @api.model
+    def _enqueue(self, report, docids, data):
+        """Queue the render of ``report``, or join the identical in-flight job.
+
+        :return: report.xlsx.job record
+        """
+        context = {
+            key: self.env.context[key]
+            for key in REPORT_CONTEXT_KEYS
+            if key in self.env.context
+        }
+        params_hash = self._params_hash(report, docids, data, context)
+        Job = self.sudo()
+        job = Job.search(
+            [
+                ("params_hash", "=", params_hash),
+                ("state", "in", ("pending", "running")),
+            ],
+            limit=1,
+        )
+        if job:
+            _logger.info(
+                "XLSX report %s already queued as job %s", report.name, job.id
+            )
+            return job
+        job = Job.create(
+            {
+                "report_id": report.id,
+                "docids": docids or [],
+                "data": data or {},
+                "job_context": context,
+                "params_hash": params_hash,
+            }
+        )
+        self.env.ref("report_xlsx.ir_cron_report_xlsx_job").sudo()._trigger()
+        return job
+
+    @api.model
+    def _cron_process_jobs(self, limit=10):
+        self._recover_stale_jobs()
+        self.env.cr.commit()
+        for _i in range(limit):
+            # Each job is locked and committed on its own so that parallel
+            # cron workers never render the same report twice.
+            self.env.cr.execute(
+                """
+                SELECT id FROM report_xlsx_job
+                 WHERE state = 'pending'
+              ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+                """
+            )
+            row = self.env.cr.fetchone()
+            if not row:
+                return
+            job = self.browse(row[0])
+            # Committed before rendering: if the worker dies during the
+            # render, the job stays running until _recover_stale_jobs
+            job.write(
+                {
+                    "state": "running",
+                    "attempts": job.attempts + 1,
+                    "date_started": fields.Datetime.now(),
+                }
+            )
+            self.env.cr.commit()
+            job._run()
+            self.env.cr.commit()
+
+    @api.model
+    def _recover_stale_jobs(self):
+        """Requeue jobs whose render died, or fail them after JOB_MAX_ATTEMPTS."""
+        stale = self.search(
+            [
+                ("state", "=", "running"),
+                ("date_started", "<", fields.Datetime.now() - JOB_TIMEOUT),
+            ]
+        )
+        retry = stale.filtered(lambda job: job.attempts < JOB_MAX_ATTEMPTS)
+        retry.write({"state": "pending"})
+        for job in stale - retry:
+            _logger.warning(
+                "Background XLSX report job %s did not finish after %d attempts",
+                job.id,
+                job.attempts,
+            )
+            job.write(
+                {
+                    "state": "failed",
+                    "error": _(
+                        "The report did not finish after %s attempts.", job.attempts
+                    ),
+                }
+            )
+            job._notify_user()
+
+    def _run(self):
+        self.ensure_one()
+        report = self.report_id.with_user(self.user_id).with_context(
+            **(self.job_context or {}),
+            allowed_company_ids=self._allowed_company_ids(),
+        )
+        try:
+            with self.env.cr.savepoint():
+                content = report._render_xlsx(
+                    report.report_name, self.docids or None, data=self.data
+                )[0]
+                attachment = (
+                    self.env["ir.attachment"]
+                    .sudo()
+                    .create(
+                        {
+                            "name": f"{report.name}.xlsx",
+                            "raw": content,
+                            "res_model": self._name,
+                            "res_id": self.id,
+                            "mimetype": "application/vnd.openxmlformats-"
+                            "officedocument.spreadsheetml.sheet",
+                        }
+                    )
+                )
+        except Exception as e:
+            _logger.exception("Background XLSX report job %s failed", self.id)
+            self.write({"state": "failed", "error": str(e)})
+        else:
+            self.write({"state": "done", "attachment_id": attachment.id})
+        self._notify_user()
+
+    def _allowed_company_ids(self):
+        allowed = (self.job_context or {}).get("allowed_company_ids")
+        allowed = allowed or [self.company_id.id]
+        return [cid for cid in allowed if cid in self.user_id.company_ids.ids]
+
+    def _notify_user(self):
+        self.ensure_one()
+        payload = {
+            "job_id": self.id,
+            "report_name": self.report_id.name,
+            "state": self.state,
+        }
+        if self.state == "done":
+            payload["url"] = f"/web/content/{self.attachment_id.id}?download=true"
+            payload["message"] = _("%s is ready.", self.report_id.name)
+        else:
+            payload["message"] = _("%s could not be generated.", self.report_id.name)
+        self.user_id._bus_send("report_xlsx_job", payload)
+
+    @api.autovacuum
+    def _gc_jobs(self):
+        """Remove finished jobs, and their workbooks, after a week."""
+        jobs = self.search(
+            [
+                ("state", "in", ("done", "failed")),
+                ("write_date", "<", fields.Datetime.now() - timedelta(days=7)),
+            ]
+        )
+        jobs.attachment_id.unlink()
+        jobs.unlink()
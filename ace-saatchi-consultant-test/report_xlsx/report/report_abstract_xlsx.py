@@ -1,14 +1,28 @@
 # Copyright 2015 ACSONE SA/NV (<http://acsone.eu>)
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
+import hashlib
+import json
 import logging
+import os
 import re
+import tempfile
 from io import BytesIO
 
 from odoo import models
 
 _logger = logging.getLogger(__name__)
 
+# Context keys that change the rendered workbook; the rest of the web client
+# context is left out of job and cache keys.
+REPORT_CONTEXT_KEYS = (
+    "lang",
+    "tz",
+    "allowed_company_ids",
+    "active_model",
+    "active_ids",
+)
+
 try:
     import xlsxwriter
 
@@ -69,6 +83,18 @@ class ReportXlsxAbstract(models.AbstractModel):
     _name = "report.report_xlsx.abstract"
     _description = "Abstract XLSX Report"
 
+    # Set to True on reports producing large workbooks: they are rendered in
+    # constant_memory mode to a temporary file and streamed from disk.
+    _xlsx_constant_memory = False
+
+    # Set to True to keep rendered workbooks in report.xlsx.cache: a report is
+    # rendered again only when its parameters or data watermark change.
+    _xlsx_render_cache = False
+
+    # Named styles of the report: {name: xlsxwriter format properties}.
+    # Get them with _get_style(workbook, name).
+    _xlsx_styles = {}
+
     def _get_objs_for_report(self, docids, data):
         """
         Returns objects for xlx report.  From WebUI these
@@ -91,6 +117,24 @@ class ReportXlsxAbstract(models.AbstractModel):
             ids = self.env.context.get("active_ids", [])
         return self.env[self.env.context.get("active_model")].browse(ids)
 
+    def _get_format(self, workbook, properties=None):
+        """Return the workbook format for ``properties``, creating it once.
+
+        Formats are shared per workbook by their property dict, so asking for
+        the same style for every customer, currency or month adds a single
+        format to styles.xml. Shared formats must not be modified afterwards
+        (``format.set_*``); ask for a format with the new properties instead.
+        """
+        registry = workbook.__dict__.setdefault("_report_xlsx_formats", {})
+        key = tuple(sorted((properties or {}).items()))
+        if key not in registry:
+            registry[key] = workbook.add_format(dict(key))
+        return registry[key]
+
+    def _get_style(self, workbook, name, **overrides):
+        """Return the format of the named style, with optional extra properties."""
+        return self._get_format(workbook, {**self._xlsx_styles[name], **overrides})
+
     def _report_xlsx_currency_format(self, currency):
         """Get the format to be used in cells (symbol included).
         Used in account_financial_report addon"""
@@ -99,13 +143,97 @@ class ReportXlsxAbstract(models.AbstractModel):
         return f"{f'{s_before}'}#,##0.{'0' * currency.decimal_places}{f'{s_after}'}"
 
     def create_xlsx_report(self, docids, data):
+        cache_key = self._xlsx_render_cache and self._get_xlsx_cache_key(
+            docids, data
+        )
+        if cache_key:
+            content = self.env["report.xlsx.cache"]._lookup(cache_key)
+            if content is not None:
+                return content, "xlsx"
+        content = self._render_xlsx_content(docids, data)
+        if cache_key:
+            self.env["report.xlsx.cache"]._store(cache_key, self._name, content)
+        return content, "xlsx"
+
+    def _render_xlsx_content(self, docids, data):
+        if self._xlsx_constant_memory:
+            path = self.create_xlsx_report_file(docids, data)
+            try:
+                with open(path, "rb") as report_file:
+                    return report_file.read()
+            finally:
+                os.unlink(path)
         objs = self._get_objs_for_report(docids, data)
         file_data = BytesIO()
         workbook = xlsxwriter.Workbook(file_data, self.get_workbook_options())
         self.generate_xlsx_report(workbook, data, objs)
         workbook.close()
-        file_data.seek(0)
-        return file_data.read(), "xlsx"
+        return file_data.getvalue()
+
+    def _get_xlsx_cache_key(self, docids, data):
+        """Key of the rendered workbook in report.xlsx.cache.
+
+        Built from the report, the user and companies, the report parameters
+        and the data watermark. Returns None to bypass the cache.
+        """
+        watermark = self._get_xlsx_cache_watermark(docids, data)
+        if watermark is None:
+            return None
+        data = dict(data or {})
+        if isinstance(data.get("context"), dict):
+            data["context"] = {
+                key: data["context"][key]
+                for key in REPORT_CONTEXT_KEYS
+                if key in data["context"]
+            }
+        params = {
+            "report": self._name,
+            "user": self.env.uid,
+            "companies": self.env.companies.ids,
+            "lang": self.env.lang,
+            "docids": sorted(docids or []),
+            "data": data,
+            "watermark": watermark,
+        }
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _get_xlsx_cache_watermark(self, docids, data):
+        """Value changing whenever the data behind the report changes.
+
+        Defaults to the last update of the printed records. Reports reading
+        other data must override it; return None to disable caching.
+        """
+        objs = self._get_objs_for_report(docids, data)
+        if "write_date" not in objs._fields:
+            return None
+        return [objs.ids, max(objs.mapped("write_date"), default=None)]
+
+    def create_xlsx_report_file(self, docids, data):
+        """
+        Render the report into a temporary file in xlsxwriter's
+        ``constant_memory`` mode: rows are flushed to disk as they are
+        written, so the worker never holds the whole workbook.
+
+        Rows must then be written in order, one sheet after the other
+        (see https://xlsxwriter.readthedocs.io/working_with_memory.html).
+
+        :return: path of the .xlsx file, to be removed by the caller
+        """
+        objs = self._get_objs_for_report(docids, data)
+        with tempfile.NamedTemporaryFile(
+            prefix="report_xlsx_", suffix=".xlsx", delete=False
+        ) as report_file:
+            path = report_file.name
+        try:
+            options = {**self.get_workbook_options(), "constant_memory": True}
+            workbook = xlsxwriter.Workbook(path, options)
+            self.generate_xlsx_report(workbook, data, objs)
+            workbook.close()
+        except Exception:
+            os.unlink(path)
+            raise
+        return path
 
     def get_workbook_options(self):
         """
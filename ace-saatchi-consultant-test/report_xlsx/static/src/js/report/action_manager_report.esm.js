@@ -1,5 +1,7 @@
+import {_t} from "@web/core/l10n/translation";
 import {download} from "@web/core/network/download";
 import {registry} from "@web/core/registry";
+import {rpc} from "@web/core/network/rpc";
 import {user} from "@web/core/user";
 
 registry
@@ -24,17 +26,35 @@ registry
                     url += `?context=${context}`;
                 }
             }
-            env.services.ui.block();
-            try {
-                await download({
-                    url: "/report/download",
-                    data: {
-                        data: JSON.stringify([url, action.report_type]),
-                        context: JSON.stringify(user.context),
-                    },
+            if (action.xlsx_async) {
+                // Rendered by a cron, the user is notified when it is ready
+                const hasData = action.data && JSON.stringify(action.data) !== "{}";
+                await rpc("/report/xlsx/async", {
+                    reportname: action.report_name,
+                    docids: hasData ? null : actionContext.active_ids || null,
+                    data: hasData ? action.data : {},
+                    context: {...user.context, ...actionContext},
                 });
-            } finally {
-                env.services.ui.unblock();
+                env.services.notification.add(
+                    _t(
+                        "%s is being generated. You will be notified when it is ready.",
+                        action.name
+                    ),
+                    {type: "info"}
+                );
+            } else {
+                env.services.ui.block();
+                try {
+                    await download({
+                        url: "/report/download",
+                        data: {
+                            data: JSON.stringify([url, action.report_type]),
+                            context: JSON.stringify(user.context),
+                        },
+                    });
+                } finally {
+                    env.services.ui.unblock();
+                }
             }
             const onClose = options.onClose;
             if (action.close_on_report_download) {
@@ -0,0 +1,31 @@
+import {_t} from "@web/core/l10n/translation";
+import {registry} from "@web/core/registry";
+
+export const reportXlsxJobService = {
+    dependencies: ["bus_service", "notification"],
+    start(env, {bus_service, notification}) {
+        bus_service.subscribe("report_xlsx_job", (payload) => {
+            if (payload.state !== "done") {
+                notification.add(payload.message, {type: "danger", sticky: true});
+                return;
+            }
+            const close = notification.add(payload.message, {
+                type: "success",
+                sticky: true,
+                buttons: [
+                    {
+                        name: _t("Download"),
+                        primary: true,
+                        onClick: () => {
+                            window.location.href = payload.url;
+                            close();
+                        },
+                    },
+                ],
+            });
+        });
+        bus_service.start();
+    },
+};
+
+registry.category("services").add("report_xlsx_job", reportXlsxJobService);
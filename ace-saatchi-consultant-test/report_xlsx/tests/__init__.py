@@ -1 +1,3 @@
 from . import test_report
+from . import test_report_memory
+from . import test_report_benchmark
@@ -0,0 +1,120 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+"""Benchmark harness for XLSX reports.
+
+Renders a report and records its wall time, SQL query count, peak Python
+memory and output size. Results are written as JSON so that two versions can
+be diffed::
+
+    bench = XlsxReportBenchmark(env)
+    bench.run("report_xlsx.partner_xlsx", partners.ids, label="1k")
+    bench.write({"scale": 1000})
+
+Environment variables:
+
+- ``REPORT_XLSX_BENCHMARK_OUTPUT``: JSON file to write the results to
+- ``REPORT_XLSX_BENCHMARK_PROFILE``: directory receiving one cProfile dump
+  (``.prof``) per run
+"""
+
+import cProfile
+import json
+import logging
+import os
+import platform
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from odoo import release
+
+_logger = logging.getLogger(__name__)
+
+
+class XlsxReportBenchmark:
+    def __init__(self, env, output_path=None, profile_dir=None):
+        self.env = env
+        self.output_path = output_path or os.environ.get(
+            "REPORT_XLSX_BENCHMARK_OUTPUT"
+        )
+        self.profile_dir = profile_dir or os.environ.get(
+            "REPORT_XLSX_BENCHMARK_PROFILE"
+        )
+        self.results = []
+
+    def run(self, report_name, docids=None, data=None, label=None):
+        """Render ``report_name`` once and record its measures.
+
+        The render cache is bypassed so that every run really renders.
+
+        :return: dict of the measures of this run
+        """
+        report = self.env["ir.actions.report"]._get_report_from_name(report_name)
+        report_model = self.env[f"report.{report_name}"]
+        label = label or report_name
+        self.env.flush_all()
+        self.env.invalidate_all()
+        cr = self.env.cr
+        profiler = cProfile.Profile() if self.profile_dir else None
+
+        with patch.object(type(report_model), "_xlsx_render_cache", False):
+            queries_before = cr.sql_log_count
+            tracemalloc.start()
+            start = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            try:
+                content = (
+                    report.with_context(active_model=report.model)
+                    ._render_xlsx(report_name, docids, data=data or {})[0]
+                )
+            finally:
+                if profiler:
+                    profiler.disable()
+                wall_time = time.perf_counter() - start
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            query_count = cr.sql_log_count - queries_before
+
+        result = {
+            "report": report_name,
+            "label": label,
+            "records": len(docids or (data or {}).get("move_line_ids", [])),
+            "wall_time": round(wall_time, 4),
+            "query_count": query_count,
+            "peak_memory": peak_memory,
+            "output_size": len(content),
+        }
+        if profiler:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile_path = os.path.join(
+                self.profile_dir, f"{report_name}-{label}.prof".replace("/", "_")
+            )
+            profiler.dump_stats(profile_path)
+            result["profile"] = profile_path
+        _logger.info(
+            "XLSX benchmark %s [%s]: %.3fs, %d queries, %d KiB peak, %d KiB output",
+            report_name,
+            label,
+            wall_time,
+            query_count,
+            peak_memory // 1024,
+            len(content) // 1024,
+        )
+        self.results.append(result)
+        return result
+
+    def write(self, metadata=None):
+        """Write the results to the JSON output file, if one is configured."""
+        if not self.output_path:
+            return None
+        payload = {
+            "odoo_version": release.version,
+            "python_version": platform.python_version(),
+            "database": self.env.cr.dbname,
+            "metadata": metadata or {},
+            "results": self.results,
+        }
+        with open(self.output_path, "w") as output:
+            json.dump(payload, output, indent=2, sort_keys=True, default=str)
+        _logger.info("XLSX benchmark results written to %s", self.output_path)
+        return self.output_path
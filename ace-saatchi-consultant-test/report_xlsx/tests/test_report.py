@@ -2,9 +2,15 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
 import logging
+from datetime import timedelta
+from io import BytesIO
+from unittest.mock import patch
 
+from odoo import fields
 from odoo.tests import common
 
+from ..models.report_xlsx_job import JOB_MAX_ATTEMPTS, JOB_TIMEOUT
+
 _logger = logging.getLogger(__name__)
 
 try:
@@ -12,6 +18,11 @@ try:
 except ImportError:
     _logger.debug("Can not import xlrd`.")
 
+try:
+    import xlsxwriter
+except ImportError:
+    _logger.debug("Can not import xlsxwriter`.")
+
 
 class TestReport(common.TransactionCase):
     def setUp(self):
@@ -73,3 +84,98 @@ class TestReport(common.TransactionCase):
         self.assertEqual(
             self.xlsx_report._report_xlsx_currency_format(eur), "#,##0.00 €"
         )
+
+    def test_async_job(self):
+        self.report.xlsx_async = True
+        report = self.report_object.with_context(active_model="res.partner")
+        job = report._enqueue_xlsx(self.report_name, self.docs.ids, {})
+        self.assertEqual(job.state, "pending")
+        # Identical request while the first one is queued: same job
+        same_job = report._enqueue_xlsx(self.report_name, self.docs.ids, {})
+        self.assertEqual(same_job, job)
+        job._run()
+        self.assertEqual(job.state, "done")
+        wb = open_workbook(file_contents=job.attachment_id.raw)
+        self.assertEqual(wb.sheet_by_index(0).cell(0, 0).value, self.docs.name)
+        # Once done, a new request renders again
+        new_job = report._enqueue_xlsx(self.report_name, self.docs.ids, {})
+        self.assertNotEqual(new_job, job)
+
+    def test_async_job_stale(self):
+        report = self.env["ir.actions.report"]
+        job = report._enqueue_xlsx(self.report_name, self.docs.ids, {})
+        # The worker died during the render: the job stays running
+        started = fields.Datetime.now() - JOB_TIMEOUT - timedelta(minutes=1)
+        job.write({"state": "running", "attempts": 1, "date_started": started})
+        self.env["report.xlsx.job"]._recover_stale_jobs()
+        self.assertEqual(job.state, "pending")
+        job.write(
+            {
+                "state": "running",
+                "attempts": JOB_MAX_ATTEMPTS,
+                "date_started": started,
+            }
+        )
+        self.env["report.xlsx.job"]._recover_stale_jobs()
+        self.assertEqual(job.state, "failed")
+
+    def test_async_report_action(self):
+        self.report.xlsx_async = True
+        action = self.report.report_action(self.docs)
+        self.assertTrue(action["xlsx_async"])
+
+    def _patch_render_cache(self):
+        report_cls = type(self.env[f"report.{self.report_name}"])
+        self.patch(report_cls, "_xlsx_render_cache", True)
+        return patch.object(
+            report_cls,
+            "generate_xlsx_report",
+            autospec=True,
+            side_effect=report_cls.generate_xlsx_report,
+        )
+
+    def test_render_cache(self):
+        with self._patch_render_cache() as generate:
+            for _i in range(10):
+                rep = self.report_object._render(self.report_name, self.docs.ids, {})
+            self.assertEqual(generate.call_count, 1)
+            wb = open_workbook(file_contents=rep[0])
+            self.assertEqual(wb.sheet_by_index(0).cell(0, 0).value, self.docs.name)
+            stats = self.env["report.xlsx.cache"]._get_stats(
+                f"report.{self.report_name}"
+            )
+            self.assertEqual((stats["hits"], stats["misses"]), (9, 1))
+            # New data watermark: rendered again
+            self.docs.name = f"{self.docs.name} (changed)"
+            self.env.flush_all()
+            self.report_object._render(self.report_name, self.docs.ids, {})
+            self.assertEqual(generate.call_count, 2)
+
+    def test_render_cache_eviction(self):
+        self.env["ir.config_parameter"].set_param(
+            "report_xlsx.render_cache_max_size", 1
+        )
+        with self._patch_render_cache():
+            self.report_object._render(self.report_name, self.docs.ids, {})
+        self.assertFalse(
+            self.env["report.xlsx.cache"].search(
+                [("report_name", "=", f"report.{self.report_name}")]
+            )
+        )
+
+    def test_format_registry(self):
+        workbook = xlsxwriter.Workbook(BytesIO(), {"in_memory": True})
+        report = self.xlsx_report
+        self.patch(
+            type(report), "_xlsx_styles", {"amount": {"num_format": "#,##0.00"}}
+        )
+        bold = report._get_format(workbook, {"bold": True, "border": 1})
+        format_count = len(workbook.formats)
+        for _i in range(100):
+            self.assertIs(
+                report._get_format(workbook, {"border": 1, "bold": True}), bold
+            )
+            report._get_style(workbook, "amount")
+            report._get_style(workbook, "amount", bold=True)
+        self.assertEqual(len(workbook.formats), format_count + 2)
+        workbook.close()
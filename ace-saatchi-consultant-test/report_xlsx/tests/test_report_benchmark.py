@@ -0,0 +1,33 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+import json
+import os
+import tempfile
+
+from odoo.tests import common
+
+from .benchmark import XlsxReportBenchmark
+
+
+class TestReportBenchmark(common.TransactionCase):
+    def test_benchmark_results(self):
+        partners = self.env["res.partner"].create(
+            [{"name": f"Benchmark Partner {i}"} for i in range(20)]
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_path = os.path.join(tmpdir, "results.json")
+            bench = XlsxReportBenchmark(
+                self.env, output_path=output_path, profile_dir=tmpdir
+            )
+            result = bench.run("report_xlsx.partner_xlsx", partners.ids, label="20")
+            self.assertEqual(result["records"], 20)
+            self.assertGreater(result["query_count"], 0)
+            self.assertGreater(result["peak_memory"], 0)
+            self.assertGreater(result["output_size"], 0)
+            self.assertTrue(os.path.exists(result["profile"]))
+
+            bench.write({"scale": 20})
+            with open(output_path) as output:
+                payload = json.load(output)
+        self.assertEqual(payload["metadata"], {"scale": 20})
+        self.assertEqual(payload["results"], [result])
@@ -0,0 +1,81 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+import logging
+import os
+import tracemalloc
+from unittest.mock import patch
+
+from odoo.tests import common
+
+_logger = logging.getLogger(__name__)
+
+try:
+    from xlrd import open_workbook
+except ImportError:
+    _logger.debug("Can not import xlrd`.")
+
+ROWS = 20000
+COLS = 10
+
+
+def _generate_large_workbook(self, workbook, data, objs):
+    sheet = workbook.add_worksheet("Large")
+    for row in range(ROWS):
+        for col in range(COLS):
+            sheet.write(row, col, f"cell {row}-{col}")
+
+
+class TestReportMemory(common.TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.report_name = "report_xlsx.partner_xlsx"
+        self.report_model = self.env[f"report.{self.report_name}"]
+        self.docs = self.env["res.company"].search([], limit=1).partner_id
+
+    def _peak_memory(self, constant_memory):
+        report_cls = type(self.report_model)
+        with patch.object(
+            report_cls, "generate_xlsx_report", _generate_large_workbook
+        ), patch.object(report_cls, "_xlsx_constant_memory", constant_memory):
+            tracemalloc.start()
+            try:
+                if constant_memory:
+                    path = self.report_model.create_xlsx_report_file(
+                        self.docs.ids, {}
+                    )
+                else:
+                    content = self.report_model.create_xlsx_report(
+                        self.docs.ids, {}
+                    )[0]
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        if constant_memory:
+            self.addCleanup(os.unlink, path)
+            with open(path, "rb") as report_file:
+                content = report_file.read()
+        return peak, content
+
+    def test_constant_memory_peak(self):
+        in_memory_peak, in_memory_content = self._peak_memory(False)
+        streamed_peak, streamed_content = self._peak_memory(True)
+        _logger.info(
+            "XLSX peak memory for %d rows: in-memory %d KiB, constant_memory %d KiB",
+            ROWS,
+            in_memory_peak // 1024,
+            streamed_peak // 1024,
+        )
+        self.assertLess(streamed_peak, in_memory_peak / 2)
+        for content in (in_memory_content, streamed_content):
+            sheet = open_workbook(file_contents=content).sheet_by_index(0)
+            self.assertEqual(sheet.nrows, ROWS)
+            self.assertEqual(sheet.cell(ROWS - 1, COLS - 1).value, "cell 19999-9")
+
+    def test_constant_memory_render(self):
+        report_cls = type(self.report_model)
+        with patch.object(report_cls, "_xlsx_constant_memory", True):
+            rep = self.env["ir.actions.report"]._render(
+                self.report_name, self.docs.ids, {}
+            )
+        sheet = open_workbook(file_contents=rep[0]).sheet_by_index(0)
+        self.assertEqual(sheet.cell(0, 0).value, self.docs.name)
@@ -3,4 +3,6 @@
 from . import models
 from . import inherited_models
 from . import opening_balance
-from . import reversal_opening_balance
\ No newline at end of file
+from . import reversal_opening_balance
+from . import balance_snapshot
+
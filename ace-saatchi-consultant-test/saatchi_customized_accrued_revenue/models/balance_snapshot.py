@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""
+Monthly Balance Snapshot for Accrued Revenue
+============================================
+
+Stores the closing balance of the accrued revenue account per partner and
+normalized CE# at each month-end, so that multi-month accrued revenue
+reports do not rescan the whole ledger for every month they print.
+
+Build Logic:
+- A month is built from the previous month's snapshot plus the posted
+  movements dated inside the month (carry-forward)
+- When no previous snapshot exists, the month is built from scratch with
+  one aggregate query over the ledger up to the month-end
+
+Invalidation:
+- Only the accounts the report reads are tracked: the configured accrued
+  revenue accounts (and their same-named accounts in other companies) and
+  every account a snapshot was built for
+- Posting or resetting a move on a tracked account bumps the ledger version
+  of its company and account and drops their snapshots from the month of
+  the move onwards, since every later closing balance carries the changed
+  amount forward; earlier months are re-tagged to the new version and keep
+  serving as carry-forward base
+- Snapshots record the ledger version they were built from and are only
+  read at the current version: a snapshot built concurrently with a post,
+  from a ledger state that did not include it yet, is never used
+- Rows are inserted with ON CONFLICT DO NOTHING against a unique index, so
+  concurrent builds of the same month cannot duplicate balances
+"""
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.sql import create_unique_index
+from dateutil.relativedelta import relativedelta
+from collections import defaultdict
+import re
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class SaatchiAccruedRevenueBalanceSnapshot(models.Model):
+    """
+    Closing balance of one partner/CE# on the accrued revenue account at a
+    month-end.
+
+    Key Fields:
+    - month_end: The month-end date this closing balance represents
+    - ce_code: Normalized CE# ('NO_CE' for lines without a CE code)
+    - balance: Cumulative debit - credit up to and including month_end
+    - first_move_date: Date of the oldest posted line in the cumulative balance
+    """
+    _name = 'saatchi.accrued_revenue_balance_snapshot'
+    _description = 'Accrued Revenue Monthly Balance Snapshot'
+    _rec_name = 'ce_code'
+    _order = 'month_end desc, ce_code asc'
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        index=True,
+        ondelete='cascade',
+    )
+
+    account_id = fields.Many2one(
+        'account.account',
+        string='Account',
+        required=True,
+        index=True,
+        ondelete='cascade',
+    )
+
+    month_end = fields.Date(
+        string='Month-End',
+        required=True,
+        index=True,
+    )
+
+    partner_id = fields.Many2one(
+        'res.partner',
+        string='Client',
+    )
+
+    ce_code = fields.Char(
+        string='CE# (Normalized)',
+        index=True,
+    )
+
+    balance = fields.Float(
+        string='Closing Balance',
+        digits=(16, 2),
+    )
+
+    first_move_date = fields.Date(
+        string='First Move Date',
+        help='Date of the oldest posted line included in the closing balance. '
+             'Used to tell whether the CE# has history before the opening '
+             'balance cutoff date.'
+    )
+
+    version = fields.Integer(
+        string='Ledger Version',
+        required=True,
+        default=0,
+        help='Ledger version of the company/account the snapshot was built from. '
+             'Snapshots of an older version are stale.'
+    )
+
+    def init(self):
+        create_unique_index(
+            self.env.cr,
+            'saatchi_accrued_revenue_balance_snapshot_unique',
+            self._table,
+            ['company_id', 'account_id', 'month_end', 'version',
+             'COALESCE(partner_id, 0)', "COALESCE(ce_code, '')"],
+        )
+
+    # ========== Helper Methods ==========
+
+    @api.model
+    def _normalize_ce_code(self, ce_code):
+        """Uppercase and strip all whitespace, same as the opening balance models."""
+        if not ce_code:
+            return ''
+        return re.sub(r'\s+', '', ce_code.strip().upper())
+
+    @api.model
+    def get_closing_balances(self, account_ids, month_end, companies=None):
+        """
+        Retrieve the closing balances at a month-end, building any missing
+        snapshot first.
+
+        Args:
+            account_ids (list): Accrued revenue account IDs
+            month_end (date): Last day of the month
+            companies (res.company): Companies to include (default: allowed companies)
+
+        Returns:
+            list: [(partner_name, normalized_ce_code, balance, first_move_date)]
+        """
+        companies = companies if companies is not None else self.env.companies
+        snapshots = self.sudo().browse()
+        for account in self.env['account.account'].sudo().browse(account_ids):
+            for company in companies & account.company_ids:
+                snapshots |= self._get_or_build_snapshot(company, account, month_end)
+
+        return [
+            (snap.partner_id.name, snap.ce_code, snap.balance, snap.first_move_date)
+            for snap in snapshots
+        ]
+
+    @api.model
+    def _get_or_build_snapshot(self, company, account, month_end):
+        """Return the snapshot records for (company, account, month_end), building them if missing."""
+        Snapshot = self.sudo()
+        version = self.env['saatchi.accrued_revenue_snapshot_version']._register(company, account)
+        domain = [
+            ('company_id', '=', company.id),
+            ('account_id', '=', account.id),
+            ('month_end', '=', month_end),
+            ('version', '=', version),
+        ]
+        snapshots = Snapshot.search(domain)
+        if snapshots:
+            return snapshots
+
+        # Carry forward from the previous month when it is available
+        prev_month_end = month_end.replace(day=1) - relativedelta(days=1)
+        previous = Snapshot.search([
+            ('company_id', '=', company.id),
+            ('account_id', '=', account.id),
+            ('month_end', '=', prev_month_end),
+            ('version', '=', version),
+        ])
+
+        totals = defaultdict(lambda: [0.0, False])
+        date_from = False
+        if previous:
+            date_from = prev_month_end
+            for snap in previous:
+                totals[(snap.partner_id.id, snap.ce_code)] = [snap.balance, snap.first_move_date]
+
+        for partner_id, ce_code, balance, first_date in self._query_movements(
+                company, account, date_from, month_end):
+            key = (partner_id or False, self._normalize_ce_code(ce_code or 'NO_CE'))
+            entry = totals[key]
+            entry[0] += balance
+            if first_date and (not entry[1] or first_date < entry[1]):
+                entry[1] = first_date
+
+        _logger.debug(
+            'Building accrued revenue balance snapshot for %s (account %s, company %s): '
+            '%d row(s), %s',
+            month_end, account.id, company.id, len(totals),
+            'carried forward' if previous else 'from scratch'
+        )
+
+        if totals:
+            # A concurrent build of the same month and version inserts the
+            # same rows: keep whichever is committed first
+            self.env.cr.execute(SQL(
+                """
+                INSERT INTO %s (company_id, account_id, month_end, version, partner_id, ce_code,
+                                balance, first_move_date, create_uid, create_date, write_uid, write_date)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+                """,
+                SQL.identifier(self._table),
+                SQL(', ').join(
+                    SQL(
+                        "(%s, %s, %s, %s, %s, %s, %s, %s, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')",
+                        company.id, account.id, month_end, version, partner_id or None, ce_code,
+                        balance, first_date or None, self.env.uid, self.env.uid,
+                    )
+                    for (partner_id, ce_code), (balance, first_date) in totals.items()
+                ),
+            ))
+        return Snapshot.search(domain)
+
+    @api.model
+    def _query_movements(self, company, account, date_from, date_to):
+        """
+        Aggregate posted lines of one account/company in (date_from, date_to].
+
+        Returns:
+            list: [(partner_id, ce_code, balance, first_move_date)]
+        """
+        self.env['account.move.line'].flush_model([
+            'account_id', 'company_id', 'date', 'parent_state', 'partner_id',
+            'x_ce_code', 'debit', 'credit',
+        ])
+        date_from_condition = (
+            SQL("AND aml.date > %s", date_from) if date_from else SQL()
+        )
+        self.env.cr.execute(SQL(
+            """
+            SELECT aml.partner_id,
+                   aml.x_ce_code,
+                   SUM(COALESCE(aml.debit, 0) - COALESCE(aml.credit, 0)),
+                   MIN(aml.date)
+              FROM account_move_line aml
+             WHERE aml.account_id = %(account_id)s
+               AND aml.company_id = %(company_id)s
+               AND aml.date <= %(date_to)s
+               AND aml.parent_state = 'posted'
+               %(date_from_condition)s
+          GROUP BY aml.partner_id, aml.x_ce_code
+            """,
+            account_id=account.id,
+            company_id=company.id,
+            date_to=date_to,
+            date_from_condition=date_from_condition,
+        ))
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _invalidate_for_moves(self, moves):
+        """
+        Invalidate the snapshots affected by posting or resetting the given
+        moves: for each tracked account the moves touch, bump the ledger
+        version of the move's company and account, drop the snapshots on or
+        after the move date and re-tag the earlier ones to the new version.
+
+        Moves on other accounts (receivable, tax, bank, ...) touch nothing,
+        so they do not contend on the version rows.
+        """
+        account_ids = self._get_tracked_account_ids()
+        earliest = {}
+        for move in moves:
+            if not move.date:
+                continue
+            for account in move.line_ids.account_id:
+                if account.id not in account_ids:
+                    continue
+                key = (move.company_id.id, account.id)
+                if key not in earliest or move.date < earliest[key]:
+                    earliest[key] = move.date
+
+        if not earliest:
+            return
+
+        versions = self.env['saatchi.accrued_revenue_snapshot_version']._bump(earliest)
+        self.env.flush_all()
+        values = SQL(', ').join(
+            SQL("(%s, %s, %s::date, %s)", company_id, account_id, date_from, versions[(company_id, account_id)])
+            for (company_id, account_id), date_from in sorted(earliest.items())
+        )
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM %(table)s s
+                  USING (VALUES %(values)s) AS v(company_id, account_id, date_from, version)
+                  WHERE s.company_id = v.company_id
+                    AND s.account_id = v.account_id
+                    AND s.month_end >= v.date_from
+            """,
+            table=SQL.identifier(self._table),
+            values=values,
+        ))
+        # Earlier closing balances do not include the moves: still valid
+        self.env.cr.execute(SQL(
+            """
+            UPDATE %(table)s s
+               SET version = v.version
+              FROM (VALUES %(values)s) AS v(company_id, account_id, date_from, version)
+             WHERE s.company_id = v.company_id
+               AND s.account_id = v.account_id
+               AND s.month_end < v.date_from
+               AND s.version = v.version - 1
+            """,
+            table=SQL.identifier(self._table),
+            values=values,
+        ))
+        self.invalidate_model()
+
+    @api.model
+    def _get_tracked_account_ids(self):
+        """
+        Accounts whose snapshots are kept up to date: the configured accrued
+        revenue accounts, their same-named accounts in other companies, and
+        every account snapshots were built for.
+
+        Returns:
+            set: account.account IDs
+        """
+        Account = self.env['account.account'].sudo()
+        configured = self.env['saatchi.accrual_config'].sudo().search([]).accrued_revenue_account_id
+        try:
+            account_id = int(self.env['ir.config_parameter'].sudo().get_param(
+                'account.accrued_revenue_account_id') or 0)
+        except (ValueError, TypeError):
+            account_id = 0
+        if account_id:
+            configured |= Account.browse(account_id).exists()
+        if configured:
+            configured |= Account.search([('name', 'in', configured.mapped('name'))])
+
+        Version = self.env['saatchi.accrued_revenue_snapshot_version']
+        self.env.cr.execute(SQL(
+            "SELECT DISTINCT account_id FROM %s", SQL.identifier(Version._table),
+        ))
+        return set(configured.ids) | {account_id for account_id, in self.env.cr.fetchall()}
+
+    @api.autovacuum
+    def _gc_superseded_snapshots(self):
+        """Remove snapshots of an older version than their company/account's."""
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM %s s
+                  USING %s v
+                  WHERE s.company_id = v.company_id
+                    AND s.account_id = v.account_id
+                    AND s.version < v.version
+            """,
+            SQL.identifier(self._table),
+            SQL.identifier(self.env['saatchi.accrued_revenue_snapshot_version']._table),
+        ))
+
+
+class SaatchiAccruedRevenueSnapshotVersion(models.Model):
+    """
+    Ledger version of a company/account snapshots are built for, bumped by
+    every post or reset that invalidates its balance snapshots. A row
+    exists for every account snapshots were built for.
+
+    The version is bumped in the posting transaction itself, so a snapshot
+    tagged with a version was built from a ledger state that includes every
+    move posted before that version.
+    """
+    _name = 'saatchi.accrued_revenue_snapshot_version'
+    _description = 'Accrued Revenue Snapshot Ledger Version'
+
+    company_id = fields.Many2one('res.company', required=True, ondelete='cascade')
+    account_id = fields.Many2one('account.account', required=True, ondelete='cascade')
+    version = fields.Integer(required=True, default=0)
+
+    _sql_constraints = [
+        ('company_account_uniq', 'UNIQUE(company_id, account_id)',
+         'Only one ledger version per company and account.'),
+    ]
+
+    @api.model
+    def _register(self, company, account):
+        """Track the snapshots of (company, account) and return its current version."""
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %(table)s (company_id, account_id, version)
+                 VALUES (%(company_id)s, %(account_id)s, 0)
+            ON CONFLICT (company_id, account_id) DO NOTHING
+            """,
+            table=SQL.identifier(self._table),
+            company_id=company.id,
+            account_id=account.id,
+        ))
+        self.env.cr.execute(SQL(
+            "SELECT version FROM %s WHERE company_id = %s AND account_id = %s",
+            SQL.identifier(self._table), company.id, account.id,
+        ))
+        row = self.env.cr.fetchone()
+        return row[0] if row else 0
+
+    @api.model
+    def _bump(self, keys):
+        """
+        Increment the version of each (company_id, account_id) in ``keys``.
+
+        Rows are locked in key order, so that transactions bumping several
+        accounts cannot deadlock. Concurrent bumps of the same row still
+        conflict, and the later transaction is retried as a serialization
+        failure; only posts on tracked accounts get here.
+
+        Returns:
+            dict: {(company_id, account_id): new version}
+        """
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %(table)s AS v (company_id, account_id, version)
+                 VALUES %(values)s
+            ON CONFLICT (company_id, account_id)
+              DO UPDATE SET version = v.version + 1
+              RETURNING company_id, account_id, version
+            """,
+            table=SQL.identifier(self._table),
+            values=SQL(', ').join(
+                SQL("(%s, %s, 1)", company_id, account_id)
+                for company_id, account_id in sorted(keys)
+            ),
+        ))
+        return {(company_id, account_id): version for company_id, account_id, version in self.env.cr.fetchall()}
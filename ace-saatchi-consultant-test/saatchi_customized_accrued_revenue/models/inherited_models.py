@@ -695,6 +695,19 @@ class AccountMove(models.Model):
                             so = first_po_line.order_id.x_studio_sales_order
             move.x_sales_order = so
 
+    def _post(self, soft=True):
+        """Drop accrued revenue balance snapshots made stale by the newly posted moves"""
+        posted = super()._post(soft=soft)
+        self.env['saatchi.accrued_revenue_balance_snapshot']._invalidate_for_moves(posted)
+        return posted
+
+    def button_draft(self):
+        """Drop accrued revenue balance snapshots that included the moves being reset"""
+        posted_moves = self.filtered(lambda m: m.state == 'posted')
+        res = super().button_draft()
+        self.env['saatchi.accrued_revenue_balance_snapshot']._invalidate_for_moves(posted_moves)
+        return res
+
 
 class AccountMoveLine(models.Model):
     _inherit = "account.move.line"
@@ -814,19 +827,66 @@ class AccountMoveLine(models.Model):
                 line.x_ce_status = False
                 line.x_client_product_ce_code = False
 
+    def write(self, vals):
+        """Snapshots are keyed by partner and CE#, so editing them on posted lines invalidates them"""
+        res = super().write(vals)
+        if 'x_ce_code' in vals or 'partner_id' in vals:
+            posted_moves = self.move_id.filtered(lambda m: m.state == 'posted')
+            self.env['saatchi.accrued_revenue_balance_snapshot']._invalidate_for_moves(posted_moves)
+        return res
+
 
 class GeneralLedgerCustomHandler(models.AbstractModel):
     """
     General Ledger Report Handler Extension
 
     Overrides the query to include currency_name in the General Ledger report.
+
+    "Load more" pages of an expanded account are fetched with keyset
+    pagination: the (date, move_name, id) of the last line loaded is kept in
+    the line's load more progress and the next page starts after it, instead
+    of re-reading and discarding every earlier row with OFFSET.
     """
     _inherit = 'account.general.ledger.report.handler'
 
+    # Key of the keyset cursor in the load more progress of an account line
+    _KEYSET_PROGRESS_KEY = 'aml_keyset_cursor'
+
+    def _report_expand_unfoldable_line_general_ledger(self, line_dict_id, groupby, options, progress, offset,
+                                                      unfold_all_batch_data=None):
+        cursor = offset and (progress or {}).get(self._KEYSET_PROGRESS_KEY)
+        handler = self.with_context(general_ledger_aml_cursor=tuple(cursor)) if cursor else self
+        result = super(GeneralLedgerCustomHandler, handler)._report_expand_unfoldable_line_general_ledger(
+            line_dict_id, groupby, options, progress, offset, unfold_all_batch_data=unfold_all_batch_data)
+
+        if result.get('has_more'):
+            # Remember where this page stopped, for the next one
+            report = self.env['account.report'].browse(options['report_id'])
+            aml_ids = []
+            for line in result['lines']:
+                model, record_id = report._get_model_info_from_id(line['id'])
+                if model == 'account.move.line':
+                    aml_ids.append(record_id)
+            if aml_ids:
+                last_aml = self.env['account.move.line'].browse(aml_ids[-1])
+                result['progress'] = {
+                    **(result.get('progress') or {}),
+                    self._KEYSET_PROGRESS_KEY: [
+                        fields.Date.to_string(last_aml.date), last_aml.move_name or '', last_aml.id,
+                    ],
+                }
+        return result
+
     def _get_query_amls(self, report, options, expanded_account_ids, offset=0, limit=None):
-        """Override to add currency_name field to General Ledger query"""
+        """
+        Override to add currency_name field to General Ledger query
+
+        When the context holds a ``general_ledger_aml_cursor`` (date, move_name,
+        id), only the lines after it are returned and ``offset`` is ignored.
+        """
         additional_domain = [('account_id', 'in', expanded_account_ids)
                              ] if expanded_account_ids is not None else None
+        cursor = self.env.context.get('general_ledger_aml_cursor')
         queries = []
         journal_name = self.env['account.journal']._field_to_sql(
             'journal', 'name')
@@ -843,36 +903,53 @@ class GeneralLedgerCustomHandler(models.AbstractModel):
             account_type = self.env['account.account']._field_to_sql(
                 account_alias, 'account_type')
 
+            # The currency table join can return several rows per line, which
+            # are aggregated back. Without it, every row is already one line.
+            currency_table_join = report._currency_table_aml_join(group_options)
+            if currency_table_join.code:
+                min_, sum_ = SQL('MIN'), SQL('SUM')
+                group_by = SQL('GROUP BY account_move_line.id, account_move_line.date')
+            else:
+                min_ = sum_ = SQL()
+                group_by = SQL()
+
+            search_condition = query.where_clause
+            if cursor:
+                search_condition = SQL(
+                    "%s AND (account_move_line.date, COALESCE(move.name, ''), account_move_line.id) > (%s::date, %s, %s)",
+                    search_condition, *cursor,
+                )
+
             query = SQL(
                 '''
                 SELECT
                     account_move_line.id,
                     account_move_line.date,
-                    MIN(account_move_line.date_maturity)    AS date_maturity,
-                    MIN(account_move_line.name)             AS name,
-                    MIN(account_move_line.ref)              AS ref,
-                    MIN(account_move_line.company_id)       AS company_id,
-                    MIN(account_move_line.account_id)       AS account_id,
-                    MIN(account_move_line.payment_id)       AS payment_id,
-                    MIN(account_move_line.partner_id)       AS partner_id,
-                    MIN(account_move_line.currency_id)      AS currency_id,
-                    MIN(currency.name)                      AS currency_name,
-                    SUM(account_move_line.amount_currency)  AS amount_currency,
-                    MIN(COALESCE(account_move_line.invoice_date, account_move_line.date)) AS invoice_date,
+                    %(min)s(account_move_line.date_maturity)    AS date_maturity,
+                    %(min)s(account_move_line.name)             AS name,
+                    %(min)s(account_move_line.ref)              AS ref,
+                    %(min)s(account_move_line.company_id)       AS company_id,
+                    %(min)s(account_move_line.account_id)       AS account_id,
+                    %(min)s(account_move_line.payment_id)       AS payment_id,
+                    %(min)s(account_move_line.partner_id)       AS partner_id,
+                    %(min)s(account_move_line.currency_id)      AS currency_id,
+                    %(min)s(currency.name)                      AS currency_name,
+                    %(sum)s(account_move_line.amount_currency)  AS amount_currency,
+                    %(min)s(COALESCE(account_move_line.invoice_date, account_move_line.date)) AS invoice_date,
                     account_move_line.date                  AS date,
-                    SUM(%(debit_select)s)                   AS debit,
-                    SUM(%(credit_select)s)                  AS credit,
-                    SUM(%(balance_select)s)                 AS balance,
-                    MIN(move.name)                          AS move_name,
-                    MIN(company.currency_id)                AS company_currency_id,
-                    MIN(partner.name)                       AS partner_name,
-                    MIN(move.move_type)                     AS move_type,
-                    MIN(%(account_code)s)                   AS account_code,
-                    MIN(%(account_name)s)                   AS account_name,
-                    MIN(%(account_type)s)                   AS account_type,
-                    MIN(journal.code)                       AS journal_code,
-                    MIN(%(journal_name)s)                   AS journal_name,
-                    MIN(full_rec.id)                        AS full_rec_name,
+                    %(sum)s(%(debit_select)s)                   AS debit,
+                    %(sum)s(%(credit_select)s)                  AS credit,
+                    %(sum)s(%(balance_select)s)                 AS balance,
+                    %(min)s(COALESCE(move.name, ''))            AS move_name,
+                    %(min)s(company.currency_id)                AS company_currency_id,
+                    %(min)s(partner.name)                       AS partner_name,
+                    %(min)s(move.move_type)                     AS move_type,
+                    %(min)s(%(account_code)s)                   AS account_code,
+                    %(min)s(%(account_name)s)                   AS account_name,
+                    %(min)s(%(account_type)s)                   AS account_type,
+                    %(min)s(journal.code)                       AS journal_code,
+                    %(min)s(%(journal_name)s)                   AS journal_name,
+                    %(min)s(full_rec.id)                        AS full_rec_name,
                     %(column_group_key)s                    AS column_group_key
                 FROM %(table_references)s
                 JOIN account_move move                      ON move.id = account_move_line.move_id
@@ -883,31 +960,33 @@ class GeneralLedgerCustomHandler(models.AbstractModel):
                 LEFT JOIN account_journal journal           ON journal.id = account_move_line.journal_id
                 LEFT JOIN account_full_reconcile full_rec   ON full_rec.id = account_move_line.full_reconcile_id
                 WHERE %(search_condition)s
-                GROUP BY account_move_line.id, account_move_line.date
+                %(group_by)s
                 ORDER BY account_move_line.date, move_name, account_move_line.id
                 ''',
+                min=min_,
+                sum=sum_,
+                group_by=group_by,
                 account_code=account_code,
                 account_name=account_name,
                 account_type=account_type,
                 journal_name=journal_name,
                 column_group_key=column_group_key,
                 table_references=query.from_clause,
-                currency_table_join=report._currency_table_aml_join(
-                    group_options),
+                currency_table_join=currency_table_join,
                 debit_select=report._currency_table_apply_rate(
                     SQL("account_move_line.debit")),
                 credit_select=report._currency_table_apply_rate(
                     SQL("account_move_line.credit")),
                 balance_select=report._currency_table_apply_rate(
                     SQL("account_move_line.balance")),
-                search_condition=query.where_clause,
+                search_condition=search_condition,
             )
             queries.append(query)
 
         full_query = SQL(" UNION ALL ").join(SQL("(%s)", query)
                                              for query in queries)
 
-        if offset:
+        if offset and not cursor:
             full_query = SQL('%s OFFSET %s ', full_query, offset)
         if limit:
             full_query = SQL('%s LIMIT %s ', full_query, limit)
@@ -19,12 +19,16 @@ Long description of module's purpose
     'license': 'LGPL-3',
 
     # any module necessary for this one to work correctly
-    'depends': ['base', 'report_xlsx', 'account', 'saatchi_customized_accrued_revenue'],
+    'depends': ['base', 'report_xlsx', 'account', 'base_customization', 'saatchi_customized_accrued_revenue'],
 
     # always loaded
     'data': [
         'security/ir.model.access.csv',
+        'security/unbilled_estimate_security.xml',
+        'data/ir_cron.xml',
         'views/views.xml',
+        'views/soa_statement_run_views.xml',
+        'views/unbilled_estimate_views.xml',
         'views/accrued_revenue_wizard_view.xml',
         'views/revenue_report_wizard_view.xml',
         'reports/saatchi_xlsx_reports.xml'
@@ -1,3 +1,6 @@
 # -*- coding: utf-8 -*-
 
 from . import models
+from . import soa_statement_run
+from . import unbilled_estimate
+from . import sale_order
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+from odoo.tools.sql import column_exists, create_index
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    def init(self):
+        """Index the CE# columns the accrual reports resolve sale orders by."""
+        super().init()
+        # x_studio_old_ce is a Studio field, absent from some databases
+        for column in ('x_ce_code', 'x_studio_old_ce'):
+            if column_exists(self.env.cr, self._table, column):
+                create_index(self.env.cr, f'sale_order_{column}_index', self._table, [column])
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, sql_db, _
+from odoo.exceptions import UserError
+from odoo.tools import config, split_every
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+import ast
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+
+_logger = logging.getLogger(__name__)
+
+SOA_REPORT = 'saatchi_soa.action_report_saatchi_soa_xlsx'
+
+# A run still running after this long is considered dead (e.g. its cron
+# worker was killed for exceeding the memory or time limits)
+RUN_TIMEOUT = timedelta(hours=2)
+
+# Registry of the statement run being rendered, inherited by forked workers
+_worker_registry = None
+# Database connections inherited from the parent process: kept referenced so
+# that they are never closed (nor reused) by the workers
+_inherited_connections = []
+
+
+def _init_statement_worker():
+    """Give a forked worker its own database connections."""
+    registry = _worker_registry
+    _inherited_connections.append((sql_db._Pool, getattr(sql_db, '_Pool_readonly', None), registry._db))
+    sql_db._Pool = None
+    if hasattr(sql_db, '_Pool_readonly'):
+        sql_db._Pool_readonly = None
+    registry._db = sql_db.db_connect(registry.db_name)
+    if hasattr(registry, '_db_readonly'):
+        registry._db_readonly = None
+
+
+def _render_statement_chunk(uid, context, partner_ids, output_dir):
+    """Worker entry point: render the statements of a chunk of partners with a new cursor."""
+    with _worker_registry.cursor() as cr:
+        env = api.Environment(cr, uid, context)
+        results = env['saatchi_soa.statement_run']._render_statements(partner_ids, output_dir)
+        cr.rollback()
+    return results
+
+
+class SoaStatementRun(models.Model):
+    _name = 'saatchi_soa.statement_run'
+    _description = 'SOA Statement Run'
+    _order = 'id desc'
+
+    name = fields.Char(required=True, default=lambda self: _('Statements %s', fields.Date.today()))
+    partner_domain = fields.Char(
+        string='Customers', required=True, default="[('customer_rank', '>', 0)]",
+        help='Customers to send a statement to. Customers without posted invoices are skipped.')
+    chunk_size = fields.Integer(
+        default=20, required=True,
+        help='Number of customers rendered by a worker before it reports back.')
+    workers = fields.Integer(
+        default=lambda self: min(4, os.cpu_count() or 1), required=True,
+        help='Worker processes rendering statements in parallel, when the server '
+             'runs with multiple workers (prefork). With 1, or in threaded mode, '
+             'statements are rendered in the current process.')
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], default='draft', required=True, readonly=True, index=True)
+    attachment_id = fields.Many2one('ir.attachment', string='Statements', readonly=True)
+    line_ids = fields.One2many('saatchi_soa.statement_run.line', 'run_id', readonly=True)
+    partner_count = fields.Integer(compute='_compute_counts')
+    failed_count = fields.Integer(compute='_compute_counts')
+    duration = fields.Float(string='Duration (s)', readonly=True, digits=(16, 2))
+    date_started = fields.Datetime(string='Started On', readonly=True)
+    error = fields.Text(readonly=True)
+
+    @api.depends('line_ids.state')
+    def _compute_counts(self):
+        for run in self:
+            run.partner_count = len(run.line_ids)
+            run.failed_count = len(run.line_ids.filtered(lambda l: l.state == 'failed'))
+
+    def action_start(self):
+        """Queue the run, it is rendered by a cron in the background."""
+        for run in self:
+            if run.state not in ('draft', 'failed'):
+                raise UserError(_('Statement run %s is already queued.', run.name))
+        self.line_ids.unlink()
+        self.write({'state': 'queued', 'error': False, 'attachment_id': False})
+        self.env.ref('saatchi_soa.ir_cron_soa_statement_run').sudo()._trigger()
+
+    def action_download(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/{self.attachment_id.id}?download=true',
+            'target': 'self',
+        }
+
+    @api.model
+    def _cron_process_runs(self):
+        self._fail_stale_runs()
+        self.env.cr.commit()
+        for run in self.search([('state', '=', 'queued')], order='id'):
+            run.write({'state': 'running', 'date_started': fields.Datetime.now()})
+            # Workers use their own cursors: everything they read must be committed
+            self.env.cr.commit()
+            try:
+                run._as_requester()._run()
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception('SOA statement run %s failed', run.id)
+                run.write({'state': 'failed', 'error': str(e)})
+            self.env.cr.commit()
+
+    @api.model
+    def _fail_stale_runs(self):
+        """Fail the runs whose cron worker died: they would stay running forever."""
+        stale = self.search([
+            ('state', '=', 'running'),
+            ('date_started', '<', fields.Datetime.now() - RUN_TIMEOUT),
+        ])
+        for run in stale:
+            _logger.warning('SOA statement run %s did not finish, marking it as failed', run.id)
+        stale.write({
+            'state': 'failed',
+            'error': _('The statement run was interrupted before it finished. Start it again.'),
+        })
+
+    def _as_requester(self):
+        """
+        The run in the environment of the user who queued it, with all their
+        companies allowed: statements must only contain what they can read.
+        """
+        self.ensure_one()
+        user = self.create_uid
+        return self.with_user(user).with_context(
+            allowed_company_ids=(user.company_id | user.company_ids).ids,
+        )
+
+    def _get_statement_partners(self):
+        """Commercial partners of the domain having posted customer invoices or refunds."""
+        self.ensure_one()
+        partners = self.env['res.partner'].search(ast.literal_eval(self.partner_domain or '[]'))
+        groups = self.env['account.move']._read_group([
+            ('commercial_partner_id', 'in', partners.commercial_partner_id.ids),
+            ('move_type', 'in', ['out_invoice', 'out_refund']),
+            ('state', '=', 'posted'),
+        ], ['commercial_partner_id'])
+        return self.env['res.partner'].concat(*(partner for partner, in groups)).sorted('name')
+
+    def _run(self):
+        """
+        Render one SOA workbook per customer and zip them into one attachment.
+
+        Customers are split into chunks of ``chunk_size``; each chunk is
+        rendered by a forked worker process with its own cursor. Workbooks are
+        written to a temporary directory and added to the ZIP as chunks
+        complete, so only one chunk's files are on disk at a time.
+        """
+        self.ensure_one()
+        start = time.perf_counter()
+        partners = self._get_statement_partners()
+        chunks = [list(chunk) for chunk in split_every(max(self.chunk_size, 1), partners.ids)]
+        output_dir = tempfile.mkdtemp(prefix='soa_statements_')
+        zip_path = os.path.join(output_dir, 'statements.zip')
+        line_vals = []
+        filenames = set()
+        try:
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for results in self._iter_chunk_results(chunks, output_dir):
+                    for result in results:
+                        if result.get('path'):
+                            filename = result['filename']
+                            if filename in filenames:
+                                filename = f"{filename[:-5]} ({result['partner_id']}).xlsx"
+                            filenames.add(filename)
+                            archive.write(result['path'], filename)
+                            os.remove(result['path'])
+                            result['filename'] = filename
+                        line_vals.append({
+                            'run_id': self.id,
+                            'partner_id': result['partner_id'],
+                            'filename': result.get('filename'),
+                            'duration': result['duration'],
+                            'state': 'failed' if result.get('error') else 'done',
+                            'error': result.get('error'),
+                        })
+            with open(zip_path, 'rb') as zip_file:
+                attachment = self.env['ir.attachment'].create({
+                    'name': f'{self.name}.zip',
+                    'raw': zip_file.read(),
+                    'res_model': self._name,
+                    'res_id': self.id,
+                    'mimetype': 'application/zip',
+                })
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        self.env['saatchi_soa.statement_run.line'].sudo().create(line_vals)
+        failed = [vals for vals in line_vals if vals['state'] == 'failed']
+        self.write({
+            'state': 'failed' if line_vals and len(failed) == len(line_vals) else 'done',
+            'attachment_id': attachment.id,
+            'duration': time.perf_counter() - start,
+        })
+        _logger.info('SOA statement run %s: %d statements, %d failed in %.1fs',
+                     self.id, len(line_vals), len(failed), self.duration)
+
+    @api.model
+    def _can_fork_workers(self):
+        """
+        Forking is only safe from a single-threaded process, i.e. a prefork
+        (--workers) worker: in threaded mode, the children could deadlock on
+        locks held by other threads at fork time (logging, connection pool).
+        """
+        return bool(config['workers']) and threading.active_count() == 1
+
+    def _iter_chunk_results(self, chunks, output_dir):
+        """Yield the results of each chunk, as soon as it is rendered."""
+        if self.workers <= 1 or len(chunks) <= 1 or not self._can_fork_workers():
+            for chunk in chunks:
+                yield self._render_statements(chunk, output_dir)
+            return
+
+        global _worker_registry
+        _worker_registry = self.env.registry
+        # Workers render as the requester, with the same allowed companies
+        context = dict(self.env.context, allowed_company_ids=self.env.companies.ids)
+        executor = ProcessPoolExecutor(
+            max_workers=min(self.workers, len(chunks)),
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_statement_worker,
+        )
+        with executor:
+            futures = {
+                executor.submit(_render_statement_chunk, self.env.uid, context, chunk, output_dir): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # The worker died (e.g. killed for memory): the whole chunk failed
+                    _logger.exception('SOA statement run %s: worker failed', self.id)
+                    yield [
+                        {'partner_id': partner_id, 'duration': 0.0, 'error': str(e) or repr(e)}
+                        for partner_id in futures[future]
+                    ]
+
+    @api.model
+    def _render_statements(self, partner_ids, output_dir):
+        """
+        Render the SOA workbook of each partner into ``output_dir``.
+
+        Returns:
+            list: one dict per partner with partner_id, filename, path,
+                  duration (seconds) and error (False when rendered)
+        """
+        Move = self.env['account.move']
+        results = []
+        for partner in self.env['res.partner'].browse(partner_ids):
+            start = time.perf_counter()
+            result = {'partner_id': partner.id, 'error': False}
+            try:
+                with self.env.cr.savepoint():
+                    moves = Move.search([
+                        ('commercial_partner_id', '=', partner.id),
+                        ('move_type', 'in', ['out_invoice', 'out_refund']),
+                        ('state', '=', 'posted'),
+                    ])
+                    content = self.env['ir.actions.report']._render_xlsx(SOA_REPORT, moves.ids, data={})[0]
+                safe_name = re.sub(r'[^\w .&-]+', '_', partner.name or str(partner.id)).strip()
+                filename = f'SOA {safe_name}.xlsx'
+                path = os.path.join(output_dir, f'{partner.id}.xlsx')
+                with open(path, 'wb') as statement_file:
+                    statement_file.write(content)
+                result.update(filename=filename, path=path)
+            except Exception as e:
+                _logger.exception('SOA statement of partner %s failed', partner.id)
+                result['error'] = str(e) or repr(e)
+            result['duration'] = time.perf_counter() - start
+            results.append(result)
+        return results
+
+
+class SoaStatementRunLine(models.Model):
+    _name = 'saatchi_soa.statement_run.line'
+    _description = 'SOA Statement Run Customer'
+    _order = 'state desc, duration desc'
+
+    run_id = fields.Many2one('saatchi_soa.statement_run', required=True, ondelete='cascade', index=True)
+    partner_id = fields.Many2one('res.partner', string='Customer', required=True, ondelete='cascade')
+    filename = fields.Char()
+    duration = fields.Float(string='Duration (s)', digits=(16, 3))
+    state = fields.Selection([
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], required=True)
+    error = fields.Text()
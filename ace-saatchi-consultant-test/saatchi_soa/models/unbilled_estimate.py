@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, tools
+from odoo.tools import SQL
+
+
+class UnbilledEstimate(models.Model):
+    """
+    Approved estimate, invoiced to date and variance of each sales order.
+
+    Database view aggregating the sale order lines, with the same rules as
+    sale.order._compute_x_ce_amounts():
+    - BILLING: All lines included
+    - REVENUE: Only lines of the Agency Charges category (or its children)
+    - VARIANCE: Approved Estimate - Invoiced
+
+    Record rules mirror the sale.order ones (company, own documents).
+    """
+    _name = 'saatchi.unbilled_estimate'
+    _description = 'Unbilled Estimate Analysis'
+    _auto = False
+    _rec_name = 'ce_code'
+    _order = 'partner_name, ce_code, order_id'
+    _depends = {
+        'sale.order': [
+            'partner_id', 'company_id', 'user_id', 'team_id', 'currency_id', 'state', 'date_order',
+            'x_ce_code', 'x_job_description', 'x_ce_status', 'x_remarks',
+        ],
+        'sale.order.line': ['order_id', 'product_id', 'price_subtotal', 'price_unit', 'qty_invoiced'],
+        'product.product': ['product_tmpl_id'],
+        'product.template': ['categ_id'],
+        'product.category': ['name', 'parent_path'],
+        'res.partner': ['name'],
+    }
+
+    order_id = fields.Many2one('sale.order', string='Sales Order', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Customer', readonly=True)
+    partner_name = fields.Char(string='Customer Name', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    user_id = fields.Many2one('res.users', string='Salesperson', readonly=True)
+    team_id = fields.Many2one('crm.team', string='Sales Team', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Currency', readonly=True)
+    state = fields.Selection(
+        selection=lambda self: self.env['sale.order']._fields['state'].selection,
+        string='Status', readonly=True)
+    date_order = fields.Datetime(string='Order Date', readonly=True)
+    ce_code = fields.Char(string='CE#', readonly=True)
+    job_description = fields.Char(string='Job Description', readonly=True)
+    ce_status = fields.Selection(
+        selection=lambda self: self.env['sale.order']._fields['x_ce_status'].selection,
+        string='C.E. Status', readonly=True)
+    remarks = fields.Char(string='Remarks', readonly=True)
+
+    approved_billing = fields.Monetary(string='Approved Estimate | Billing', readonly=True)
+    approved_revenue = fields.Monetary(string='Approved Estimate | Revenue', readonly=True)
+    invoiced_billing = fields.Monetary(string='Invoiced | Billing', readonly=True)
+    invoiced_revenue = fields.Monetary(string='Invoiced | Revenue', readonly=True)
+    variance_billing = fields.Monetary(string='Variance | Billing', readonly=True)
+    variance_revenue = fields.Monetary(string='Variance | Revenue', readonly=True)
+
+    def _query(self):
+        return SQL(
+            """
+            WITH agency_category AS (
+                SELECT categ.id
+                  FROM product_category categ
+                 WHERE EXISTS (
+                        SELECT 1
+                          FROM product_category agency
+                         WHERE lower(agency.name) = 'agency charges'
+                           AND categ.parent_path LIKE agency.parent_path || '%%'
+                       )
+            ), amounts AS (
+                SELECT sol.order_id,
+                       SUM(sol.price_subtotal) AS approved_billing,
+                       SUM(sol.price_subtotal) FILTER (WHERE ac.id IS NOT NULL) AS approved_revenue,
+                       SUM(sol.qty_invoiced * sol.price_unit) AS invoiced_billing,
+                       SUM(sol.qty_invoiced * sol.price_unit) FILTER (WHERE ac.id IS NOT NULL) AS invoiced_revenue
+                  FROM sale_order_line sol
+             LEFT JOIN product_product pp ON pp.id = sol.product_id
+             LEFT JOIN product_template pt ON pt.id = pp.product_tmpl_id
+             LEFT JOIN agency_category ac ON ac.id = pt.categ_id
+              GROUP BY sol.order_id
+            )
+            SELECT so.id,
+                   so.id AS order_id,
+                   so.partner_id,
+                   COALESCE(p.name, 'Unknown Partner') AS partner_name,
+                   so.company_id,
+                   so.user_id,
+                   so.team_id,
+                   so.currency_id,
+                   so.state,
+                   so.date_order,
+                   so.x_ce_code AS ce_code,
+                   so.x_job_description AS job_description,
+                   so.x_ce_status AS ce_status,
+                   so.x_remarks AS remarks,
+                   COALESCE(a.approved_billing, 0) AS approved_billing,
+                   COALESCE(a.approved_revenue, 0) AS approved_revenue,
+                   COALESCE(a.invoiced_billing, 0) AS invoiced_billing,
+                   COALESCE(a.invoiced_revenue, 0) AS invoiced_revenue,
+                   COALESCE(a.approved_billing, 0) - COALESCE(a.invoiced_billing, 0) AS variance_billing,
+                   COALESCE(a.approved_revenue, 0) - COALESCE(a.invoiced_revenue, 0) AS variance_revenue
+              FROM sale_order so
+         LEFT JOIN res_partner p ON p.id = so.partner_id
+         LEFT JOIN amounts a ON a.order_id = so.id
+            """
+        )
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(SQL(
+            "CREATE OR REPLACE VIEW %s AS (%s)",
+            SQL.identifier(self._table),
+            self._query(),
+        ))
@@ -1,3 +1,5 @@
+from . import accrual_line_loader
+from . import ar_aging_query
 from . import soa_xlsx_report
 from . import accrued_revenue_xlsx_report
 from . import unbilled_estimate_report
@@ -0,0 +1,303 @@
+from odoo import models
+from odoo.tools import SQL
+from collections import namedtuple
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+# Plain row used by the accrual reports instead of account.move.line records.
+# Attribute names match the record fields they replace (date, debit, credit,
+# x_type_of_entry, ...) so amount helpers work on both.
+AccrualLine = namedtuple('AccrualLine', [
+    'id',
+    'date',
+    'debit',
+    'credit',
+    'x_type_of_entry',
+    'partner_name',
+    'x_ce_code',
+    'x_ce_date',
+    'x_ce_status',          # selection label, '' when unset
+    'x_sales_order_id',
+    'has_accrued_record',
+    'accrued_old_ce_date',
+    'accrued_description',
+    'accrued_ce_status',    # selection label, '' when unset
+    'accrued_so_name',
+])
+
+class AccrualLineLoader(models.AbstractModel):
+    _name = 'saatchi_soa.accrual_line_loader'
+    _description = 'Accrual Report Line Loader'
+
+    def _get_accrual_data_watermark(self, line_ids, date_to, invoice_dates=None, ledger_account_ids=None):
+        """
+        Data watermark of the accrual reports, for the report_xlsx render cache.
+
+        Covers what the reports read for the printed lines, scoped to the
+        allowed companies and the report dates: the lines with their moves,
+        partners and accrued revenue records, the sale orders their CE#s are
+        looked up in (with their customers), the opening balances, the
+        accrual settings and the currency rates up to ``date_to``.
+        Previous balances are covered by the ledger version of the balance
+        snapshots, bumped whenever a move on the accounts is posted or reset.
+
+        Args:
+            line_ids: IDs of the printed account.move.line records
+            date_to: last date of the report
+            invoice_dates: (date_from, date_to) of the customer invoices the
+                report reads billed amounts from, or None
+            ledger_account_ids: accounts the report reads previous balances
+                of, or None
+
+        Returns:
+            list: one (count, max write_date, ...) row per query, plus the
+                  accrued revenue account setting
+        """
+        self.env.flush_all()
+        cr = self.env.cr
+        company_ids = self.env.companies.ids
+        queries = [
+            SQL(
+                """
+                SELECT COUNT(*), MAX(aml.write_date), MAX(am.write_date),
+                       MAX(rp.write_date), MAX(ar.write_date)
+                  FROM account_move_line aml
+                  JOIN account_move am ON am.id = aml.move_id
+             LEFT JOIN res_partner rp ON rp.id = aml.partner_id
+             LEFT JOIN saatchi_accrued_revenue ar ON ar.id = am.x_related_custom_accrued_record
+                 WHERE aml.id = ANY(%s)
+                """,
+                list(line_ids),
+            ),
+            SQL(
+                """
+                SELECT COUNT(*), MAX(so.write_date), MAX(rp.write_date)
+                  FROM sale_order so
+             LEFT JOIN res_partner rp ON rp.id = so.partner_id
+                 WHERE so.company_id = ANY(%s)
+                """,
+                company_ids,
+            ),
+            SQL(
+                "SELECT COUNT(*), MAX(write_date) FROM saatchi_accrued_revenue_opening_balance"
+                " WHERE company_id = ANY(%s)",
+                company_ids,
+            ),
+            SQL(
+                "SELECT COUNT(*), MAX(write_date) FROM saatchi_accrued_revenue_reversal_opening_balance"
+                " WHERE company_id = ANY(%s)",
+                company_ids,
+            ),
+            SQL(
+                "SELECT COUNT(*), MAX(write_date) FROM saatchi_accrual_config WHERE company_id = ANY(%s)",
+                company_ids,
+            ),
+            SQL(
+                """
+                SELECT COUNT(*), MAX(write_date)
+                  FROM res_currency_rate
+                 WHERE name <= %s
+                   AND (company_id IS NULL OR company_id = ANY(%s))
+                """,
+                date_to, company_ids,
+            ),
+        ]
+        if ledger_account_ids:
+            queries.append(SQL(
+                """
+                SELECT COUNT(*), COALESCE(SUM(version), 0)
+                  FROM saatchi_accrued_revenue_snapshot_version
+                 WHERE account_id = ANY(%s)
+                   AND company_id = ANY(%s)
+                """,
+                list(ledger_account_ids), company_ids,
+            ))
+        if invoice_dates:
+            queries.append(SQL(
+                """
+                SELECT COUNT(*), MAX(am.write_date)
+                  FROM account_move am
+                 WHERE am.move_type = 'out_invoice'
+                   AND am.invoice_date BETWEEN %s AND %s
+                   AND am.company_id = ANY(%s)
+                """,
+                invoice_dates[0], invoice_dates[1], company_ids,
+            ))
+
+        watermark = []
+        for query in queries:
+            cr.execute(query)
+            watermark.append(cr.fetchone())
+        watermark.append(self.env['ir.config_parameter'].sudo().get_param(
+            'account.accrued_revenue_account_id'))
+        return watermark
+
+    def _load_accrual_lines(self, lines):
+        """
+        Load the columns the accrual reports group on, for all lines at once.
+
+        Reads the move lines with one query, then resolves the related moves,
+        accrued revenue records, sale orders and partners with one read per
+        model, instead of following the relations line by line.
+
+        Args:
+            lines: account.move.line recordset
+
+        Returns:
+            list: AccrualLine tuples, in the order of ``lines``
+        """
+        if not lines:
+            return []
+
+        line_vals = lines.read([
+            'date', 'debit', 'credit', 'x_type_of_entry', 'partner_id',
+            'x_ce_code', 'x_ce_date', 'x_ce_status', 'x_sales_order', 'move_id',
+        ], load=False)
+
+        move_ids = {vals['move_id'] for vals in line_vals if vals['move_id']}
+        accrued_by_move = {
+            vals['id']: vals['x_related_custom_accrued_record']
+            for vals in self.env['account.move'].browse(move_ids).read(
+                ['x_related_custom_accrued_record'], load=False)
+        }
+
+        AccruedRevenue = self.env['saatchi.accrued_revenue']
+        accrued_ids = {rec_id for rec_id in accrued_by_move.values() if rec_id}
+        accrued_vals = {
+            vals['id']: vals
+            for vals in AccruedRevenue.browse(accrued_ids).read(
+                ['old_ce_date', 'ce_job_description', 'ce_status', 'x_related_ce_id'],
+                load=False)
+        }
+
+        so_ids = {vals['x_related_ce_id'] for vals in accrued_vals.values() if vals['x_related_ce_id']}
+        so_names = {
+            vals['id']: vals['name']
+            for vals in self.env['sale.order'].browse(so_ids).read(['name'])
+        }
+
+        partner_ids = {vals['partner_id'] for vals in line_vals if vals['partner_id']}
+        partner_names = {
+            vals['id']: vals['name']
+            for vals in self.env['res.partner'].browse(partner_ids).read(['name'])
+        }
+
+        line_status_labels = dict(lines._fields['x_ce_status'].selection)
+        accrued_status_labels = dict(AccruedRevenue._fields['ce_status'].selection)
+
+        rows = []
+        for vals in line_vals:
+            accrued_id = accrued_by_move.get(vals['move_id'])
+            accrued = accrued_vals.get(accrued_id) or {}
+            rows.append(AccrualLine(
+                id=vals['id'],
+                date=vals['date'],
+                debit=vals['debit'],
+                credit=vals['credit'],
+                x_type_of_entry=vals['x_type_of_entry'],
+                partner_name=partner_names.get(vals['partner_id']) or '',
+                x_ce_code=vals['x_ce_code'] or '',
+                x_ce_date=vals['x_ce_date'],
+                x_ce_status=line_status_labels.get(vals['x_ce_status'], ''),
+                x_sales_order_id=vals['x_sales_order'] or False,
+                has_accrued_record=bool(accrued_id),
+                accrued_old_ce_date=accrued.get('old_ce_date') or False,
+                accrued_description=accrued.get('ce_job_description') or '',
+                accrued_ce_status=accrued_status_labels.get(accrued.get('ce_status'), ''),
+                accrued_so_name=so_names.get(accrued.get('x_related_ce_id')) or '',
+            ))
+
+        return rows
+
+    def _find_sale_orders_by_ce_codes(self, ce_codes):
+        """
+        Resolve many CE codes to their sale.order with two queries.
+
+        Matching follows the per-code lookup of the reports, in order of
+        precedence: exact x_ce_code, exact x_studio_old_ce, x_ce_code ilike,
+        x_studio_old_ce ilike, then whitespace/case-insensitive equality on
+        either field. Ties go to the first sale order in its default order.
+
+        Exact matches are resolved first through the indexed columns; only
+        the codes left over go through the fuzzy matching, which scans the
+        sale orders once for all of them.
+
+        Args:
+            ce_codes: iterable of CE codes as displayed (not normalized)
+
+        Returns:
+            dict: {ce_code: sale.order record} for the codes that matched,
+                  all records sharing one prefetch set
+        """
+        ce_codes = sorted({ce_code for ce_code in ce_codes if ce_code})
+        SaleOrder = self.env['sale.order'].sudo()
+        if not ce_codes:
+            return {}
+
+        # x_studio_old_ce is a Studio field, absent from some databases
+        if 'x_studio_old_ce' in SaleOrder._fields:
+            old_ce = SQL("so.x_studio_old_ce")
+            SaleOrder.flush_model(['x_studio_old_ce'])
+        else:
+            old_ce = SQL("NULL::varchar")
+        SaleOrder.flush_model(['x_ce_code', 'company_id', 'date_order'])
+        company_ids = self.env.companies.ids
+
+        # Exact matches: rows come in the default order, so the first one of
+        # each code and rank wins
+        self.env.cr.execute(SQL(
+            """
+            SELECT so.id, so.x_ce_code, %(old_ce)s
+              FROM sale_order so
+             WHERE so.company_id = ANY(%(company_ids)s)
+               AND (so.x_ce_code = ANY(%(ce_codes)s) OR %(old_ce)s = ANY(%(ce_codes)s))
+          ORDER BY so.date_order DESC, so.id DESC
+            """,
+            ce_codes=ce_codes,
+            company_ids=company_ids,
+            old_ce=old_ce,
+        ))
+        wanted = set(ce_codes)
+        exact = {}
+        for so_id, ce_code, old_ce_code in self.env.cr.fetchall():
+            for rank, code in ((0, ce_code), (1, old_ce_code)):
+                if code in wanted and (code not in exact or rank < exact[code][0]):
+                    exact[code] = (rank, so_id)
+        so_ids = {ce_code: so_id for ce_code, (__, so_id) in exact.items()}
+
+        # Fuzzy matches of the remaining codes, in one pass over the sale orders
+        leftover = [ce_code for ce_code in ce_codes if ce_code not in so_ids]
+        if leftover:
+            self.env.cr.execute(SQL(
+                """
+                SELECT DISTINCT ON (match.ce_code) match.ce_code, so.id
+                  FROM sale_order so
+                  JOIN LATERAL (
+                        SELECT code.ce_code,
+                               CASE WHEN so.x_ce_code ILIKE '%%' || trim(code.ce_code) || '%%' THEN 2
+                                    WHEN %(old_ce)s ILIKE '%%' || trim(code.ce_code) || '%%' THEN 3
+                                    ELSE 4 END AS rank
+                          FROM unnest(%(ce_codes)s::varchar[]) AS code(ce_code)
+                         WHERE so.x_ce_code ILIKE '%%' || trim(code.ce_code) || '%%'
+                            OR %(old_ce)s ILIKE '%%' || trim(code.ce_code) || '%%'
+                            OR regexp_replace(upper(so.x_ce_code), '\\s+', '', 'g')
+                               = regexp_replace(upper(code.ce_code), '\\s+', '', 'g')
+                            OR regexp_replace(upper(%(old_ce)s), '\\s+', '', 'g')
+                               = regexp_replace(upper(code.ce_code), '\\s+', '', 'g')
+                       ) match ON TRUE
+                 WHERE so.company_id = ANY(%(company_ids)s)
+              ORDER BY match.ce_code, match.rank, so.date_order DESC, so.id DESC
+                """,
+                ce_codes=leftover,
+                company_ids=company_ids,
+                old_ce=old_ce,
+            ))
+            so_ids.update(self.env.cr.fetchall())
+
+        orders = SaleOrder.browse(list(set(so_ids.values())))
+        return {
+            ce_code: orders.browse(so_id).with_prefetch(orders._prefetch_ids)
+            for ce_code, so_id in so_ids.items()
+        }
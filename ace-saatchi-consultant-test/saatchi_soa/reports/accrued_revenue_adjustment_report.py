@@ -1,4 +1,5 @@
 from odoo import models
+from odoo.tools import SQL
 import datetime
 import re
 from xlsxwriter.workbook import Workbook
@@ -12,8 +13,22 @@ _logger = logging.getLogger(__name__)
 
 class SalesOrderRevenueXLSX(models.AbstractModel):
     _name = 'report.sales_order_revenue_xlsx'
-    _inherit = 'report.report_xlsx.abstract'
+    _inherit = ['report.report_xlsx.abstract', 'saatchi_soa.accrual_line_loader']
     _description = 'Sales Order Revenue XLSX Report'
+    # Month-end reports are reopened many times during close
+    _xlsx_render_cache = True
+    # Rows are written in order, one sheet after the other
+    _xlsx_constant_memory = True
+
+    def _get_xlsx_cache_watermark(self, docids, data):
+        """Cached workbooks follow the data the report reads, not only the lines."""
+        if not (data or {}).get('report_date') or not data.get('move_line_ids'):
+            return None
+        report_month = datetime.datetime.strptime(data['report_date'], '%Y-%m-%d').date()
+        month_start = report_month.replace(day=1)
+        month_end = (month_start + relativedelta(months=1)) - relativedelta(days=1)
+        return self._get_accrual_data_watermark(
+            data['move_line_ids'], month_end, invoice_dates=(month_start, month_end))
     
     def _get_accrued_revenue_account_id(self):
         """Get accrued revenue account IDs with fallback for multiple companies"""
@@ -68,14 +83,14 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         base_font = {'font_name': 'Calibri', 'font_size': 10}
 
         # Title formats
-        title_format = workbook.add_format({
+        title_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'font_size': 11
         })
 
         # Section header format with borders
-        section_header_format = workbook.add_format({
+        section_header_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -84,7 +99,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         })
 
         # Section header format without borders (for empty cells)
-        section_header_no_border = workbook.add_format({
+        section_header_no_border = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -92,7 +107,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         })
 
         # Column header format with thick borders
-        column_header_format = workbook.add_format({
+        column_header_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -101,7 +116,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         })
 
         # Normal cell format with borders
-        normal_format = workbook.add_format({
+        normal_format = self._get_format(workbook, {
             **base_font,
             'align': 'left',
             'valign': 'vcenter',
@@ -109,7 +124,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         })
 
         # Centered cell format with borders
-        centered_format = workbook.add_format({
+        centered_format = self._get_format(workbook, {
             **base_font,
             'align': 'center',
             'valign': 'vcenter',
@@ -117,7 +132,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         })
 
         # Date cell format with borders
-        date_format = workbook.add_format({
+        date_format = self._get_format(workbook, {
             **base_font,
             'num_format': 'mm/dd/yyyy',
             'align': 'center',
@@ -126,7 +141,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         })
 
         # Currency format with borders (with dash for zero)
-        currency_format = workbook.add_format({
+        currency_format = self._get_format(workbook, {
             **base_font,
             'num_format': '#,##0.00;-#,##0.00;"-"',
             'align': 'right',
@@ -135,7 +150,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         })
 
         # Currency format with parentheses for negatives with borders (with dash for zero)
-        currency_negative_format = workbook.add_format({
+        currency_negative_format = self._get_format(workbook, {
             **base_font,
             'num_format': '#,##0.00;(#,##0.00);"-"',
             'align': 'right',
@@ -174,46 +189,27 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
             _logger.warning('Could not retrieve opening balance cutoff date: %s', str(e))
         return False
 
-    def _find_sale_order_by_ce_code(self, ce_code):
-        """Find a sale.order matching the given CE code."""
-        if not ce_code:
-            return self.env['sale.order']
-
-        SaleOrder = self.env['sale.order'].sudo()
-        company_domain = [('company_id', 'in', self.env.companies.ids)]
-
-        so = SaleOrder.search([('x_ce_code', '=', ce_code)] + company_domain, limit=1)
-        if so:
-            return so
-
-        try:
-            so = SaleOrder.search([('x_studio_old_ce', '=', ce_code)] + company_domain, limit=1)
-            if so:
-                return so
-        except Exception:
-            pass
-
-        so = SaleOrder.search([('x_ce_code', 'ilike', ce_code.strip())] + company_domain, limit=1)
-        if so:
-            return so
-
+    def _get_reversal_ob_records(self):
+        """Reversal opening balance records of the cutoff month, or {} when not configured."""
+        cutoff_date = self._get_opening_balance_cutoff_date()
+        if not cutoff_date:
+            return {}
         try:
-            so = SaleOrder.search([('x_studio_old_ce', 'ilike', ce_code.strip())] + company_domain, limit=1)
-            if so:
-                return so
-        except Exception:
-            pass
-
-        norm_ce = self._normalize_ce_code(ce_code)
-        all_sos = SaleOrder.search(company_domain)
-        for so in all_sos:
-            if so.x_ce_code and self._normalize_ce_code(so.x_ce_code) == norm_ce:
-                return so
-            old_ce = getattr(so, 'x_studio_old_ce', '')
-            if old_ce and self._normalize_ce_code(old_ce) == norm_ce:
-                return so
+            return self.env[
+                'saatchi.accrued_revenue_reversal_opening_balance'
+            ].get_reversal_opening_balances_for_month(
+                balance_date=cutoff_date,
+                company_id=self.env.company.id
+            )
+        except Exception as e:
+            _logger.warning('Error fetching reversal OB records: %s', str(e))
+            return {}
 
-        return SaleOrder
+    def _get_ce_status_label(self, so):
+        """Uppercased selection label of the sale order's CE status, '' if unset."""
+        if 'x_ce_status' not in so._fields or not so.x_ce_status:
+            return ''
+        return dict(so._fields['x_ce_status'].selection).get(so.x_ce_status, '').upper()
 
     def _calculate_reversal_opening_balances(self, report_month):
         """Get reversal opening balances for the opening balance month.
@@ -277,27 +273,15 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
 
         return result
 
-    def _merge_reversal_opening_balance_rows(self, grouped_data):
+    def _merge_reversal_opening_balance_rows(self, grouped_data, reversal_ob_records=None):
         """Merge reversal-opening-balance-only rows into grouped_data.
         
         For CE codes that exist in the reversal opening balance model but have NO
         accrual records, create a row from matching sale.order or reversal OB fields.
+        The sale orders of all those CE codes are resolved in one query.
         """
-        cutoff_date = self._get_opening_balance_cutoff_date()
-        if not cutoff_date:
-            return
-
-        try:
-            reversal_ob_records = self.env[
-                'saatchi.accrued_revenue_reversal_opening_balance'
-            ].get_reversal_opening_balances_for_month(
-                balance_date=cutoff_date,
-                company_id=self.env.company.id
-            )
-        except Exception as e:
-            _logger.warning('Error fetching reversal OB records for row merge: %s', str(e))
-            return
-
+        if reversal_ob_records is None:
+            reversal_ob_records = self._get_reversal_ob_records()
         if not reversal_ob_records:
             return
 
@@ -307,12 +291,18 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
             for ce_code_key in ces.keys():
                 existing_normalized_ces.add(self._normalize_ce_code(ce_code_key))
 
-        # Add reversal-OB-only rows for CEs not already present
-        for norm_ce, rob_data in reversal_ob_records.items():
-            if norm_ce in existing_normalized_ces:
-                continue
+        # Reversal-OB-only CEs, and their sale orders in one bulk lookup
+        new_rows = {
+            norm_ce: rob_data
+            for norm_ce, rob_data in reversal_ob_records.items()
+            if norm_ce not in existing_normalized_ces
+        }
+        sale_orders = self._find_sale_orders_by_ce_codes(
+            rob_data.get('ce_code_display', '') for rob_data in new_rows.values())
 
-            so = self._find_sale_order_by_ce_code(rob_data.get('ce_code_display', ''))
+        # Add reversal-OB-only rows for CEs not already present
+        for norm_ce, rob_data in new_rows.items():
+            so = sale_orders.get(rob_data.get('ce_code_display', ''))
 
             if so:
                 partner_name = (so.partner_id.name or rob_data.get('partner_name') or 'UNKNOWN').upper()
@@ -325,13 +315,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
                 ce_date = old_ce_date or so.date_order or rob_data.get('ce_date')
                 description = (getattr(so, 'x_job_description', '') or rob_data.get('job_description', '')).upper()
 
-                ce_status = ''
-                if hasattr(so, 'x_ce_status') and so.x_ce_status:
-                    try:
-                        status_selection = dict(so._fields['x_ce_status'].selection)
-                        ce_status = status_selection.get(so.x_ce_status, '').upper()
-                    except Exception:
-                        pass
+                ce_status = self._get_ce_status_label(so)
                 if not ce_status and rob_data.get('ce_status'):
                     ce_status = rob_data.get('ce_status', '').upper()
             else:
@@ -356,68 +340,62 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
                 ce_code_display, partner_name
             )
 
-    def _fill_missing_ce_metadata(self, grouped_data):
+    def _fill_missing_ce_metadata(self, grouped_data, reversal_ob_records=None):
         """Fill in missing CE metadata (ce_status, description, ce_date) from
-        sale orders and reversal opening balance records."""
+        sale orders and reversal opening balance records.
+
+        CEs still missing metadata are collected first, and their sale orders
+        resolved in one query, so the number of queries does not grow with
+        the number of CEs."""
         # Get reversal OB records for fallback
-        cutoff_date = self._get_opening_balance_cutoff_date()
-        reversal_ob_records = {}
-        if cutoff_date:
-            try:
-                reversal_ob_records = self.env[
-                    'saatchi.accrued_revenue_reversal_opening_balance'
-                ].get_reversal_opening_balances_for_month(
-                    balance_date=cutoff_date,
-                    company_id=self.env.company.id
-                )
-            except Exception:
-                pass
+        if reversal_ob_records is None:
+            reversal_ob_records = self._get_reversal_ob_records()
+
+        incomplete = [
+            (ce_code, ce_data)
+            for ces in grouped_data.values()
+            for ce_code, ce_data in ces.items()
+            if not (ce_data.get('ce_status') and ce_data.get('description') and ce_data.get('ce_date'))
+        ]
+        sale_orders = self._find_sale_orders_by_ce_codes(ce_code for ce_code, ce_data in incomplete)
 
-        for partner_name, ces in grouped_data.items():
-            for ce_code, ce_data in ces.items():
-                needs_status = not ce_data.get('ce_status')
-                needs_description = not ce_data.get('description')
-                needs_date = not ce_data.get('ce_date')
-
-                if not (needs_status or needs_description or needs_date):
-                    continue
-
-                # Try sale order first
-                so = self._find_sale_order_by_ce_code(ce_code)
-                if so:
-                    if needs_status and hasattr(so, 'x_ce_status') and so.x_ce_status:
-                        try:
-                            status_selection = dict(so._fields['x_ce_status'].selection)
-                            ce_data['ce_status'] = status_selection.get(so.x_ce_status, '').upper()
-                            needs_status = not ce_data['ce_status']
-                        except Exception:
-                            pass
-
-                    if needs_description and hasattr(so, 'x_job_description') and so.x_job_description:
-                        ce_data['description'] = so.x_job_description.upper()
-                        needs_description = False
-
-                    if needs_date and so.date_order:
-                        ce_data['ce_date'] = so.date_order
-                        ce_data['year'] = so.date_order.year
-                        ce_data['month'] = so.date_order.strftime('%B').upper()
-                        needs_date = False
-
-                # Try reversal OB records as second fallback
-                if needs_status or needs_description or needs_date:
-                    norm_ce = self._normalize_ce_code(ce_code)
-                    rob_data = reversal_ob_records.get(norm_ce, {})
-
-                    if needs_status and rob_data.get('ce_status'):
-                        ce_data['ce_status'] = rob_data['ce_status'].upper()
-
-                    if needs_description and rob_data.get('job_description'):
-                        ce_data['description'] = rob_data['job_description'].upper()
-
-                    if needs_date and rob_data.get('ce_date'):
-                        ce_data['ce_date'] = rob_data['ce_date']
-                        ce_data['year'] = rob_data['ce_date'].year
-                        ce_data['month'] = rob_data['ce_date'].strftime('%B').upper()
+        for ce_code, ce_data in incomplete:
+            needs_status = not ce_data.get('ce_status')
+            needs_description = not ce_data.get('description')
+            needs_date = not ce_data.get('ce_date')
+
+            # Try sale order first
+            so = sale_orders.get(ce_code)
+            if so:
+                if needs_status:
+                    ce_data['ce_status'] = self._get_ce_status_label(so)
+                    needs_status = not ce_data['ce_status']
+
+                if needs_description and hasattr(so, 'x_job_description') and so.x_job_description:
+                    ce_data['description'] = so.x_job_description.upper()
+                    needs_description = False
+
+                if needs_date and so.date_order:
+                    ce_data['ce_date'] = so.date_order
+                    ce_data['year'] = so.date_order.year
+                    ce_data['month'] = so.date_order.strftime('%B').upper()
+                    needs_date = False
+
+            # Try reversal OB records as second fallback
+            if needs_status or needs_description or needs_date:
+                norm_ce = self._normalize_ce_code(ce_code)
+                rob_data = reversal_ob_records.get(norm_ce, {})
+
+                if needs_status and rob_data.get('ce_status'):
+                    ce_data['ce_status'] = rob_data['ce_status'].upper()
+
+                if needs_description and rob_data.get('job_description'):
+                    ce_data['description'] = rob_data['job_description'].upper()
+
+                if needs_date and rob_data.get('ce_date'):
+                    ce_data['ce_date'] = rob_data['ce_date']
+                    ce_data['year'] = rob_data['ce_date'].year
+                    ce_data['month'] = rob_data['ce_date'].strftime('%B').upper()
 
     def _sanitize_sheet_name(self, name):
         """Sanitize sheet name to comply with Excel rules
@@ -468,7 +446,10 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         accrual_start = accrual_month.replace(day=1)
         accrual_end = (accrual_start + relativedelta(months=1)) - relativedelta(days=1)
 
-        # Process accrued revenue lines
+        # Process accrued revenue lines (loaded column-wise in one pass)
+        if isinstance(lines, models.BaseModel):
+            lines = self._load_accrual_lines(lines)
+
         relevant_lines = []
         for line in lines:
             if not line.date:
@@ -479,30 +460,28 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
                 relevant_lines.append(line)
 
         for line in relevant_lines:
-            partner_name = line.partner_id.name.upper() if line.partner_id and line.partner_id.name else 'UNKNOWN'
+            partner_name = line.partner_name.upper() if line.partner_name else 'UNKNOWN'
             ce_code = line.x_ce_code.upper() if line.x_ce_code else 'NO_CE'
+            ce_group = grouped[partner_name][ce_code]
 
             # Store line for processing
-            grouped[partner_name][ce_code]['lines'].append(line)
+            ce_group['lines'].append(line)
 
             # Track sales order for billing calculation
-            if line.x_sales_order:
-                grouped[partner_name][ce_code]['sales_orders'].add(line.x_sales_order.id)
+            if line.x_sales_order_id:
+                ce_group['sales_orders'].add(line.x_sales_order_id)
 
             # Capture CE-level fields (use first non-empty value found)
-            if line.x_ce_date and not grouped[partner_name][ce_code]['ce_date']:
-                grouped[partner_name][ce_code]['ce_date'] = line.x_ce_date
-                grouped[partner_name][ce_code]['year'] = line.x_ce_date.year
-                grouped[partner_name][ce_code]['month'] = line.x_ce_date.strftime('%B').upper()
+            if line.x_ce_date and not ce_group['ce_date']:
+                ce_group['ce_date'] = line.x_ce_date
+                ce_group['year'] = line.x_ce_date.year
+                ce_group['month'] = line.x_ce_date.strftime('%B').upper()
 
-            if line.move_id and line.move_id.x_related_custom_accrued_record and not grouped[partner_name][ce_code]['description']:
-                desc = line.move_id.x_related_custom_accrued_record.ce_job_description or ''
-                grouped[partner_name][ce_code]['description'] = desc.upper()
+            if line.has_accrued_record and not ce_group['description']:
+                ce_group['description'] = line.accrued_description.upper()
 
-            if line.x_ce_status and not grouped[partner_name][ce_code]['ce_status']:
-                selection_dict = dict(line._fields['x_ce_status'].selection)
-                ce_status = selection_dict.get(line.x_ce_status, '')
-                grouped[partner_name][ce_code]['ce_status'] = ce_status.upper() if ce_status else ''
+            if line.x_ce_status and not ce_group['ce_status']:
+                ce_group['ce_status'] = line.x_ce_status.upper()
 
         # Process ALL billed sales orders (including those already in grouped data)
         if all_billed_so_ids:
@@ -573,42 +552,71 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
 
         return amounts
 
-    def _calculate_billed_amount(self, sales_order_ids, report_month):
-        """Calculate total billed amount for given sales orders in the report month
-        
+    def _get_billed_amounts(self, report_month, sale_order_ids=None, partner_ids=None):
+        """Untaxed amount of the posted customer invoices of the report month, per sales order
+
+        One aggregate query joined through sale_order_line_invoice_rel; an
+        invoice counts once for each sales order it bills, like so.invoice_ids.
+
         Args:
-            sales_order_ids: set of sale.order IDs
             report_month: date object representing the report month
-            
+            sale_order_ids: restrict to these sale.order IDs (default: all)
+            partner_ids: restrict to invoices of these res.partner IDs (default: all)
+
         Returns:
-            float: Total billed amount (untaxed) for posted invoices in the report month
+            dict: {sale_order_id: total billed amount (untaxed)}
         """
-        if not sales_order_ids:
-            return 0.0
-        
+        if sale_order_ids is not None and not sale_order_ids:
+            return {}
+
         # Get the start and end of the report month
         month_start = report_month.replace(day=1)
         month_end = (month_start + relativedelta(months=1)) - relativedelta(days=1)
+
+        # Same scope as account.move.search(): only the user's allowed companies
+        conditions = [SQL(
+            """am.move_type = 'out_invoice'
+               AND am.state = 'posted'
+               AND am.invoice_date BETWEEN %s AND %s
+               AND am.company_id = ANY(%s)""",
+            month_start, month_end, self.env.companies.ids,
+        )]
+        if sale_order_ids is not None:
+            conditions.append(SQL("sol.order_id = ANY(%s)", list(sale_order_ids)))
+        if partner_ids:
+            conditions.append(SQL("am.partner_id = ANY(%s)", list(partner_ids)))
+
+        self.env['account.move'].flush_model(['move_type', 'state', 'invoice_date', 'partner_id', 'company_id', 'amount_untaxed'])
+        self.env['account.move.line'].flush_model(['move_id'])
+        self.env['sale.order.line'].flush_model(['order_id'])
+        self.env.cr.execute(SQL(
+            """
+            SELECT order_id, SUM(amount_untaxed)
+              FROM (
+                SELECT DISTINCT sol.order_id, am.id, am.amount_untaxed
+                  FROM account_move am
+                  JOIN account_move_line aml ON aml.move_id = am.id
+                  JOIN sale_order_line_invoice_rel rel ON rel.invoice_line_id = aml.id
+                  JOIN sale_order_line sol ON sol.id = rel.order_line_id
+                 WHERE %s
+              ) billed
+          GROUP BY order_id
+            """,
+            SQL(" AND ").join(conditions),
+        ))
+        return {order_id: float(amount) for order_id, amount in self.env.cr.fetchall()}
+
+    def _calculate_billed_amount(self, sales_order_ids, billed_amounts):
+        """Calculate total billed amount for given sales orders in the report month
         
-        total_billed = 0.0
-        
-        # Browse sales orders
-        sales_orders = self.env['sale.order'].browse(list(sales_order_ids))
-        
-        for so in sales_orders:
-            # Get all invoices related to this sales order
-            invoices = so.invoice_ids.filtered(
-                lambda inv: inv.state == 'posted' 
-                and inv.move_type == 'out_invoice'
-                and inv.invoice_date 
-                and month_start <= inv.invoice_date <= month_end
-            )
+        Args:
+            sales_order_ids: set of sale.order IDs
+            billed_amounts: dict {sale_order_id: amount} from _get_billed_amounts()
             
-            # Sum the untaxed amounts (use amount_untaxed instead of amount_total)
-            for invoice in invoices:
-                total_billed += invoice.amount_untaxed
-        
-        return total_billed
+        Returns:
+            float: Total billed amount (untaxed) for posted invoices in the report month
+        """
+        return sum(billed_amounts.get(so_id, 0.0) for so_id in sales_order_ids)
 
     def generate_xlsx_report(self, workbook, data, docids):
         """
@@ -647,11 +655,14 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         # Group lines by partner and CE (includes both accrued and billed)
         grouped_data = self._group_lines_by_ce(move_lines, report_month, all_billed_so_ids)
         
+        # Reversal opening balance records, read once for the row merge and metadata fallback
+        reversal_ob_records = self._get_reversal_ob_records()
+
         # Merge reversal opening balance rows (for CEs only in OB, no journal entries)
-        self._merge_reversal_opening_balance_rows(grouped_data)
+        self._merge_reversal_opening_balance_rows(grouped_data, reversal_ob_records)
 
         # Fill in missing CE metadata (ce_status, description, ce_date) from SO / reversal OB
-        self._fill_missing_ce_metadata(grouped_data)
+        self._fill_missing_ce_metadata(grouped_data, reversal_ob_records)
 
         if not grouped_data:
             raise UserError("No data found for the report month.")
@@ -659,21 +670,34 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
         # Calculate reversal opening balances for fallback
         reversal_ob_balances = self._calculate_reversal_opening_balances(report_month)
 
+        # Billed amounts of every sales order in the report, in one query
+        all_sales_orders = {
+            so_id
+            for ces_data in grouped_data.values()
+            for ce_data in ces_data.values()
+            for so_id in ce_data['sales_orders']
+        }
+        billed_amounts = self._get_billed_amounts(report_month, sale_order_ids=all_sales_orders)
+
         # Generate summary sheet first
         self._generate_summary_sheet(
-            workbook, formats, grouped_data, report_month, reversal_ob_balances)
+            workbook, formats, grouped_data, report_month, reversal_ob_balances, billed_amounts)
 
         # Generate individual customer sheets
         for partner_name in sorted(grouped_data.keys()):
             self._generate_customer_sheet(
-                workbook, formats, partner_name, grouped_data[partner_name], report_month, reversal_ob_balances)
+                workbook, formats, partner_name, grouped_data[partner_name], report_month, reversal_ob_balances,
+                billed_amounts)
 
         return True
 
-    def _generate_summary_sheet(self, workbook, formats, grouped_data, report_month, reversal_ob_balances=None):
+    def _generate_summary_sheet(self, workbook, formats, grouped_data, report_month, reversal_ob_balances=None,
+                                billed_amounts=None):
         """Generate summary sheet with customer totals (no CE breakdown)"""
         if reversal_ob_balances is None:
             reversal_ob_balances = {}
+        if billed_amounts is None:
+            billed_amounts = {}
         
         sheet_name = 'SUMMARY'
         sheet = workbook.add_worksheet(sheet_name)
@@ -767,7 +791,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
                 all_sales_orders.update(ce_data['sales_orders'])
             
             # Calculate billed amount for all sales orders of this customer
-            billed_amount = self._calculate_billed_amount(all_sales_orders, report_month)
+            billed_amount = self._calculate_billed_amount(all_sales_orders, billed_amounts)
 
             # Write customer row
             sheet.write(row, 0, partner_name, formats['normal'])
@@ -804,7 +828,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
 
         # Create bold formats for totals
         base_font = {'font_name': 'Calibri', 'font_size': 10}
-        currency_bold_format = workbook.add_format({
+        currency_bold_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00;-#,##0.00;"-"',
@@ -812,7 +836,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
             'valign': 'vcenter',
             'border': 1
         })
-        currency_negative_bold_format = workbook.add_format({
+        currency_negative_bold_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00;(#,##0.00);"-"',
@@ -820,7 +844,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
             'valign': 'vcenter',
             'border': 1
         })
-        bold_with_border = workbook.add_format({
+        bold_with_border = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -851,10 +875,13 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
 
         return True
 
-    def _generate_customer_sheet(self, workbook, formats, partner_name, ces_data, report_month, reversal_ob_balances=None):
+    def _generate_customer_sheet(self, workbook, formats, partner_name, ces_data, report_month, reversal_ob_balances=None,
+                                 billed_amounts=None):
         """Generate individual customer sheet with CE breakdown"""
         if reversal_ob_balances is None:
             reversal_ob_balances = {}
+        if billed_amounts is None:
+            billed_amounts = {}
         
         # Sanitize sheet name
         sheet_name = self._sanitize_sheet_name(partner_name)
@@ -916,7 +943,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
             amounts = self._calculate_amounts_by_type(ce_data['lines'], report_month)
             
             # Calculate billed amount for this CE's sales orders
-            billed_amount = self._calculate_billed_amount(ce_data['sales_orders'], report_month)
+            billed_amount = self._calculate_billed_amount(ce_data['sales_orders'], billed_amounts)
 
             sheet.write(row, 0, ce_code, formats['centered'])
 
@@ -989,7 +1016,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
 
         # Create bold formats for totals
         base_font = {'font_name': 'Calibri', 'font_size': 10}
-        currency_bold_format = workbook.add_format({
+        currency_bold_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00;-#,##0.00;"-"',
@@ -997,7 +1024,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
             'valign': 'vcenter',
             'border': 1
         })
-        currency_negative_bold_format = workbook.add_format({
+        currency_negative_bold_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00;(#,##0.00);"-"',
@@ -1005,7 +1032,7 @@ class SalesOrderRevenueXLSX(models.AbstractModel):
             'valign': 'vcenter',
             'border': 1
         })
-        bold_with_border = workbook.add_format({
+        bold_with_border = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
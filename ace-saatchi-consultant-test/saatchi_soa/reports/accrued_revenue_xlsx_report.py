@@ -1,5 +1,6 @@
 from odoo import models
 import datetime
+import functools
 import re
 from xlsxwriter.workbook import Workbook
 from odoo.exceptions import ValidationError, UserError
@@ -9,11 +10,32 @@ from collections import defaultdict
 
 _logger = logging.getLogger(__name__)
 
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=65536)
+def _normalize_ce_code_cached(ce_code):
+    """Normalized CE codes are reused across rows, merges and balance keys."""
+    return _WHITESPACE_RE.sub('', ce_code.strip().upper())
+
 
 class AccruedRevenueXLSX(models.AbstractModel):
     _name = 'report.accrued_revenue_xlsx'
-    _inherit = 'report.report_xlsx.abstract'
+    _inherit = ['report.report_xlsx.abstract', 'saatchi_soa.accrual_line_loader']
     _description = 'Accrued Revenue XLSX Report'
+    # Month-end reports are reopened many times during close
+    _xlsx_render_cache = True
+    # Rows are written in order, one sheet after the other
+    _xlsx_constant_memory = True
+
+    def _get_xlsx_cache_watermark(self, docids, data):
+        """Cached workbooks follow the data the report reads, not only the lines."""
+        if not (data or {}).get('end_date'):
+            return None
+        lines = self._get_objs_for_report(docids, data)
+        return self._get_accrual_data_watermark(
+            lines.ids, data['end_date'],
+            ledger_account_ids=self._get_accrued_revenue_account_id())
     
     def _get_accrued_revenue_account_id(self):
         """Get accrued revenue account IDs with fallback for multiple companies"""
@@ -69,14 +91,14 @@ class AccruedRevenueXLSX(models.AbstractModel):
         base_font = {'font_name': 'Calibri', 'font_size': 10}
 
         # Title formats
-        title_format = workbook.add_format({
+        title_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'font_size': 11
         })
 
         # Section header format with borders
-        section_header_format = workbook.add_format({
+        section_header_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -85,7 +107,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Section header format without borders (for empty cells)
-        section_header_no_border = workbook.add_format({
+        section_header_no_border = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -93,7 +115,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Column header format with thick borders
-        column_header_format = workbook.add_format({
+        column_header_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -102,7 +124,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Normal cell format with borders
-        normal_format = workbook.add_format({
+        normal_format = self._get_format(workbook, {
             **base_font,
             'align': 'left',
             'valign': 'vcenter',
@@ -110,7 +132,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Normal format with text wrapping (for CLIENT column)
-        normal_wrap_format = workbook.add_format({
+        normal_wrap_format = self._get_format(workbook, {
             **base_font,
             'align': 'left',
             'valign': 'vcenter',
@@ -119,7 +141,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Centered cell format with borders
-        centered_format = workbook.add_format({
+        centered_format = self._get_format(workbook, {
             **base_font,
             'align': 'center',
             'valign': 'vcenter',
@@ -127,7 +149,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Date cell format with borders
-        date_format = workbook.add_format({
+        date_format = self._get_format(workbook, {
             **base_font,
             'num_format': 'mm/dd/yyyy',
             'align': 'center',
@@ -136,7 +158,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Currency format with borders (with dash for zero)
-        currency_format = workbook.add_format({
+        currency_format = self._get_format(workbook, {
             **base_font,
             'num_format': '#,##0.00;-#,##0.00;"-"',
             'align': 'right',
@@ -145,7 +167,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Currency format with parentheses for negatives with borders (with dash for zero)
-        currency_negative_format = workbook.add_format({
+        currency_negative_format = self._get_format(workbook, {
             **base_font,
             'num_format': '#,##0.00;(#,##0.00);"-"',
             'align': 'right',
@@ -154,7 +176,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Red text format for OB-only rows (CE# column)
-        centered_red_format = workbook.add_format({
+        centered_red_format = self._get_format(workbook, {
             **base_font,
             'align': 'center',
             'valign': 'vcenter',
@@ -163,7 +185,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
         })
 
         # Blue text format for new CE#s (not in reversal opening balances)
-        centered_blue_format = workbook.add_format({
+        centered_blue_format = self._get_format(workbook, {
             **base_font,
             'align': 'center',
             'valign': 'vcenter',
@@ -207,7 +229,15 @@ class AccruedRevenueXLSX(models.AbstractModel):
         return accrual_months
 
     def _group_lines_by_ce(self, lines, accrual_month):
-        """Group account.move.line records by partner and CE code for a specific month"""
+        """Group accrual lines by partner and CE code for a specific month.
+
+        ``lines`` is either an account.move.line recordset or the AccrualLine
+        rows returned by _load_accrual_lines(); rows are preferred so that
+        multi-month reports load the lines only once.
+        """
+        if isinstance(lines, models.BaseModel):
+            lines = self._load_accrual_lines(lines)
+
         grouped = defaultdict(lambda: defaultdict(lambda: {
             'ce_date': None,
             'description': '',
@@ -239,46 +269,36 @@ class AccruedRevenueXLSX(models.AbstractModel):
                     month_lines.append(line)
 
         for line in month_lines:
-            partner_name = line.partner_id.name.upper(
-            ) if line.partner_id and line.partner_id.name else 'UNKNOWN'
+            partner_name = line.partner_name.upper() if line.partner_name else 'UNKNOWN'
             ce_code = line.x_ce_code.upper() if line.x_ce_code else 'NO_CE'
+            ce_group = grouped[partner_name][ce_code]
 
             # Store line for processing
-            grouped[partner_name][ce_code]['lines'].append(line)
+            ce_group['lines'].append(line)
 
             # Capture CE-level fields (use first non-empty value found)
-            if not grouped[partner_name][ce_code]['ce_date']:
+            if not ce_group['ce_date']:
                 # Prioritize old CE date from accrued revenue record, fallback to x_ce_date
-                if line.move_id and line.move_id.x_related_custom_accrued_record:
-                    accrued_record = line.move_id.x_related_custom_accrued_record
-                    if accrued_record.old_ce_date:
-                        grouped[partner_name][ce_code]['ce_date'] = accrued_record.old_ce_date
-                    elif line.x_ce_date:
-                        grouped[partner_name][ce_code]['ce_date'] = line.x_ce_date
+                if line.has_accrued_record and line.accrued_old_ce_date:
+                    ce_group['ce_date'] = line.accrued_old_ce_date
                 elif line.x_ce_date:
-                    grouped[partner_name][ce_code]['ce_date'] = line.x_ce_date
-            
-            if grouped[partner_name][ce_code]['ce_date']:
-                grouped[partner_name][ce_code]['year'] = grouped[partner_name][ce_code]['ce_date'].year
-
-            if line.move_id and line.move_id.x_related_custom_accrued_record and not grouped[partner_name][ce_code]['description']:
-                desc = line.move_id.x_related_custom_accrued_record.ce_job_description or ''
-                grouped[partner_name][ce_code]['description'] = desc.upper()
-
-            if line.move_id and line.move_id.x_related_custom_accrued_record and not grouped[partner_name][ce_code]['ce_status']:
-                accrued_record = line.move_id.x_related_custom_accrued_record
-                if accrued_record.ce_status:
-                    # Get CE Status from the accrued revenue record
-                    selection_dict = dict(accrued_record._fields['ce_status'].selection)
-                    ce_status = selection_dict.get(accrued_record.ce_status, '')
-                    grouped[partner_name][ce_code]['ce_status'] = ce_status.upper()
-
-            if line.move_id and line.move_id.x_related_custom_accrued_record and not grouped[partner_name][ce_code]['so_reference']:
-                accrued_record = line.move_id.x_related_custom_accrued_record
-                so_ref = ''
-                if accrued_record.x_related_ce_id:
-                    so_ref = accrued_record.x_related_ce_id.name or ''
-                grouped[partner_name][ce_code]['so_reference'] = so_ref.upper() if so_ref else ''
+                    ce_group['ce_date'] = line.x_ce_date
+
+            if ce_group['ce_date']:
+                ce_group['year'] = ce_group['ce_date'].year
+
+            if not line.has_accrued_record:
+                continue
+
+            if not ce_group['description']:
+                ce_group['description'] = line.accrued_description.upper()
+
+            if not ce_group['ce_status'] and line.accrued_ce_status:
+                # Get CE Status from the accrued revenue record
+                ce_group['ce_status'] = line.accrued_ce_status.upper()
+
+            if not ce_group['so_reference']:
+                ce_group['so_reference'] = line.accrued_so_name.upper()
 
         return grouped
 
@@ -295,7 +315,22 @@ class AccruedRevenueXLSX(models.AbstractModel):
         """
         if not ce_code:
             return ''
-        return re.sub(r'\s+', '', ce_code.strip().upper())
+        return _normalize_ce_code_cached(ce_code)
+
+    def _index_balances_by_normalized_ce(self, balances):
+        """
+        Sum {(partner, ce_code): amount} balances per normalized CE code.
+
+        Args:
+            balances (dict): Output of _calculate_prev_month_balances()
+
+        Returns:
+            dict: {normalized_ce_code: total} for every CE code present
+        """
+        index = defaultdict(float)
+        for (bal_partner, bal_ce), bal_amount in balances.items():
+            index[self._normalize_ce_code(bal_ce)] += bal_amount
+        return dict(index)
 
     def _normalize_ce_status(self, status):
         """
@@ -584,8 +619,8 @@ class AccruedRevenueXLSX(models.AbstractModel):
         Calculate the ending balance of the previous month for each partner/CE code.
 
         Uses a two-tier approach:
-        1. PRIMARY: Query all posted accrued revenue account lines from the DB
-           up to the last day of the previous month (cumulative balance).
+        1. PRIMARY: Read the closing balance snapshot of the previous month
+           (cumulative balance of all posted accrued revenue account lines).
         2. FALLBACK: For any CE# that has NO DB history, check the Opening Balance
            model if the previous month end matches the configured cutoff date.
 
@@ -596,38 +631,31 @@ class AccruedRevenueXLSX(models.AbstractModel):
             accrual_month (date): First day of the current accrual month
 
         Returns:
-            dict: {(PARTNER_NAME, CE_CODE): balance} where balance = debit - credit
+            dict: {(PARTNER_NAME, CE_CODE): balance} where balance = debit - credit.
+                  DB balances are keyed by normalized CE code.
         """
         prev_month_end = accrual_month - relativedelta(days=1)  # last day of previous month
 
         # ── TIER 1: Database transaction history ──
-        prev_lines = self.env['account.move.line'].sudo().search([
-            ('account_id', 'in', accrued_account_ids),
-            ('date', '<=', prev_month_end),
-            ('parent_state', '=', 'posted'),
-        ])
-
         balances = defaultdict(float)
         db_ce_codes_normalized = set()  # Track which CE codes have DB history
         cutoff_date = self._get_opening_balance_cutoff_date()
         db_ce_codes_pre_cutoff = set()  # CE codes with DB history on or before cutoff
 
-        for line in prev_lines:
-            partner_name = (
-                line.partner_id.name.upper()
-                if line.partner_id and line.partner_id.name
-                else 'UNKNOWN'
-            )
-            ce_code = line.x_ce_code.upper() if line.x_ce_code else 'NO_CE'
-            net_amount = (line.debit or 0) - (line.credit or 0)
-            balances[(partner_name, ce_code)] += net_amount
+        # Closing balances come from the monthly snapshots (one aggregate per
+        # month, carried forward), keyed by normalized CE code.
+        for partner_name, ce_code, balance, first_move_date in self.env[
+            'saatchi.accrued_revenue_balance_snapshot'
+        ].get_closing_balances(accrued_account_ids, prev_month_end):
+            partner_name = partner_name.upper() if partner_name else 'UNKNOWN'
+            norm = ce_code or ''
+            balances[(partner_name, norm)] += balance
 
             # Track normalized CE code so we know it has DB history
-            norm = self._normalize_ce_code(ce_code)
             db_ce_codes_normalized.add(norm)
 
             # Track CE codes with DB history on or before the cutoff date
-            if cutoff_date and line.date <= cutoff_date:
+            if cutoff_date and first_move_date and first_move_date <= cutoff_date:
                 db_ce_codes_pre_cutoff.add(norm)
 
         # ── TIER 2: Opening Balance + Reversal OB ──
@@ -882,10 +910,13 @@ class AccruedRevenueXLSX(models.AbstractModel):
                 raise UserError(
                     "No accrued revenue entries found for the selected date range.")
 
+        # Load the grouped columns once for all months
+        filtered_rows = self._load_accrual_lines(filtered_lines)
+
         # Generate sheets for each month
         for accrual_month in accrual_months:
             self._generate_month_sheets(
-                workbook, formats, filtered_lines, lines, accrual_month, accrued_account_ids[0])
+                workbook, formats, filtered_rows, lines, accrual_month, accrued_account_ids[0])
 
         return True
 
@@ -932,6 +963,10 @@ class AccruedRevenueXLSX(models.AbstractModel):
         if not grouped_data:
             return
 
+        # Sum previous balances per normalized CE# once for the whole month,
+        # so each row is a dict lookup instead of a scan over all balances.
+        prev_balance_by_ce = self._index_balances_by_normalized_ce(prev_month_balances)
+
         # Create main sheet with formatted name (e.g., "November 2025")
         sheet_name_main = accrual_month.strftime('%B %Y')
         sheet = workbook.add_worksheet(sheet_name_main)
@@ -1001,6 +1036,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
 
             for ce_code in sorted(ces.keys()):
                 ce_data = ces[ce_code]
+                norm_ce = self._normalize_ce_code(ce_code)
                 amounts = self._calculate_amounts_by_type(
                     ce_data['lines'], accrual_month)
 
@@ -1023,8 +1059,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
                     ce_format = formats['centered_red']
                 else:
                     # Check if this CE# is in the reversal opening balances
-                    norm_ce_check = self._normalize_ce_code(ce_code)
-                    if norm_ce_check not in reversal_ob_balances:
+                    if norm_ce not in reversal_ob_balances:
                         # Blue: Has accrued entries but NOT in reversal OB (new CE#)
                         ce_format = formats['centered_blue']
                 
@@ -1052,23 +1087,14 @@ class AccruedRevenueXLSX(models.AbstractModel):
                 # Always do normalized CE# matching to catch entries with different
                 # partner names (e.g., OB partner vs DB journal partner).
                 # Sum ALL entries with the same normalized CE code.
-                norm_ce = self._normalize_ce_code(ce_code)
-                total_from_all_keys = 0
-                found_any = False
-                for (bal_partner, bal_ce), bal_amount in prev_month_balances.items():
-                    if self._normalize_ce_code(bal_ce) == norm_ce:
-                        total_from_all_keys += bal_amount
-                        found_any = True
-
-                if found_any:
-                    prev_balance = total_from_all_keys
+                if norm_ce in prev_balance_by_ce:
+                    prev_balance = prev_balance_by_ce[norm_ce]
 
                 prev_balance = prev_balance or 0
                 sheet.write(row, 6, prev_balance, formats['currency'])
 
                 # Check for reversal opening balance overrides (OB month only)
-                norm_ce_for_rev = self._normalize_ce_code(ce_code)
-                rev_ob = reversal_ob_balances.get(norm_ce_for_rev, {})
+                rev_ob = reversal_ob_balances.get(norm_ce, {})
 
                 # Column H (7): System Reversal
                 system_reversal_val = amounts['system_reversal']
@@ -1106,7 +1132,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
 
         # Create bold formats for totals
         base_font = {'font_name': 'Calibri', 'font_size': 10}
-        currency_bold_format = workbook.add_format({
+        currency_bold_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00;-#,##0.00;"-"',
@@ -1114,7 +1140,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
             'valign': 'vcenter',
             'border': 1
         })
-        currency_negative_bold_format = workbook.add_format({
+        currency_negative_bold_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00;(#,##0.00);"-"',
@@ -1122,7 +1148,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
             'valign': 'vcenter',
             'border': 1
         })
-        bold_with_border = workbook.add_format({
+        bold_with_border = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -1273,7 +1299,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
 
         # Create bold formats for totals
         base_font = {'font_name': 'Calibri', 'font_size': 10}
-        currency_bold_format = workbook.add_format({
+        currency_bold_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00;-#,##0.00;"-"',
@@ -1281,7 +1307,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
             'valign': 'vcenter',
             'border': 1
         })
-        bold_with_border = workbook.add_format({
+        bold_with_border = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -1329,7 +1355,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
 
         # Create bold formats for totals
         base_font = {'font_name': 'Calibri', 'font_size': 10}
-        currency_bold_format = workbook.add_format({
+        currency_bold_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00;-#,##0.00;"-"',
@@ -1337,7 +1363,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
             'valign': 'vcenter',
             'border': 1
         })
-        currency_negative_bold_format = workbook.add_format({
+        currency_negative_bold_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00;(#,##0.00);"-"',
@@ -1481,7 +1507,7 @@ class AccruedRevenueXLSX(models.AbstractModel):
                         formats['section_header_no_border'])
 
         # TOTAL label
-        bold_with_border = workbook.add_format({
+        bold_with_border = self._get_format(workbook, {
             'font_name': 'Calibri',
             'font_size': 10,
             'bold': True,
@@ -1,4 +1,6 @@
 from odoo import models
+from itertools import groupby
+from operator import attrgetter
 import datetime
 from xlsxwriter.workbook import Workbook
 from odoo.exceptions import ValidationError, UserError
@@ -8,15 +10,17 @@ import pytz
 
 class AgedReceivablesXLSX(models.AbstractModel):
     _name = 'report.aged_receivables_xlsx'
-    _inherit = 'report.report_xlsx.abstract'
+    _inherit = ['report.report_xlsx.abstract', 'saatchi_soa.ar_aging_query']
     _description = 'Aged Receivables XLSX Report'
+    # Rows are written in order on a single sheet
+    _xlsx_constant_memory = True
 
     def _define_formats(self, workbook):
         """Define and return format objects."""
         base_font = {'font_name': 'Calibri', 'font_size': 10}
 
         # Yellow header format
-        yellow_header_format = workbook.add_format({
+        yellow_header_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -26,7 +30,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
         })
 
         # Normal cell format
-        normal_format = workbook.add_format({
+        normal_format = self._get_format(workbook, {
             **base_font,
             'align': 'left',
             'valign': 'vcenter',
@@ -34,7 +38,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
         })
 
         # Centered cell format
-        centered_format = workbook.add_format({
+        centered_format = self._get_format(workbook, {
             **base_font,
             'align': 'center',
             'valign': 'vcenter',
@@ -42,7 +46,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
         })
 
         # Right-aligned format for dash
-        right_aligned_format = workbook.add_format({
+        right_aligned_format = self._get_format(workbook, {
             **base_font,
             'align': 'right',
             'valign': 'vcenter',
@@ -51,7 +55,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
         })
 
         # Date cell format
-        date_format = workbook.add_format({
+        date_format = self._get_format(workbook, {
             **base_font,
             'num_format': 'mm/dd/yyyy',
             'align': 'center',
@@ -60,7 +64,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
         })
 
         # Subtotal row format (no bold, just regular with border)
-        subtotal_format = workbook.add_format({
+        subtotal_format = self._get_format(workbook, {
             **base_font,
             'align': 'right',
             'valign': 'vcenter',
@@ -68,7 +72,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
         })
 
         # Subtotal label format (lighter green background, bold, left-aligned)
-        subtotal_label_format = workbook.add_format({
+        subtotal_label_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'left',
@@ -78,7 +82,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
         })
 
         # Subtotal cell format (lighter green background)
-        subtotal_cell_format = workbook.add_format({
+        subtotal_cell_format = self._get_format(workbook, {
             **base_font,
             'align': 'right',
             'valign': 'vcenter',
@@ -87,7 +91,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
         })
 
         # Grand total row format (darker green background, bold)
-        grand_total_format = workbook.add_format({
+        grand_total_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'right',
@@ -97,7 +101,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
         })
 
         # Grand total label format
-        grand_total_label_format = workbook.add_format({
+        grand_total_label_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'left',
@@ -119,70 +123,42 @@ class AgedReceivablesXLSX(models.AbstractModel):
             'grand_total_label': grand_total_label_format
         }
 
-    def _get_aging_bucket(self, invoice_date, reference_date):
-        """Determine which aging bucket (0-30, 31-60, 61-90, 91-120, OVER 120) the invoice falls into."""
-        if not invoice_date:
-            return None
-        
-        # Ensure we're working with date objects, not datetime
-        if isinstance(invoice_date, datetime.datetime):
-            invoice_date = invoice_date.date()
-        if isinstance(reference_date, datetime.datetime):
-            reference_date = reference_date.date()
-        
-        days_old = (reference_date - invoice_date).days
-        
-        # If not yet due (negative days_old), put in 0-30 bucket
-        if days_old <= 0:
-            return 0  # Not yet due - goes to 0-30
-        elif days_old <= 30:
-            return 0  # 0-30
-        elif days_old <= 60:
-            return 1  # 31-60
-        elif days_old <= 90:
-            return 2  # 61-90
-        elif days_old <= 120:
-            return 3  # 91-120
-        else:
-            return 4  # OVER 120
-
-    def _convert_to_php(self, amount, from_currency, to_currency, date):
-        """Convert amount from one currency to another (typically USD to PHP)."""
-        if from_currency == to_currency:
-            return amount
-        
-        # Use Odoo's currency conversion with the invoice date
-        company = self.env.company
-        converted_amount = from_currency._convert(
-            amount, 
-            to_currency, 
-            company, 
-            date
-        )
-        return converted_amount
-
-    def _get_conversion_date(self, move):
-        """Get the date to use for currency conversion (sales order date)."""
-        # Get sale order
-        sale_order = move.invoice_line_ids.mapped('sale_line_ids.order_id')[:1] if move.invoice_line_ids else False
-        
-        # Priority: x_studio_sales_order.order_date > sale_order.date_order > invoice_date > move.date
-        if sale_order:
-            # Try to get x_studio_sales_order if it exists
-            if hasattr(sale_order, 'x_studio_sales_order') and sale_order.x_studio_sales_order:
-                if hasattr(sale_order.x_studio_sales_order, 'order_date'):
-                    return sale_order.x_studio_sales_order.order_date
-            # Fallback to regular sale order date
-            if sale_order.date_order:
-                return sale_order.date_order.date() if isinstance(sale_order.date_order, datetime.datetime) else sale_order.date_order
-        
-        # Final fallback to invoice date or move date
-        inv_date = move.invoice_date or move.date
-        return inv_date.date() if isinstance(inv_date, datetime.datetime) else inv_date
+    def _get_php_amounts(self, moves, php_currency):
+        """
+        Residual amounts of the moves converted to PHP, in one batch.
+
+        Conversion dates (sales order date, else invoice/move date) are
+        resolved with one SQL join and every needed rate is loaded with one
+        query, instead of a rate lookup and a sale order walk per move.
+
+        Returns:
+            dict: {move_id: signed residual in PHP}
+        """
+        if not moves or not php_currency:
+            return {}
+        RateTableService = self.env['base_customization.currency_rate_table']
+        conversion_dates = RateTableService.get_invoice_conversion_dates(moves)
+        php_amounts = {}
+        for company, company_moves in moves.grouped('company_id').items():
+            rate_table = RateTableService.load(
+                company_moves.currency_id | php_currency,
+                [conversion_dates[move.id] for move in company_moves],
+                company)
+            amounts = rate_table.convert_many(
+                (
+                    move.amount_residual if move.move_type == 'out_invoice' else -move.amount_residual,
+                    move.currency_id,
+                    php_currency,
+                    conversion_dates[move.id],
+                )
+                for move in company_moves
+            )
+            php_amounts.update(zip(company_moves.ids, amounts))
+        return php_amounts
 
     def _create_currency_format(self, workbook, currency_symbol, base_font):
         """Create currency format with symbol."""
-        return workbook.add_format({
+        return self._get_format(workbook, {
             **base_font,
             'num_format': f'{currency_symbol}#,##0.00',
             'align': 'right',
@@ -192,7 +168,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
 
     def _create_subtotal_currency_format(self, workbook, currency_symbol, base_font):
         """Create subtotal currency format with lighter green background."""
-        return workbook.add_format({
+        return self._get_format(workbook, {
             **base_font,
             'num_format': f'{currency_symbol}#,##0.00',
             'align': 'right',
@@ -203,7 +179,7 @@ class AgedReceivablesXLSX(models.AbstractModel):
 
     def _create_grand_total_currency_format(self, workbook, currency_symbol, base_font):
         """Create grand total currency format with darker green background."""
-        return workbook.add_format({
+        return self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': f'{currency_symbol}#,##0.00',
@@ -226,17 +202,9 @@ class AgedReceivablesXLSX(models.AbstractModel):
         if not php_currency:
             php_currency = self.env.company.currency_id  # Fallback to company currency
 
-        # Group invoices by partner only (not by currency)
-        by_partner = {}
-
-        for move in lines:
-            if move.move_type in ['out_invoice', 'out_refund'] and move.state == 'posted' and move.amount_residual != 0:
-                partner_name = move.partner_id.name or 'Unknown'
-
-                if partner_name not in by_partner:
-                    by_partner[partner_name] = []
-
-                by_partner[partner_name].append(move)
+        # Open invoices with their aging bucket, filtered and sorted by partner in SQL
+        items = self._query_aging_items(lines, reference_date, open_only=True)
+        moves_by_id = {move.id: move for move in self.env['account.move'].browse([item.id for item in items])}
 
         # Create single sheet for all partners
         sheet_name = f"AR Aging as of {reference_date.strftime('%B %d, %Y')}"
@@ -277,15 +245,19 @@ class AgedReceivablesXLSX(models.AbstractModel):
         # Freeze the header row
         sheet.freeze_panes(1, 0)
 
-        # Sort partners alphabetically
-        sorted_partners = sorted(by_partner.items())
-
         # Initialize grand totals across all clients (in PHP)
         grand_totals = {
             'total': 0,
             'buckets': [0, 0, 0, 0, 0]
         }
 
+        # Foreign invoices without an alt currency amount are converted to PHP in one batch
+        foreign_moves = self.env['account.move'].concat(*(
+            move for move in moves_by_id.values()
+            if move.currency_id != php_currency and not move.x_alt_currency_amount
+        ))
+        php_amounts = self._get_php_amounts(foreign_moves, php_currency)
+
         # Get PHP symbol for formatting
         php_symbol = php_currency.symbol if php_currency else '₱'
         
@@ -297,11 +269,8 @@ class AgedReceivablesXLSX(models.AbstractModel):
         # Dictionary to cache currency formats for foreign currencies
         foreign_currency_formats = {}
 
-        # Process each partner
-        for partner_name, moves in sorted_partners:
-            # Sort moves by invoice name, then by invoice date
-            moves_sorted = sorted(moves, key=lambda x: (x.name or '', x.invoice_date or x.date))
-
+        # Process each partner (items are already sorted by partner, invoice name and date)
+        for partner_name, partner_items in groupby(items, key=attrgetter('partner_name')):
             # Initialize subtotals for this partner (in PHP)
             subtotals = {
                 'total': 0,
@@ -309,35 +278,31 @@ class AgedReceivablesXLSX(models.AbstractModel):
             }
 
             # Write data rows for this partner
-            for move in moves_sorted:
-                # Get original amount
-                original_amount = move.amount_residual if move.move_type == 'out_invoice' else -move.amount_residual
+            for item in partner_items:
+                move = moves_by_id[item.id]
+                # Signed residual (refunds negative)
+                original_amount = item.amount
                 
                 # Determine foreign amount (non-PHP) and PHP amount
                 foreign_amount = None
                 if move.currency_id != php_currency:
                     foreign_amount = original_amount
-                    amount = move.x_alt_currency_amount if hasattr(move, 'x_alt_currency_amount') else original_amount
+                    amount = move.x_alt_currency_amount or php_amounts.get(move.id, original_amount)
                 else:
                     amount = original_amount
                 
                 subtotals['total'] += amount
                 
                 # Use invoice date for display
-                inv_date = move.invoice_date or move.date or reference_date
-                
-                # Use due date for aging calculation
-                due_date = move.invoice_date_due or inv_date
-                
+                inv_date = item.inv_date
+
                 # Add to grand total (already in PHP)
                 grand_totals['total'] += amount
 
-                # Determine aging bucket based on DUE date
-                bucket_index = self._get_aging_bucket(due_date, reference_date)
-
-                if bucket_index is not None:
-                    subtotals['buckets'][bucket_index] += amount
-                    grand_totals['buckets'][bucket_index] += amount
+                # Aging bucket based on DUE date, computed in SQL
+                bucket_index = item.day_bucket
+                subtotals['buckets'][bucket_index] += amount
+                grand_totals['buckets'][bucket_index] += amount
 
                 # Get sale order for CE# and other fields
                 sale_order = move.invoice_line_ids.mapped('sale_line_ids.order_id')[:1] if move.invoice_line_ids else False
@@ -357,10 +322,10 @@ class AgedReceivablesXLSX(models.AbstractModel):
                     # ce_date = sale_order.date_order or ce_date
 
                 # Write row data
-                sheet.write(row, 0, move.ref or '', formats['normal'])  # PO#
+                sheet.write(row, 0, item.ref or '', formats['normal'])  # PO#
                 sheet.write(row, 1, ce_code, formats['centered'])  # CE#
                 sheet.write(row, 2, partner_name, formats['normal'])  # CLIENT
-                sheet.write(row, 3, move.name or '', formats['centered'])  # INVOICE #
+                sheet.write(row, 3, item.name or '', formats['centered'])  # INVOICE #
                 # sheet.write(row, 4, ce_date, formats['date'])  # DATE
                 sheet.write(row, 4, inv_date, formats['date'])  # DATE - change to actual invoice date
                 
@@ -0,0 +1,198 @@
+from odoo import models
+from odoo.tools import SQL
+from collections import namedtuple
+import datetime
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+# One receivable of the aging reports, with its buckets computed in SQL:
+# - day_bucket: 0-30, 31-60, 61-90, 91-120, OVER 120 days past due (AR aging)
+# - month_bucket: the 4 calendar months up to the partner/currency's most
+#   recent due date, then OVER 120 DAYS (SOA); None when in neither
+AgingItem = namedtuple('AgingItem', [
+    'id',
+    'partner_name',
+    'currency_id',
+    'company_id',
+    'name',
+    'ref',
+    'inv_date',
+    'due_date',
+    'amount',               # signed residual, refunds negative
+    'day_bucket',
+    'month_bucket',
+    'last_due_date',        # most recent due date of the partner/currency
+])
+
+
+class ArAgingQuery(models.AbstractModel):
+    _name = 'saatchi_soa.ar_aging_query'
+    _description = 'Receivable Aging Query'
+
+    def _flush_aging_fields(self):
+        self.env['account.move'].flush_model([
+            'partner_id', 'currency_id', 'company_id', 'name', 'ref', 'move_type',
+            'state', 'invoice_date', 'invoice_date_due', 'date', 'amount_residual',
+        ])
+        self.env['res.partner'].flush_model(['name'])
+
+    def _aging_items_query(self, moves, reference_date, open_only, by_currency=False):
+        """
+        Posted customer invoices/refunds of ``moves`` with their aging buckets.
+
+        With ``by_currency``, rows also get currency_seq: the position in
+        ``moves`` of the first move of their partner and currency.
+        """
+        residual_condition = SQL("AND m.amount_residual != 0") if open_only else SQL()
+        if by_currency:
+            # Positions come from the ordinality of the id array, in one pass
+            moves_source = SQL(
+                "unnest(%s::int[]) WITH ORDINALITY AS o(id, seq) JOIN account_move m ON m.id = o.id",
+                list(dict.fromkeys(moves.ids)),
+            )
+            move_condition = SQL("TRUE")
+            seq_column = SQL(", o.seq")
+            currency_seq_column = SQL(", MIN(seq) OVER w AS currency_seq")
+            currency_seq_output = SQL(", currency_seq")
+        else:
+            moves_source = SQL("account_move m")
+            move_condition = SQL("m.id = ANY(%s)", moves.ids)
+            seq_column = currency_seq_column = currency_seq_output = SQL()
+        return SQL(
+            """
+            WITH items AS (
+                SELECT m.id,
+                       COALESCE(p.name, 'Unknown') AS partner_name,
+                       m.currency_id,
+                       m.company_id,
+                       m.name,
+                       m.ref,
+                       COALESCE(m.invoice_date, m.date, %(reference_date)s::date) AS inv_date,
+                       COALESCE(m.invoice_date_due, m.invoice_date, m.date) AS due_date,
+                       (CASE WHEN m.move_type = 'out_invoice' THEN m.amount_residual
+                             ELSE -m.amount_residual END)::float AS amount
+                       %(seq_column)s
+                  FROM %(moves_source)s
+             LEFT JOIN res_partner p ON p.id = m.partner_id
+                 WHERE %(move_condition)s
+                   AND m.move_type IN ('out_invoice', 'out_refund')
+                   AND m.state = 'posted'
+                   %(residual_condition)s
+            ), anchored AS (
+                SELECT items.*,
+                       MAX(due_date) OVER w AS last_due_date
+                       %(currency_seq_column)s
+                  FROM items
+                WINDOW w AS (PARTITION BY partner_name, currency_id)
+            )
+            SELECT id, partner_name, currency_id, company_id, name, ref,
+                   inv_date, due_date, amount,
+                   CASE WHEN %(reference_date)s::date - COALESCE(due_date, inv_date) <= 30 THEN 0
+                        WHEN %(reference_date)s::date - COALESCE(due_date, inv_date) <= 60 THEN 1
+                        WHEN %(reference_date)s::date - COALESCE(due_date, inv_date) <= 90 THEN 2
+                        WHEN %(reference_date)s::date - COALESCE(due_date, inv_date) <= 120 THEN 3
+                        ELSE 4 END AS day_bucket,
+                   CASE WHEN due_date IS NULL THEN NULL
+                        WHEN date_trunc('month', due_date::timestamp)
+                             = date_trunc('month', last_due_date::timestamp) THEN 0
+                        WHEN date_trunc('month', due_date::timestamp)
+                             = date_trunc('month', last_due_date - interval '1 month') THEN 1
+                        WHEN date_trunc('month', due_date::timestamp)
+                             = date_trunc('month', last_due_date - interval '2 months') THEN 2
+                        WHEN date_trunc('month', due_date::timestamp)
+                             = date_trunc('month', last_due_date - interval '3 months') THEN 3
+                        WHEN due_date <= last_due_date - 120 THEN 4
+                        END AS month_bucket,
+                   last_due_date
+                   %(currency_seq_output)s
+              FROM anchored
+            """,
+            reference_date=reference_date,
+            moves_source=moves_source,
+            move_condition=move_condition,
+            seq_column=seq_column,
+            currency_seq_column=currency_seq_column,
+            currency_seq_output=currency_seq_output,
+            residual_condition=residual_condition,
+        )
+
+    def _query_aging_items(self, moves, reference_date=None, open_only=False, by_currency=False):
+        """
+        Aging rows of the posted customer invoices and refunds in ``moves``.
+
+        Filtering, signed residuals and both bucket kinds are computed by
+        PostgreSQL, so the reports only write rows.
+
+        Args:
+            moves: account.move recordset
+            reference_date (date): Aging date for day buckets (default: today)
+            open_only (bool): Skip fully paid moves
+            by_currency (bool): Keep each partner's currencies together, in
+                the order they first appear in ``moves``
+
+        Returns:
+            list: AgingItem tuples ordered by partner name, then by move name
+                  and invoice date (due date when ``by_currency``)
+        """
+        if not moves:
+            return []
+        reference_date = reference_date or datetime.date.today()
+        if by_currency:
+            order = SQL('currency_seq, COALESCE(name, \'\') COLLATE "C", due_date, id')
+        else:
+            order = SQL('COALESCE(name, \'\') COLLATE "C", inv_date, id')
+        self._flush_aging_fields()
+        self.env.cr.execute(SQL(
+            """
+            %s
+            ORDER BY partner_name COLLATE "C", %s
+            """,
+            self._aging_items_query(moves, reference_date, open_only, by_currency),
+            order,
+        ))
+        size = len(AgingItem._fields)
+        return [AgingItem(*row[:size]) for row in self.env.cr.fetchall()]
+
+    def _query_aging_totals(self, moves, reference_date=None, open_only=False):
+        """
+        Residual totals per partner, currency and bucket, aggregated in SQL.
+
+        Returns:
+            dict: {(partner_name, currency_id): {
+                'total': float,
+                'days': [5 floats],     # by day_bucket
+                'months': [5 floats],   # by month_bucket
+            }}
+        """
+        if not moves:
+            return {}
+        reference_date = reference_date or datetime.date.today()
+        self._flush_aging_fields()
+        self.env.cr.execute(SQL(
+            """
+            SELECT partner_name, currency_id, SUM(amount),
+                   ARRAY[%(day_sums)s],
+                   ARRAY[%(month_sums)s]
+              FROM (%(items)s) aging
+          GROUP BY partner_name, currency_id
+            """,
+            items=self._aging_items_query(moves, reference_date, open_only),
+            day_sums=SQL(', ').join(
+                SQL("COALESCE(SUM(amount) FILTER (WHERE day_bucket = %s), 0)", i)
+                for i in range(5)
+            ),
+            month_sums=SQL(', ').join(
+                SQL("COALESCE(SUM(amount) FILTER (WHERE month_bucket = %s), 0)", i)
+                for i in range(5)
+            ),
+        ))
+        return {
+            (partner_name, currency_id): {
+                'total': total,
+                'days': list(day_sums),
+                'months': list(month_sums),
+            }
+            for partner_name, currency_id, total, day_sums, month_sums in self.env.cr.fetchall()
+        }
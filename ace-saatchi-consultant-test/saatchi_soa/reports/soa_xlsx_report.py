@@ -1,4 +1,6 @@
 from odoo import models
+from itertools import groupby
+from operator import attrgetter
 import datetime
 from xlsxwriter.workbook import Workbook
 from odoo.exceptions import ValidationError, UserError
@@ -11,36 +13,38 @@ _logger = logging.getLogger(__name__)
 
 class SaatchiXLSX(models.AbstractModel):
     _name = 'report.saatchi_soa_xlsx'
-    _inherit = 'report.report_xlsx.abstract'
+    _inherit = ['report.report_xlsx.abstract', 'saatchi_soa.ar_aging_query']
     _description = 'xlsx.report'
+    # Rows are written in order, one sheet after the other
+    _xlsx_constant_memory = True
 
     def _define_formats(self, workbook):
         """Define and return format objects."""
         base_font = {'font_name': 'Calibri', 'font_size': 10}
 
         # Company name format (now for customer name)
-        company_format = workbook.add_format({
+        company_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'font_size': 11
         })
 
         # Title format
-        title_format = workbook.add_format({
+        title_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'font_size': 11
         })
 
         # Date format (for the report date) - NOW BOLD
-        report_date_format = workbook.add_format({
+        report_date_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'font_size': 10
         })
 
         # Black header format
-        black_header_format = workbook.add_format({
+        black_header_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -51,7 +55,7 @@ class SaatchiXLSX(models.AbstractModel):
         })
 
         # Top label format (no black background, no border)
-        top_label_format = workbook.add_format({
+        top_label_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -59,7 +63,7 @@ class SaatchiXLSX(models.AbstractModel):
         })
 
         # Normal cell format
-        normal_format = workbook.add_format({
+        normal_format = self._get_format(workbook, {
             **base_font,
             'align': 'left',
             'valign': 'vcenter',
@@ -67,7 +71,7 @@ class SaatchiXLSX(models.AbstractModel):
         })
 
         # Centered cell format
-        centered_format = workbook.add_format({
+        centered_format = self._get_format(workbook, {
             **base_font,
             'align': 'center',
             'valign': 'vcenter',
@@ -75,7 +79,7 @@ class SaatchiXLSX(models.AbstractModel):
         })
 
         # Right-aligned format for dash in empty cells with margin
-        right_aligned_format = workbook.add_format({
+        right_aligned_format = self._get_format(workbook, {
             **base_font,
             'align': 'right',
             'valign': 'vcenter',
@@ -84,7 +88,7 @@ class SaatchiXLSX(models.AbstractModel):
         })
 
         # Date cell format
-        date_format = workbook.add_format({
+        date_format = self._get_format(workbook, {
             **base_font,
             'num_format': 'mm/dd/yyyy',
             'align': 'center',
@@ -93,7 +97,7 @@ class SaatchiXLSX(models.AbstractModel):
         })
 
         # Total row format (black background)
-        total_format = workbook.add_format({
+        total_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'bg_color': '#000000',
@@ -143,25 +147,9 @@ class SaatchiXLSX(models.AbstractModel):
 
         return months
 
-    def _get_month_bucket(self, inv_date, aging_months):
-        """Determine which aging bucket the invoice falls into."""
-        if not inv_date:
-            return None
-
-        for i, month in enumerate(aging_months):
-            if month['label'] == 'OVER 120 DAYS':
-                # Last bucket catches everything older
-                if inv_date <= month['end_date']:
-                    return i
-            else:
-                if month['start_date'] <= inv_date <= month['end_date']:
-                    return i
-
-        return None
-
     def _create_currency_format(self, workbook, currency_symbol, base_font):
         """Create currency format with symbol."""
-        return workbook.add_format({
+        return self._get_format(workbook, {
             **base_font,
             'num_format': f'{currency_symbol}#,##0.00',
             'align': 'right',
@@ -171,7 +159,7 @@ class SaatchiXLSX(models.AbstractModel):
 
     def _create_total_currency_format(self, workbook, currency_symbol, base_font):
         """Create total currency format with symbol."""
-        return workbook.add_format({
+        return self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': f'{currency_symbol}#,##0.00',
@@ -191,12 +179,14 @@ class SaatchiXLSX(models.AbstractModel):
     def generate_table_header(self, sheet, row, aging_months, currency_code, partner_name, formats):
         """Generate table column headers with dynamic months."""
         # Currency label row
+        sheet.set_row(row, 18)
         sheet.write(row, 0, f'CURRENCY: {currency_code}', formats['top_label'])
         for i in range(1, 6 + len(aging_months)):
             sheet.write(row, i, '', formats['top_label'])
 
         # Row 1: Client label with partner name
         row += 1
+        sheet.set_row(row, 18)
         sheet.write(row, 0, '', formats['top_label'])
         sheet.write(row, 1, 'Client', formats['top_label'])
         sheet.write(row, 2, partner_name, formats['top_label'])
@@ -210,6 +200,7 @@ class SaatchiXLSX(models.AbstractModel):
 
         # Row 2: Actual column headers (with black background)
         row += 1
+        sheet.set_row(row, 18)
         sheet.write(row, 0, 'PO#', formats['black_header'])
         sheet.write(row, 1, 'CE#', formats['black_header'])
         sheet.write(row, 2, 'Project Title', formats['black_header'])
@@ -221,10 +212,6 @@ class SaatchiXLSX(models.AbstractModel):
         for i, month in enumerate(aging_months):
             sheet.write(row, 6 + i, month['label'], formats['black_header'])
 
-        sheet.set_row(row - 2, 18)
-        sheet.set_row(row - 1, 18)
-        sheet.set_row(row, 18)
-
         return row
 
     def generate_summary(self, sheet, row, totals, aging_months, currency_code, formats):
@@ -244,35 +231,53 @@ class SaatchiXLSX(models.AbstractModel):
 
         return row
 
+    def _get_php_conversion_date(self, move):
+        """Conversion date of a move: its sale order date, else the invoice/accounting date."""
+        if move.x_sales_order and move.x_sales_order.date_order:
+            return move.x_sales_order.date_order.date()
+        return move.invoice_date or move.date or datetime.date.today()
+
+    def _load_php_rate_tables(self, moves, php_currency):
+        """
+        Preload the rates needed to convert the moves to PHP.
+
+        Returns:
+            dict: {company_id: RateTable} with the rates of every move currency
+                  at every conversion date of the company's moves
+        """
+        if not php_currency:
+            return {}
+        RateTableService = self.env['base_customization.currency_rate_table']
+        return {
+            company.id: RateTableService.load(
+                company_moves.currency_id | php_currency,
+                [self._get_php_conversion_date(move) for move in company_moves],
+                company)
+            for company, company_moves in moves.grouped('company_id').items()
+        }
+
     def generate_xlsx_report(self, workbook, data, lines):
         """Main report generation method."""
         formats = self._define_formats(workbook)
         base_font = {'font_name': 'Calibri', 'font_size': 10}
 
-        # Group invoices by partner and currency
-        by_partner = {}
+        # Invoices with their month bucket, sorted by partner and currency in SQL
+        items = self._query_aging_items(lines, by_currency=True)
+        aging_totals = self._query_aging_totals(lines)
+        moves = self.env['account.move'].browse([item.id for item in items])
+        moves_by_id = {move.id: move for move in moves}
 
-        for move in lines:
-            if move.move_type in ['out_invoice', 'out_refund'] and move.state == 'posted':
-                partner_name = move.partner_id.name or 'Unknown'
-                currency = move.currency_id
-                currency_key = f"{currency.name}_{currency.id}" if currency else 'NO_CURRENCY'
-
-                if partner_name not in by_partner:
-                    by_partner[partner_name] = {}
-                if currency_key not in by_partner[partner_name]:
-                    by_partner[partner_name][currency_key] = {
-                        'currency': currency,
-                        'moves': []
-                    }
-
-                by_partner[partner_name][currency_key]['moves'].append(move)
+        # PHP conversion tables: currency and rates are loaded once for all partners
+        php_currency = self.env['res.currency'].search([('name', '=', 'PHP')], limit=1)
+        php_rate_tables = self._load_php_rate_tables(moves, php_currency)
 
         # Get current date for report
         report_date = datetime.datetime.now().strftime('%B %d, %Y').upper()
 
         # Generate a sheet per partner (sorted alphabetically)
-        for partner_name, currencies in sorted(by_partner.items()):
+        for partner_name, partner_items in groupby(items, key=attrgetter('partner_name')):
+            partner_items = list(partner_items)
+
             # Create sheet (max 31 chars for sheet name)
             sheet = workbook.add_worksheet(partner_name[:31])
 
@@ -285,12 +290,8 @@ class SaatchiXLSX(models.AbstractModel):
             sheet.set_column(5, 5, 18)   # Total
 
             # Get company name from the first move's company
-            company_name = 'Unknown Company'
-            if currencies:
-                first_currency_data = next(iter(currencies.values()))
-                if first_currency_data['moves']:
-                    first_move = first_currency_data['moves'][0]
-                    company_name = first_move.company_id.name or 'Unknown Company'
+            first_move = moves_by_id[partner_items[0].id]
+            company_name = first_move.company_id.name or 'Unknown Company'
 
             # Generate header with COMPANY NAME instead of customer name
             self.generate_header(sheet, company_name, report_date, formats)
@@ -298,21 +299,13 @@ class SaatchiXLSX(models.AbstractModel):
             # Starting row for tables
             current_row = 3
 
-            # Generate a table for each currency
-            for currency_key, currency_data in currencies.items():
-                currency = currency_data['currency']
-                moves = currency_data['moves']
+            # Generate a table for each currency, in order of first appearance
+            for currency_id, currency_items in groupby(partner_items, key=attrgetter('currency_id')):
+                currency_items = list(currency_items)
+                currency = self.env['res.currency'].browse(currency_id)
 
-                # Find the most recent (advanced) due date in this currency's moves
-                most_recent_due_date = None
-                for move in moves:
-                    due_date = move.invoice_date_due or move.invoice_date or move.date
-                    if due_date:
-                        if most_recent_due_date is None or due_date > most_recent_due_date:
-                            most_recent_due_date = due_date
-
-                # Generate aging months based on the most recent due date
-                aging_months = self._get_aging_months(most_recent_due_date)
+                # Generate aging months based on the most recent due date of this currency
+                aging_months = self._get_aging_months(currency_items[0].last_due_date)
 
                 # Dynamic month columns width
                 for i in range(len(aging_months)):
@@ -332,33 +325,21 @@ class SaatchiXLSX(models.AbstractModel):
                 header_end_row = self.generate_table_header(
                     sheet, current_row, aging_months, currency_code, partner_name, formats)
 
-                # Sort moves by invoice name, then by due date
-                moves_sorted = sorted(
-                    moves, key=lambda x: (x.name or '', x.invoice_date_due or x.invoice_date or x.date))
-
-                # Initialize totals
+                # Totals aggregated in SQL
+                currency_totals = aging_totals[(partner_name, currency_id)]
                 totals = {
-                    'total': 0,
-                    'months': [0] * len(aging_months)
+                    'total': currency_totals['total'],
+                    'months': currency_totals['months'][:len(aging_months)]
                 }
 
-                # Write data rows
+                # Write data rows (already sorted by invoice name, then by due date)
                 row = header_end_row + 1
 
-                for move in moves_sorted:
+                for item in currency_items:
+                    move = moves_by_id[item.id]
                     # Accept both positive and negative amounts
-                    amount = move.amount_residual if move.move_type == 'out_invoice' else -move.amount_residual
-                    totals['total'] += amount
-
-                    # Determine which month bucket this invoice belongs to based on due date
-                    due_date = move.invoice_date_due or move.invoice_date or move.date
-                    bucket_index = self._get_month_bucket(due_date, aging_months)
-
-                    if bucket_index is not None:
-                        totals['months'][bucket_index] += amount
-
-                    # Invoice date for display
-                    inv_date = move.invoice_date or move.date
+                    amount = item.amount
+                    bucket_index = item.month_bucket
 
                     # Get sale order for CE# and Job Description
                     sale_order = move.invoice_line_ids.mapped('sale_line_ids.order_id')[:1] if move.invoice_line_ids else False
@@ -369,11 +350,11 @@ class SaatchiXLSX(models.AbstractModel):
                     ce_code = sale_order.x_ce_code or move.x_studio_old_ce_1 or ''
                     
                     # Write row data
-                    sheet.write(row, 0, move.ref or '', formats['normal'])  # PO#
+                    sheet.write(row, 0, item.ref or '', formats['normal'])  # PO#
                     sheet.write(row, 1, ce_code, formats['centered'])  # CE#
                     sheet.write(row, 2, sale_order.x_job_description or '' if sale_order else '', formats['centered'])  # Project Title
-                    sheet.write(row, 3, move.name or '', formats['centered'])  # Invoice #
-                    sheet.write(row, 4, inv_date, formats['date'])  # Date
+                    sheet.write(row, 3, item.name or '', formats['centered'])  # Invoice #
+                    sheet.write(row, 4, item.inv_date, formats['date'])  # Date
                     sheet.write(row, 5, amount, currency_format)  # Total with currency
 
                     # Month columns - only populate the matching bucket
@@ -396,9 +377,6 @@ class SaatchiXLSX(models.AbstractModel):
 
                 # ── PHP Conversion Table for foreign (non-PHP) currencies ──
                 if currency_code and currency_code != 'PHP':
-                    php_currency = self.env['res.currency'].search(
-                        [('name', '=', 'PHP')], limit=1)
-
                     if php_currency:
                         # PHP-specific formats
                         php_symbol = php_currency.symbol or '₱'
@@ -420,48 +398,22 @@ class SaatchiXLSX(models.AbstractModel):
 
                         php_row = header_end_row + 1
 
-                        for move in moves_sorted:
-                            amount_orig = (
-                                move.amount_residual
-                                if move.move_type == 'out_invoice'
-                                else -move.amount_residual
-                            )
+                        for item in currency_items:
+                            move = moves_by_id[item.id]
 
-                            # Determine conversion date from sale order's date_order
-                            conversion_date = None
-                            if move.x_sales_order and move.x_sales_order.date_order:
-                                conversion_date = move.x_sales_order.date_order.date() \
-                                    if hasattr(move.x_sales_order.date_order, 'date') \
-                                    else move.x_sales_order.date_order
-                            if not conversion_date:
-                                conversion_date = (
-                                    move.invoice_date
-                                    or move.date
-                                    or datetime.date.today()
-                                )
-
-                            # Convert using Odoo's currency conversion
-                            php_amount = currency._convert(
-                                amount_orig, php_currency,
-                                move.company_id,
-                                conversion_date)
+                            # Convert with the rates preloaded for all moves
+                            php_amount = php_rate_tables[move.company_id.id].convert(
+                                item.amount, currency, php_currency,
+                                self._get_php_conversion_date(move))
 
                             php_totals['total'] += php_amount
 
                             # Bucket assignment (same as original table)
-                            due_date = (
-                                move.invoice_date_due
-                                or move.invoice_date
-                                or move.date
-                            )
-                            bucket_index = self._get_month_bucket(
-                                due_date, aging_months)
+                            bucket_index = item.month_bucket
 
                             if bucket_index is not None:
                                 php_totals['months'][bucket_index] += php_amount
 
-                            inv_date = move.invoice_date or move.date
-
                             sale_order = (
                                 move.invoice_line_ids.mapped(
                                     'sale_line_ids.order_id')[:1]
@@ -475,7 +427,7 @@ class SaatchiXLSX(models.AbstractModel):
                             )
 
                             # Write row data (PHP converted amounts)
-                            sheet.write(php_row, 0, move.ref or '',
+                            sheet.write(php_row, 0, item.ref or '',
                                         formats['normal'])
                             sheet.write(php_row, 1, ce_code,
                                         formats['centered'])
@@ -483,9 +435,9 @@ class SaatchiXLSX(models.AbstractModel):
                                         sale_order.x_job_description or ''
                                         if sale_order else '',
                                         formats['centered'])
-                            sheet.write(php_row, 3, move.name or '',
+                            sheet.write(php_row, 3, item.name or '',
                                         formats['centered'])
-                            sheet.write(php_row, 4, inv_date,
+                            sheet.write(php_row, 4, item.inv_date,
                                         formats['date'])
                             sheet.write(php_row, 5, php_amount,
                                         php_currency_fmt)
@@ -512,4 +464,4 @@ class SaatchiXLSX(models.AbstractModel):
 
                         current_row += 2
 
-        return True
\ No newline at end of file
+        return True
@@ -1,4 +1,6 @@
 from odoo import models
+from itertools import groupby
+from operator import itemgetter
 import datetime
 from xlsxwriter.workbook import Workbook
 from odoo.exceptions import ValidationError, UserError
@@ -17,14 +19,14 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         base_font = {'font_name': 'Arial', 'font_size': 9}
         
         # Header formats
-        company_format = workbook.add_format({
+        company_format = self._get_format(workbook, {
             'font_name': 'Arial',
             'font_size': 9,
             'align': 'left',
             'valign': 'top'
         })
         
-        title_format = workbook.add_format({
+        title_format = self._get_format(workbook, {
             'font_name': 'Arial',
             'font_size': 11,
             'bold': True,
@@ -32,7 +34,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
             'valign': 'vcenter'
         })
         
-        date_user_format = workbook.add_format({
+        date_user_format = self._get_format(workbook, {
             'font_name': 'Arial',
             'font_size': 8,
             'align': 'right',
@@ -40,7 +42,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         })
         
         # Main header format (Approved Estimated, Invoiced to date, Variance)
-        main_header_approved = workbook.add_format({
+        main_header_approved = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -51,7 +53,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
             'border_color': '#000000'
         })
         
-        main_header_invoiced = workbook.add_format({
+        main_header_invoiced = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -62,7 +64,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
             'border_color': '#000000'
         })
         
-        main_header_variance = workbook.add_format({
+        main_header_variance = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -73,7 +75,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
             'border_color': '#000000'
         })
         
-        main_header_remarks = workbook.add_format({
+        main_header_remarks = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -85,7 +87,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         })
         
         # CE Status header format (same green as Remarks)
-        main_header_ce_status = workbook.add_format({
+        main_header_ce_status = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -97,7 +99,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         })
         
         # Sub-header format (Billing/Revenue) - with same background colors
-        sub_header_approved = workbook.add_format({
+        sub_header_approved = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -108,7 +110,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
             'border_color': '#000000'
         })
         
-        sub_header_invoiced = workbook.add_format({
+        sub_header_invoiced = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -119,7 +121,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
             'border_color': '#000000'
         })
         
-        sub_header_variance = workbook.add_format({
+        sub_header_variance = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -131,7 +133,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         })
         
         # Job column header - NO background color
-        job_header_format = workbook.add_format({
+        job_header_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -141,21 +143,21 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         })
         
         # Data row formats - NO BORDERS
-        partner_format = workbook.add_format({
+        partner_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'left',
             'valign': 'vcenter'
         })
         
-        ce_format = workbook.add_format({
+        ce_format = self._get_format(workbook, {
             **base_font,
             'align': 'left',
             'valign': 'vcenter',
             'indent': 1
         })
         
-        currency_format = workbook.add_format({
+        currency_format = self._get_format(workbook, {
             **base_font,
             'num_format': '#,##0.00',
             'align': 'right',
@@ -163,7 +165,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         })
         
         # Subtotal format - WITH TOP BORDER ONLY (on numeric columns only)
-        currency_subtotal_format = workbook.add_format({
+        currency_subtotal_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'num_format': '#,##0.00',
@@ -174,7 +176,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         })
         
         # Subtotal dash format - for empty values in subtotal row with top border
-        subtotal_dash_format = workbook.add_format({
+        subtotal_dash_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
@@ -183,30 +185,30 @@ class UnbilledEstimateXLSX(models.AbstractModel):
             'top_color': '#000000'
         })
         
-        text_format = workbook.add_format({
+        text_format = self._get_format(workbook, {
             **base_font,
             'align': 'left',
             'valign': 'vcenter'
         })
         
         # CE Status format - centered and bold
-        ce_status_format = workbook.add_format({
+        ce_status_format = self._get_format(workbook, {
             **base_font,
             'bold': True,
             'align': 'center',
             'valign': 'vcenter'
         })
         
-        dash_format = workbook.add_format({
+        dash_format = self._get_format(workbook, {
             **base_font,
             'align': 'center',
             'valign': 'vcenter'
         })
         
-        empty_cell_format = workbook.add_format({})
+        empty_cell_format = self._get_format(workbook, {})
         
         # Subtotal empty format - NO border for Job and Remarks columns
-        subtotal_empty_format = workbook.add_format({})
+        subtotal_empty_format = self._get_format(workbook, {})
         
         return {
             'company': company_format,
@@ -315,20 +317,24 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         
         current_row = sub_header_row + 1
         
-        # Group sale orders by partner (filter only with CE code and sale status)
-        partners_dict = {}
-        for order in lines:
-            # Filter: only orders with CE code and in 'sale' state
-            if not order.x_ce_code or order.state != 'sale':
-                continue
-                
-            partner_name = order.partner_id.name or 'Unknown Partner'
-            if partner_name not in partners_dict:
-                partners_dict[partner_name] = []
-            partners_dict[partner_name].append(order)
-        
-        # Sort partners alphabetically
-        sorted_partners = sorted(partners_dict.keys())
+        # Approved, invoiced and variance amounts of the open CEs, aggregated
+        # by the saatchi.unbilled_estimate view and sorted by partner in one query
+        amount_fields = [
+            'approved_billing', 'approved_revenue',
+            'invoiced_billing', 'invoiced_revenue',
+            'variance_billing', 'variance_revenue',
+        ]
+        estimates = self.env['saatchi.unbilled_estimate']._read_group(
+            [
+                ('order_id', 'in', lines.ids),
+                ('ce_code', 'not in', [False, '']),
+                ('state', '=', 'sale'),
+            ],
+            groupby=['partner_name', 'ce_code', 'order_id', 'job_description', 'ce_status', 'remarks'],
+            aggregates=[f'{field}:sum' for field in amount_fields],
+            order='partner_name, ce_code, order_id',
+        )
+        ce_status_labels = dict(self.env['sale.order']._fields['x_ce_status'].selection)
         
         # Initialize grand totals
         grand_total = {
@@ -341,12 +347,7 @@ class UnbilledEstimateXLSX(models.AbstractModel):
         }
         
         # Generate data rows
-        for partner_name in sorted_partners:
-            orders = partners_dict[partner_name]
-            
-            # Sort orders by CE code within partner
-            orders_sorted = sorted(orders, key=lambda x: x.x_ce_code or '')
-            
+        for partner_name, partner_estimates in groupby(estimates, key=itemgetter(0)):
             # Write partner row
             sheet.write(current_row, 0, partner_name, formats['partner'])
             for col in range(1, 9):
@@ -364,49 +365,42 @@ class UnbilledEstimateXLSX(models.AbstractModel):
                 'variance_revenue': 0
             }
             
-            # Write CE/SO rows
-            for order in orders_sorted:
+            # Write CE/SO rows (already sorted by CE code)
+            for _partner_name, ce_code, _order, job_description, ce_status, remarks, *amounts in partner_estimates:
+                amounts = dict(zip(amount_fields, amounts))
+
                 # CE# + Job Description
-                ce_text = f"{order.x_ce_code or ''} - {order.x_job_description or ''}".strip(' -')
+                ce_text = f"{ce_code or ''} - {job_description or ''}".strip(' -')
                 sheet.write(current_row, 0, ce_text, formats['ce'])
                 
                 # Approved Estimate
-                self._write_value(sheet, current_row, 1, order.x_ce_approved_estimate_billing, formats)
-                self._write_value(sheet, current_row, 2, order.x_ce_approved_estimate_revenue, formats)
+                self._write_value(sheet, current_row, 1, amounts['approved_billing'], formats)
+                self._write_value(sheet, current_row, 2, amounts['approved_revenue'], formats)
                 
                 # Invoiced to date
-                self._write_value(sheet, current_row, 3, order.x_ce_invoiced_billing, formats)
-                self._write_value(sheet, current_row, 4, order.x_ce_invoiced_revenue, formats)
+                self._write_value(sheet, current_row, 3, amounts['invoiced_billing'], formats)
+                self._write_value(sheet, current_row, 4, amounts['invoiced_revenue'], formats)
                 
                 # Variance
-                self._write_value(sheet, current_row, 5, order.x_ce_variance_billing, formats)
-                self._write_value(sheet, current_row, 6, order.x_ce_variance_revenue, formats)
+                self._write_value(sheet, current_row, 5, amounts['variance_billing'], formats)
+                self._write_value(sheet, current_row, 6, amounts['variance_revenue'], formats)
                 
                 # CE Status - centered, bold, and uppercase (get label, not technical value)
-                if order.x_ce_status:
-                    selection_list = order._fields['x_ce_status'].selection
-                    ce_status = dict(selection_list).get(order.x_ce_status)
-                    if ce_status:
-                        sheet.write(current_row, 7, ce_status.upper(), formats['ce_status'])
-                    else:
-                        sheet.write(current_row, 7, '', formats['empty'])
+                ce_status_label = ce_status_labels.get(ce_status) if ce_status else False
+                if ce_status_label:
+                    sheet.write(current_row, 7, ce_status_label.upper(), formats['ce_status'])
                 else:
                     sheet.write(current_row, 7, '', formats['empty'])
                 
                 # Remarks
-                remarks = order.x_remarks or ''
                 if remarks:
                     sheet.write(current_row, 8, remarks, formats['text'])
                 else:
                     sheet.write(current_row, 8, '', formats['empty'])
                 
                 # Add to subtotals
-                subtotal['approved_billing'] += order.x_ce_approved_estimate_billing or 0
-                subtotal['approved_revenue'] += order.x_ce_approved_estimate_revenue or 0
-                subtotal['invoiced_billing'] += order.x_ce_invoiced_billing or 0
-                subtotal['invoiced_revenue'] += order.x_ce_invoiced_revenue or 0
-                subtotal['variance_billing'] += order.x_ce_variance_billing or 0
-                subtotal['variance_revenue'] += order.x_ce_variance_revenue or 0
+                for field in amount_fields:
+                    subtotal[field] += amounts[field] or 0
                 
                 sheet.set_row(current_row, 18)
                 current_row += 1
@@ -0,0 +1,2 @@
+from . import test_accrued_revenue_benchmark
+from . import test_report_benchmark
@@ -0,0 +1,134 @@
+import datetime
+import logging
+import time
+from io import BytesIO
+from unittest.mock import patch
+
+from odoo.tests import common, tagged
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import xlsxwriter
+except ImportError:
+    _logger.debug("Can not import xlsxwriter`.")
+
+
+@tagged("post_install", "-at_install")
+class TestAccruedRevenueMonthSheetBenchmark(common.TransactionCase):
+    """Micro-benchmark of the accrued revenue month sheet build vs. CE count."""
+
+    CE_COUNTS = (250, 1000, 4000)
+    PARTNER_COUNT = 50
+
+    def setUp(self):
+        super().setUp()
+        self.report = self.env["report.accrued_revenue_xlsx"]
+        self.accrual_month = datetime.date(2025, 11, 1)
+
+    def _synthetic_month(self, ce_count):
+        """Grouped rows and previous balances for ``ce_count`` CE codes.
+
+        Each CE has one balance under its journal partner and one under an
+        opening balance partner with a differently spaced CE code, which is
+        the case the normalized lookup has to merge.
+        """
+        grouped = {}
+        balances = {}
+        for i in range(ce_count):
+            partner_name = f"CLIENT {i % self.PARTNER_COUNT:03d}"
+            ce_code = f"XRN{i:06d}"
+            grouped.setdefault(partner_name, {})[ce_code] = {
+                "ce_date": self.accrual_month,
+                "description": f"JOB {i}",
+                "year": self.accrual_month.year,
+                "ce_status": "BILLABLE",
+                "so_reference": f"S{i:06d}",
+                "lines": [True],
+            }
+            balances[(partner_name, ce_code)] = 100.0
+            balances[(f"OB CLIENT {i}", f"XRN {i:06d}")] = 50.0
+        return grouped, balances
+
+    def _build_month_sheet(self, ce_count, workbook=None, accrual_month=None):
+        accrual_month = accrual_month or self.accrual_month
+        grouped, balances = self._synthetic_month(ce_count)
+        zero_amounts = dict.fromkeys(
+            [
+                "system_reversal",
+                "system_accrual",
+                "manual_reversal",
+                "manual_reaccrual",
+                "manual_adjustment",
+            ],
+            0,
+        )
+        report_cls = type(self.report)
+        with patch.object(
+            report_cls, "_calculate_prev_month_balances", return_value=balances
+        ), patch.object(
+            report_cls, "_calculate_reversal_opening_balances", return_value={}
+        ), patch.object(
+            report_cls, "_group_lines_by_ce", return_value=grouped
+        ), patch.object(
+            report_cls, "_get_opening_balance_cutoff_date", return_value=False
+        ), patch.object(
+            report_cls, "_calculate_amounts_by_type", return_value=zero_amounts
+        ), patch.object(
+            report_cls, "_generate_accrual_breakdown_sheet", return_value=True
+        ), patch.object(
+            report_cls, "_generate_gl_sheet", return_value=True
+        ):
+            own_workbook = workbook is None
+            if own_workbook:
+                workbook = xlsxwriter.Workbook(BytesIO(), {"in_memory": True})
+            formats = self.report._define_formats(workbook)
+            start = time.perf_counter()
+            self.report._generate_month_sheets(
+                workbook, formats, [], [], accrual_month, 0
+            )
+            elapsed = time.perf_counter() - start
+            if own_workbook:
+                workbook.close()
+        return elapsed
+
+    def test_month_sheet_build_time_by_ce_count(self):
+        report_cls = type(self.report)
+        normalize_calls = {}
+        for ce_count in self.CE_COUNTS:
+            with patch.object(
+                report_cls,
+                "_normalize_ce_code",
+                autospec=True,
+                side_effect=report_cls._normalize_ce_code,
+            ) as normalize:
+                elapsed = self._build_month_sheet(ce_count)
+            normalize_calls[ce_count] = normalize.call_count
+            _logger.info(
+                "Accrued revenue month sheet: %d CE rows in %.3fs (%.1f us/row), "
+                "%d CE# normalizations",
+                ce_count,
+                elapsed,
+                elapsed / ce_count * 1e6,
+                normalize_calls[ce_count],
+            )
+
+        # With the normalized-CE index the CE# lookups per row stay flat; the
+        # old scan over every balance made them grow linearly with the CE
+        # count. Timings are only logged: wall-clock ratios are too noisy.
+        smallest, largest = self.CE_COUNTS[0], self.CE_COUNTS[-1]
+        per_row_small = normalize_calls[smallest] / smallest
+        per_row_large = normalize_calls[largest] / largest
+        self.assertLessEqual(per_row_large, per_row_small * 1.5, normalize_calls)
+
+    def test_format_count_by_month_and_customer_count(self):
+        workbook = xlsxwriter.Workbook(BytesIO(), {"in_memory": True})
+        format_counts = []
+        for months, ce_count in enumerate((10, 100, 1000)):
+            accrual_month = datetime.date(2025, 1 + months, 1)
+            self._build_month_sheet(ce_count, workbook, accrual_month)
+            format_counts.append(len(workbook.formats))
+        workbook.close()
+        # Formats are shared through the report_xlsx registry: more months
+        # and customers reuse them instead of adding new ones.
+        self.assertEqual(len(set(format_counts)), 1, format_counts)
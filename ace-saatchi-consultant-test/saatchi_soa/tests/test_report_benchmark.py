@@ -0,0 +1,186 @@
+import datetime
+import logging
+import os
+
+from dateutil.relativedelta import relativedelta
+
+from odoo.tests import common, tagged
+
+from odoo.addons.report_xlsx.tests.benchmark import XlsxReportBenchmark
+
+_logger = logging.getLogger(__name__)
+
+# Accrued revenue move lines to generate per run, e.g. "1000,10000,100000"
+SCALES_ENV = "SAATCHI_REPORT_BENCHMARK_SCALES"
+DEFAULT_SCALES = "1000"
+CHUNK_SIZE = 1000
+
+
+class _ScaleDone(Exception):
+    """Raised to roll back the synthetic data of one scale."""
+
+
+@tagged("report_benchmark", "-standard", "post_install", "-at_install")
+class TestSaatchiReportBenchmark(common.TransactionCase):
+    """Render every SOA workbook on synthetic data of increasing size.
+
+    Not part of the standard run, use ``--test-tags report_benchmark``. Scales
+    are read from ``SAATCHI_REPORT_BENCHMARK_SCALES``; the output file and
+    cProfile directory are the ones of the report_xlsx benchmark harness.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.currency = cls.company.currency_id
+        cls.month_end = datetime.date.today().replace(day=1) - relativedelta(days=1)
+        cls.month_start = cls.month_end.replace(day=1)
+
+        cls.accrued_account = cls.env["account.account"].create({
+            "name": "Benchmark Accrued Revenue",
+            "code": "BENCHACR",
+            "account_type": "asset_current",
+        })
+        cls.income_account = cls.env["account.account"].create({
+            "name": "Benchmark Revenue",
+            "code": "BENCHREV",
+            "account_type": "income",
+        })
+        cls.env["ir.config_parameter"].sudo().set_param(
+            "account.accrued_revenue_account_id", cls.accrued_account.id
+        )
+        cls.general_journal = cls.env["account.journal"].search([
+            ("type", "=", "general"),
+            ("company_id", "=", cls.company.id),
+        ], limit=1)
+
+    def _create_in_chunks(self, model, vals_list):
+        records = self.env[model]
+        for start in range(0, len(vals_list), CHUNK_SIZE):
+            records |= self.env[model].create(vals_list[start:start + CHUNK_SIZE])
+        return records
+
+    def _generate_data(self, scale):
+        """Partners, sale orders, posted accrual/reversal moves and invoices.
+
+        ``scale`` is the number of accrued revenue move lines: every sale order
+        gets one accrual and one reversal, each with one accrued line.
+        """
+        so_count = max(scale // 2, 1)
+        partners = self._create_in_chunks("res.partner", [
+            {"name": f"BENCH CLIENT {i:05d}", "customer_rank": 1}
+            for i in range(max(scale // 100, 10))
+        ])
+        orders = self._create_in_chunks("sale.order", [
+            {
+                "partner_id": partners[i % len(partners)].id,
+                "x_job_description": f"BENCH JOB {i}",
+                "x_ce_status": "billable",
+            }
+            for i in range(so_count)
+        ])
+        accrued_records = self._create_in_chunks("saatchi.accrued_revenue", [
+            {
+                "x_related_ce_id": order.id,
+                "journal_id": self.general_journal.id,
+                "accrual_account_id": self.accrued_account.id,
+                "date": self.month_end - relativedelta(months=1),
+                "currency_id": self.currency.id,
+                "company_id": self.company.id,
+            }
+            for order in orders
+        ])
+
+        move_vals = []
+        for i, accrued in enumerate(accrued_records):
+            amount = 1000.0 + i % 997
+            partner_id = accrued.x_related_ce_id.partner_id.id
+            for ref, date, sign in (
+                ("Accrual", accrued.date, 1),
+                ("Reversal of Accrual", self.month_start, -1),
+            ):
+                move_vals.append({
+                    "move_type": "entry",
+                    "journal_id": self.general_journal.id,
+                    "date": date,
+                    "ref": f"{ref} {accrued.x_related_ce_id.name}",
+                    "x_related_custom_accrued_record": accrued.id,
+                    "x_accrual_system_generated": True,
+                    "line_ids": [
+                        (0, 0, {
+                            "account_id": self.accrued_account.id,
+                            "partner_id": partner_id,
+                            "debit": amount if sign > 0 else 0.0,
+                            "credit": amount if sign < 0 else 0.0,
+                        }),
+                        (0, 0, {
+                            "account_id": self.income_account.id,
+                            "partner_id": partner_id,
+                            "debit": amount if sign < 0 else 0.0,
+                            "credit": amount if sign > 0 else 0.0,
+                        }),
+                    ],
+                })
+        moves = self._create_in_chunks("account.move", move_vals)
+        moves.action_post()
+
+        invoices = self._create_in_chunks("account.move", [
+            {
+                "move_type": "out_invoice",
+                "partner_id": partners[i % len(partners)].id,
+                "invoice_date": self.month_end - relativedelta(days=i % 180),
+                "invoice_line_ids": [(0, 0, {
+                    "name": f"BENCH SERVICE {i}",
+                    "quantity": 1,
+                    "price_unit": 500.0 + i % 991,
+                    "account_id": self.income_account.id,
+                })],
+            }
+            for i in range(max(scale // 10, 1))
+        ])
+        invoices.action_post()
+
+        accrued_lines = moves.line_ids.filtered(
+            lambda l: l.account_id == self.accrued_account)
+        return {
+            "orders": orders,
+            "accrued_lines": accrued_lines,
+            "invoices": invoices,
+        }
+
+    def test_report_benchmark(self):
+        scales = [int(s) for s in os.environ.get(SCALES_ENV, DEFAULT_SCALES).split(",")]
+        bench = XlsxReportBenchmark(self.env)
+        for scale in scales:
+            with self.subTest(scale=scale):
+                self._run_scale(bench, scale)
+        bench.write({"scales": scales})
+
+    def _run_scale(self, bench, scale):
+        # Each scale runs on its own data, rolled back once measured
+        try:
+            with self.env.cr.savepoint():
+                data = self._generate_data(scale)
+                self._render_reports(bench, data, str(scale))
+                self.env.flush_all()
+                raise _ScaleDone()
+        except _ScaleDone:
+            self.env.invalidate_all(flush=False)
+
+    def _render_reports(self, bench, data, label):
+        invoices = data["invoices"]
+        accrued_lines = data["accrued_lines"]
+        bench.run("saatchi_soa_xlsx", invoices.ids, label=label)
+        bench.run("aged_receivables_xlsx", invoices.ids, label=label)
+        bench.run("unbilled_estimate_xlsx", data["orders"].ids, label=label)
+        bench.run("accrued_revenue_xlsx", accrued_lines.ids, data={
+            "start_date": self.month_start.isoformat(),
+            "end_date": self.month_start.isoformat(),
+        }, label=label)
+        bench.run("sales_order_revenue_xlsx", data={
+            "report_date": self.month_start.isoformat(),
+            "partner_ids": [],
+            "move_line_ids": accrued_lines.ids,
+            "all_billed_so_ids": data["orders"].ids,
+        }, label=label)
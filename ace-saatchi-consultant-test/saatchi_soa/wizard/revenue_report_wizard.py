@@ -31,10 +31,6 @@ class SalesOrderRevenueWizard(models.TransientModel):
                 "Please set it in system parameters (account.accrued_revenue_account_id)."
             )
         
-        # Calculate month range
-        month_start = self.report_date.replace(day=1)
-        month_end = (month_start + relativedelta(months=1)) - relativedelta(days=1)
-        
         # Build domain for account.move.line search (accrued entries)
         domain = [
             ('account_id', 'in', accrued_account_ids),
@@ -50,23 +46,13 @@ class SalesOrderRevenueWizard(models.TransientModel):
         # Fetch all relevant accrued revenue move lines
         accrued_lines = self.env['account.move.line'].search(domain)
         
-        # Get Sales Orders that were billed in the report month
-        invoice_domain = [
-            ('move_type', '=', 'out_invoice'),
-            ('state', '=', 'posted'),
-            ('invoice_date', '>=', month_start),
-            ('invoice_date', '<=', month_end),
-        ]
-        
-        if self.partner_ids:
-            invoice_domain.append(('partner_id', 'in', self.partner_ids.ids))
-        
-        invoices = self.env['account.move'].search(invoice_domain)
-        
-        # Get ALL sales orders from these invoices (whether they have accrued entries or not)
-        all_billed_sales_orders = invoices.mapped('invoice_line_ids.sale_line_ids.order_id')
+        # Get ALL sales orders billed in the report month (whether they have accrued entries or not),
+        # aggregated in one query through the invoice lines
+        billed_amounts = self.env['report.sales_order_revenue_xlsx']._get_billed_amounts(
+            self.report_date, partner_ids=self.partner_ids.ids)
+        all_billed_so_ids = sorted(billed_amounts)
         # raise UserError(accrued_account_ids)
-        if not accrued_lines and not all_billed_sales_orders:
+        if not accrued_lines and not all_billed_so_ids:
             if self.partner_ids:
                 customer_names = ', '.join(self.partner_ids.mapped('name'))
                 raise UserError(
@@ -80,7 +66,7 @@ class SalesOrderRevenueWizard(models.TransientModel):
             'report_date': self.report_date.isoformat(),
             'partner_ids': self.partner_ids.ids if self.partner_ids else [],
             'move_line_ids': accrued_lines.ids,  # Pass move line IDs for accrued entries
-            'all_billed_so_ids': all_billed_sales_orders.ids,  # Pass ALL billed SO IDs
+            'all_billed_so_ids': all_billed_so_ids,  # Pass ALL billed SO IDs
         }
         
         # Return the report action
@@ -16,11 +16,140 @@
 
 from __future__ import absolute_import
 
+import functools
 import os
 import re
+import threading
+from collections import OrderedDict
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
 
 __author__ = "Lindsey Simon <elsigh@gmail.com>"
 
+# Shortest literal worth indexing a parser on
+MIN_LITERAL_LENGTH = 2
+# Most alternative literals a parser is indexed on
+MAX_LITERAL_ALTERNATIVES = 64
+
+# Try only the parsers whose required literals appear in the UA string
+USE_PREFILTER = True
+
+_REPEATS = tuple(
+    getattr(sre_constants, name)
+    for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+    if hasattr(sre_constants, name)
+)
+
+
+def _Requirements(parsed):
+    """Literal requirements of a parsed pattern.
+
+    Returns:
+      A list of sets of strings: every match contains at least one string
+      of each set.
+    """
+    requirements, current = [], []
+    for op, av in parsed:
+        if op == sre_constants.LITERAL:
+            current.append(chr(av))
+            continue
+        if current:
+            requirements.append({"".join(current)})
+            current = []
+        if op == sre_constants.SUBPATTERN:
+            requirements.extend(_Requirements(av[-1]))
+        elif op in _REPEATS and av[0] >= 1:
+            requirements.extend(_Requirements(av[2]))
+        elif op == getattr(sre_constants, "ATOMIC_GROUP", None):
+            requirements.extend(_Requirements(av))
+        elif op == sre_constants.BRANCH:
+            # Each alternative must contribute one of its own requirements
+            alternatives = set()
+            for branch in av[1]:
+                best = _BestRequirement(_Requirements(branch))
+                if not best:
+                    alternatives = None
+                    break
+                alternatives |= best
+            if alternatives:
+                requirements.append(alternatives)
+    if current:
+        requirements.append({"".join(current)})
+    return requirements
+
+
+def _BestRequirement(requirements):
+    """Most selective requirement: longest shortest string, then fewest strings."""
+    usable = [
+        {literal.lower() for literal in requirement}
+        for requirement in requirements
+        if len(requirement) <= MAX_LITERAL_ALTERNATIVES
+        and all(
+            len(literal) >= MIN_LITERAL_LENGTH and literal.isascii()
+            for literal in requirement
+        )
+    ]
+    if not usable:
+        return None
+    return max(
+        usable,
+        key=lambda requirement: (min(map(len, requirement)), -len(requirement)),
+    )
+
+
+def RequiredLiterals(pattern):
+    """Lowercased literals, at least one of which any match of the pattern contains.
+
+    Args:
+      pattern: a regular expression string
+    Returns:
+      A sorted tuple of literals, or None when no such set of ASCII literals
+      of at least MIN_LITERAL_LENGTH characters could be found.
+    """
+    try:
+        requirement = _BestRequirement(_Requirements(sre_parse.parse(pattern)))
+    except Exception:
+        return None
+    return tuple(sorted(requirement)) if requirement else None
+
+
+class ParserIndex(object):
+    """Prefilter of an ordered list of parsers on their required literals.
+
+    A parser can only match a UA string containing one of its literals, so
+    only the parsers with a literal in the string, and those without
+    literals, are tried. They are returned in their original order, keeping
+    the first match semantics.
+    """
+
+    def __init__(self, parsers):
+        self.parsers = parsers
+        self._unindexed = []
+        self._by_literal = OrderedDict()
+        for position, parser in enumerate(parsers):
+            if parser.literals:
+                for literal in parser.literals:
+                    self._by_literal.setdefault(literal, []).append(position)
+            else:
+                self._unindexed.append(position)
+
+    def Candidates(self, user_agent_string):
+        """Parsers that may match the UA string, in their original order."""
+        # Lowercasing non-ASCII text can change its length or case folding
+        if not USE_PREFILTER or not user_agent_string.isascii():
+            return self.parsers
+        lowered = user_agent_string.lower()
+        positions = set(self._unindexed)
+        for literal, literal_positions in self._by_literal.items():
+            if literal in lowered:
+                positions.update(literal_positions)
+        parsers = self.parsers
+        return [parsers[position] for position in sorted(positions)]
+
 
 class UserAgentParser(object):
     def __init__(
@@ -36,6 +165,7 @@ class UserAgentParser(object):
         """
         self.pattern = pattern
         self.user_agent_re = re.compile(self.pattern)
+        self.literals = RequiredLiterals(self.pattern)
         self.family_replacement = family_replacement
         self.v1_replacement = v1_replacement
         self.v2_replacement = v2_replacement
@@ -99,6 +229,7 @@ class OSParser(object):
         """
         self.pattern = pattern
         self.user_agent_re = re.compile(self.pattern)
+        self.literals = RequiredLiterals(self.pattern)
         self.os_replacement = os_replacement
         self.os_v1_replacement = os_v1_replacement
         self.os_v2_replacement = os_v2_replacement
@@ -181,6 +312,7 @@ class DeviceParser(object):
             self.user_agent_re = re.compile(self.pattern, re.IGNORECASE)
         else:
             self.user_agent_re = re.compile(self.pattern)
+        self.literals = RequiredLiterals(self.pattern)
         self.device_replacement = device_replacement
         self.brand_replacement = brand_replacement
         self.model_replacement = model_replacement
@@ -214,10 +346,120 @@ class DeviceParser(object):
         return device, brand, model
 
 
-MAX_CACHE_SIZE = 20
-_parse_cache = {}
+class LRUCache(object):
+    """Thread-safe least recently used cache, with hit, miss and eviction counters."""
+
+    def __init__(self, maxsize):
+        """Initialize LRUCache.
+
+        Args:
+          maxsize: maximum number of entries, the least recently used entry is
+            evicted beyond it
+        """
+        self.maxsize = max(int(maxsize), 0)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (True, value) when key is cached, (False, None) otherwise."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key, value):
+        with self._lock:
+            if not self.maxsize:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = max(int(maxsize), 0)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+# Size of the cache of each parse function, 0 disables caching
+MAX_CACHE_SIZE = int(os.environ.get("UA_PARSER_CACHE_SIZE") or 1000)
+_caches = OrderedDict(
+    (name, LRUCache(MAX_CACHE_SIZE))
+    for name in ("Parse", "ParseUserAgent", "ParseOS", "ParseDevice")
+)
+
+
+def _cached(func):
+    """Cache the results of a parse function by UA string and override bits."""
+    cache = _caches[func.__name__]
+
+    @functools.wraps(func)
+    def wrapper(user_agent_string, **jsParseBits):
+        key = (user_agent_string, repr(jsParseBits)) if jsParseBits else user_agent_string
+        found, value = cache.get(key)
+        if not found:
+            value = func(user_agent_string, **jsParseBits)
+            cache.put(key, value)
+        return value
+
+    return wrapper
+
+
+def GetCacheStats():
+    """ Counters of the parse caches
+    Returns:
+      A dictionary of {function name: {size, maxsize, hits, misses, evictions}}
+    """
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def SetCacheSize(maxsize):
+    """ Resize the parse caches, evicting the least recently used entries
+    Args:
+      maxsize: maximum number of entries of each cache, 0 disables caching
+    """
+    global MAX_CACHE_SIZE
+    MAX_CACHE_SIZE = max(int(maxsize), 0)
+    for cache in _caches.values():
+        if cache.maxsize != MAX_CACHE_SIZE:
+            cache.resize(MAX_CACHE_SIZE)
+
+
+def ClearCache():
+    """ Empty the parse caches and reset their counters """
+    for cache in _caches.values():
+        cache.clear()
 
 
+@_cached
 def Parse(user_agent_string, **jsParseBits):
     """ Parse all the things
     Args:
@@ -227,22 +469,15 @@ def Parse(user_agent_string, **jsParseBits):
       A dictionary containing all parsed bits
     """
     jsParseBits = jsParseBits or {}
-    key = (user_agent_string, repr(jsParseBits))
-    cached = _parse_cache.get(key)
-    if cached is not None:
-        return cached
-    if len(_parse_cache) > MAX_CACHE_SIZE:
-        _parse_cache.clear()
-    v = {
+    return {
         "user_agent": ParseUserAgent(user_agent_string, **jsParseBits),
         "os": ParseOS(user_agent_string, **jsParseBits),
         "device": ParseDevice(user_agent_string, **jsParseBits),
         "string": user_agent_string,
     }
-    _parse_cache[key] = v
-    return v
 
 
+@_cached
 def ParseUserAgent(user_agent_string, **jsParseBits):
     """ Parses the user-agent string for user agent (browser) info.
     Args:
@@ -260,7 +495,8 @@ def ParseUserAgent(user_agent_string, **jsParseBits):
         v2 = jsParseBits.get("js_user_agent_v2") or None
         v3 = jsParseBits.get("js_user_agent_v3") or None
     else:
-        for uaParser in USER_AGENT_PARSERS:
+        family, v1, v2, v3 = None, None, None, None
+        for uaParser in USER_AGENT_INDEX.Candidates(user_agent_string):
             family, v1, v2, v3 = uaParser.Parse(user_agent_string)
             if family:
                 break
@@ -289,6 +525,7 @@ def ParseUserAgent(user_agent_string, **jsParseBits):
     }
 
 
+@_cached
 def ParseOS(user_agent_string, **jsParseBits):
     """ Parses the user-agent string for operating system info
     Args:
@@ -297,7 +534,8 @@ def ParseOS(user_agent_string, **jsParseBits):
     Returns:
       A dictionary containing parsed bits.
     """
-    for osParser in OS_PARSERS:
+    os, os_v1, os_v2, os_v3, os_v4 = None, None, None, None, None
+    for osParser in OS_INDEX.Candidates(user_agent_string):
         os, os_v1, os_v2, os_v3, os_v4 = osParser.Parse(user_agent_string)
         if os:
             break
@@ -311,6 +549,7 @@ def ParseOS(user_agent_string, **jsParseBits):
     }
 
 
+@_cached
 def ParseDevice(user_agent_string):
     """ Parses the user-agent string for device info.
     Args:
@@ -319,7 +558,8 @@ def ParseDevice(user_agent_string):
     Returns:
         A dictionary containing parsed bits.
     """
-    for deviceParser in DEVICE_PARSERS:
+    device, brand, model = None, None, None
+    for deviceParser in DEVICE_INDEX.Candidates(user_agent_string):
         device, brand, model = deviceParser.Parse(user_agent_string)
         if device:
             break
@@ -383,7 +623,8 @@ def ParseWithJSOverrides(
         if js_user_agent_v3 is not None:
             v3 = js_user_agent_v3
     else:
-        for parser in USER_AGENT_PARSERS:
+        family, v1, v2, v3 = None, None, None, None
+        for parser in USER_AGENT_INDEX.Candidates(user_agent_string):
             family, v1, v2, v3 = parser.Parse(user_agent_string)
             if family:
                 break
@@ -542,3 +783,7 @@ if UA_PARSER_YAML:
 else:
     # Just load our pre-compiled versions
     from ._regexes import USER_AGENT_PARSERS, DEVICE_PARSERS, OS_PARSERS
+
+USER_AGENT_INDEX = ParserIndex(USER_AGENT_PARSERS)
+OS_INDEX = ParserIndex(OS_PARSERS)
+DEVICE_INDEX = ParserIndex(DEVICE_PARSERS)
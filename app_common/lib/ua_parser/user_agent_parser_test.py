@@ -29,6 +29,7 @@ __author__ = "slamm@google.com (Stephen Lamm)"
 
 import os
 import re
+import time
 import unittest
 import yaml
 
@@ -286,5 +287,119 @@ class GetFiltersTest(unittest.TestCase):
         )
 
 
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(user_agent_parser.SetCacheSize, user_agent_parser.MAX_CACHE_SIZE)
+        self.addCleanup(user_agent_parser.ClearCache)
+        user_agent_parser.ClearCache()
+
+    def testCacheCounters(self):
+        user_agent_parser.SetCacheSize(2)
+        for user_agent_string in ("foo", "bar", "foo", "baz", "bar"):
+            user_agent_parser.ParseUserAgent(user_agent_string)
+        self.assertEqual(
+            {"size": 2, "maxsize": 2, "hits": 1, "misses": 4, "evictions": 2},
+            user_agent_parser.GetCacheStats()["ParseUserAgent"],
+        )
+
+    def testCachedResultIsSame(self):
+        user_agent_string = "Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0"
+        first = user_agent_parser.Parse(user_agent_string)
+        self.assertIs(first, user_agent_parser.Parse(user_agent_string))
+        self.assertEqual(1, user_agent_parser.GetCacheStats()["Parse"]["hits"])
+
+    def testCacheDisabled(self):
+        user_agent_parser.SetCacheSize(0)
+        user_agent_parser.ParseOS("foo")
+        user_agent_parser.ParseOS("foo")
+        self.assertEqual(
+            {"size": 0, "maxsize": 0, "hits": 0, "misses": 2, "evictions": 0},
+            user_agent_parser.GetCacheStats()["ParseOS"],
+        )
+
+
+class PrefilterTest(unittest.TestCase):
+    USER_AGENT_STRINGS = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1",
+        "Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Mobile Safari/537.36",
+        "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+        "Opera/9.80 (Windows NT 6.1; U; en) Presto/2.10.289 Version/12.00",
+        "curl/7.68.0",
+        "Ünïcödé/1.0",
+    )
+
+    def setUp(self):
+        self.addCleanup(setattr, user_agent_parser, "USE_PREFILTER", user_agent_parser.USE_PREFILTER)
+        self.addCleanup(user_agent_parser.SetCacheSize, user_agent_parser.MAX_CACHE_SIZE)
+        user_agent_parser.SetCacheSize(0)
+
+    def testRequiredLiterals(self):
+        self.assertEqual(("firefox",), user_agent_parser.RequiredLiterals(r"(Firefox)/(\d+)"))
+        self.assertEqual(
+            ("iceweasel", "minefield"),
+            user_agent_parser.RequiredLiterals(r"(?:Minefield|Iceweasel)/(\d+)"),
+        )
+        self.assertIsNone(user_agent_parser.RequiredLiterals(r"(\w+)/(\d+)"))
+        self.assertIsNone(user_agent_parser.RequiredLiterals(r"(?:Foo)?(\d+)"))
+
+    def testSameResults(self):
+        user_agent_parser.USE_PREFILTER = False
+        expected = self.parseAll(self.USER_AGENT_STRINGS)
+        user_agent_parser.USE_PREFILTER = True
+        self.assertEqual(expected, self.parseAll(self.USER_AGENT_STRINGS))
+
+    def testBenchmark(self):
+        """Parses per second over the test corpus, without and with prefilter."""
+        user_agent_strings = self.loadCorpus()
+        if not user_agent_strings:
+            self.skipTest("uap-core test corpus not found")
+        results = {}
+        for use_prefilter in (False, True):
+            user_agent_parser.USE_PREFILTER = use_prefilter
+            start = time.perf_counter()
+            results[use_prefilter] = self.parseAll(user_agent_strings)
+            elapsed = time.perf_counter() - start
+            print(
+                "%s prefilter: %d UA strings, %.0f parses/s"
+                % (
+                    "with" if use_prefilter else "without",
+                    len(user_agent_strings),
+                    len(user_agent_strings) / elapsed,
+                )
+            )
+        self.assertEqual(results[False], results[True])
+
+    def parseAll(self, user_agent_strings):
+        return [
+            (
+                user_agent_parser.ParseUserAgent(user_agent_string),
+                user_agent_parser.ParseOS(user_agent_string),
+                user_agent_parser.ParseDevice(user_agent_string),
+            )
+            for user_agent_string in user_agent_strings
+        ]
+
+    def loadCorpus(self):
+        user_agent_strings = []
+        for file_name in (
+            "tests/test_ua.yaml",
+            "tests/test_os.yaml",
+            "tests/test_device.yaml",
+            "test_resources/additional_os_tests.yaml",
+            "test_resources/firefox_user_agent_strings.yaml",
+            "test_resources/pgts_browser_list.yaml",
+        ):
+            path = os.path.join(TEST_RESOURCES_DIR, file_name)
+            if not os.path.exists(path):
+                continue
+            with open(path) as yamlFile:
+                yamlContents = yaml.load(yamlFile, Loader=SafeLoader)
+            user_agent_strings.extend(
+                test_case["user_agent_string"] for test_case in yamlContents["test_cases"]
+            )
+        return user_agent_strings
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -14,6 +14,7 @@ from odoo import models, fields, api, _
 from odoo.tools import DEFAULT_SERVER_DATE_FORMAT, DEFAULT_SERVER_DATETIME_FORMAT
 from odoo.http import request
 from ..lib.user_agents import parse
+from ..lib.ua_parser import user_agent_parser
 
 _logger = logging.getLogger(__name__)
 
@@ -231,7 +232,15 @@ class Base(models.AbstractModel):
     
     @api.model
     def get_ua_type(self):
+        # UA 解析缓存大小，系统参数优先于 UA_PARSER_CACHE_SIZE 环境变量
+        cache_size = self.env['ir.config_parameter'].sudo().get_param('app_common.ua_parser_cache_size')
+        if cache_size and cache_size.isdigit():
+            user_agent_parser.SetCacheSize(int(cache_size))
         return get_ua_type()
+
+    @api.model
+    def get_ua_parser_cache_stats(self):
+        return user_agent_parser.GetCacheStats()
     
     @api.model
     def deep_merge(self, a, b):